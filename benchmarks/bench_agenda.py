@@ -0,0 +1,90 @@
+"""
+Benchmark: agenda do fluxo fixo (projecao.expandir_fluxos)
+
+Gera fluxos com recorrências e vigências variadas, compara a matriz
+vetorizada fluxos x meses com um laço fluxo a fluxo / mês a mês usando
+relativedelta, e confere que a projeção com agenda constante bate com a
+projeção de saldo fixo.
+
+Uso: python benchmarks/bench_agenda.py [fluxos]
+"""
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from projecao import PERIODOS_RECORRENCIA, expandir_fluxos, projetar_patrimonio  # noqa: E402
+
+BASE = date(2026, 10, 1)
+
+
+def gerar_fluxos(quantidade):
+    rng = np.random.default_rng(5)
+    inicios = [BASE + relativedelta(months=int(m)) for m in rng.integers(-36, 48, quantidade)]
+    duracoes = rng.integers(1, 60, quantidade)
+    sem_fim = rng.random(quantidade) < 0.5
+    return pd.DataFrame({
+        "tipo": rng.choice(["Receita", "Despesa"], quantidade),
+        "valor": rng.uniform(50, 5_000, quantidade).round(2),
+        "recorrencia": rng.choice(list(PERIODOS_RECORRENCIA), quantidade),
+        "data_inicio": [d.isoformat() for d in inicios],
+        "data_fim": [
+            None if s else (d + relativedelta(months=int(n))).isoformat()
+            for d, n, s in zip(inicios, duracoes, sem_fim)
+        ],
+    })
+
+
+def expandir_por_laco(fluxos, meses):
+    matriz = np.zeros((len(fluxos), meses))
+    for linha, fluxo in enumerate(fluxos.itertuples()):
+        inicio = date.fromisoformat(fluxo.data_inicio).replace(day=1)
+        fim = date.fromisoformat(fluxo.data_fim).replace(day=1) if isinstance(fluxo.data_fim, str) else None
+        periodo = PERIODOS_RECORRENCIA[fluxo.recorrencia]
+        sinal = 1 if fluxo.tipo == "Receita" else -1
+        for mes in range(meses):
+            data_mes = BASE + relativedelta(months=mes)
+            if data_mes < inicio or (fim and data_mes > fim):
+                continue
+            decorridos = (data_mes.year - inicio.year) * 12 + data_mes.month - inicio.month
+            if decorridos % periodo == 0:
+                matriz[linha, mes] = sinal * fluxo.valor
+    return matriz
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    fluxos = gerar_fluxos(quantidade)
+
+    novo = expandir_fluxos(fluxos, 120, BASE)
+    antigo = expandir_por_laco(fluxos, 120)
+    assert np.allclose(novo, antigo), "agendas divergentes"
+
+    # Agenda constante -> mesma projeção do saldo fixo
+    constante = projetar_patrimonio(50_000, 1_800, 0.01, 0.004, 400_000, data_base=BASE)
+    com_agenda = projetar_patrimonio(
+        50_000, 1_800, 0.01, 0.004, 400_000, data_base=BASE, fluxo_mensal=np.full(120, 1_800.0)
+    )
+    for coluna in ("patrimonio", "rendimento", "aporte_fixo"):
+        assert np.allclose(constante[coluna], com_agenda[coluna], rtol=1e-9), coluna
+
+    inicio = time.perf_counter()
+    expandir_por_laco(fluxos, 120)
+    t_antigo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    expandir_fluxos(fluxos, 120, BASE)
+    t_novo = time.perf_counter() - inicio
+
+    print(f"Fluxos: {quantidade:,} x 120 meses")
+    print(f"laço por fluxo/mês : {t_antigo * 1000:9.1f} ms")
+    print(f"matriz vetorizada  : {t_novo * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: projeção da carteira por ativo (projecao.projetar_carteira)
+
+Gera uma carteira sintética com centenas de ativos, compara a matriz
+vetorizada ativos x meses com um laço ativo a ativo / mês a mês e mede
+o tempo das duas versões.
+
+Uso: python benchmarks/bench_carteira.py [ativos]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from projecao import projetar_carteira  # noqa: E402
+
+TIPOS = ["Renda Fixa", "Ações", "FIIs", "ETF", "Fundos", "Tesouro", "Outros"]
+PERFIS = ["Conservador", "Moderado", "Arrojado", "Especulativo"]
+
+
+def gerar_carteira(ativos):
+    rng = np.random.default_rng(11)
+    return pd.DataFrame({
+        "tipo": rng.choice(TIPOS, ativos),
+        "categoria": rng.choice(PERFIS, ativos),
+        "valor_atual": rng.uniform(500, 80_000, ativos).round(2),
+        "rendimento_mensal": rng.uniform(0.004, 0.015, ativos).round(4),
+    })
+
+
+def projetar_por_laco(carteira, meses, inflacao, aporte, por):
+    total = carteira["valor_atual"].sum()
+    somas = {}
+    for _, ativo in carteira.iterrows():
+        taxa = max(ativo["rendimento_mensal"] - inflacao, -0.99)
+        parcela = aporte * ativo["valor_atual"] / total
+        valor = ativo["valor_atual"]
+        serie = somas.setdefault(ativo[por], np.zeros(meses))
+        for mes in range(meses):
+            if mes > 0:
+                valor = valor * (1 + taxa) + parcela
+            serie[mes] += valor
+    return somas
+
+
+def main():
+    ativos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    carteira = gerar_carteira(ativos)
+    meses, inflacao, aporte = 121, 0.004, 3_000
+
+    for por in ("tipo", "categoria"):
+        novo = projetar_carteira(carteira, meses, inflacao, aporte, por=por)
+        antigo = projetar_por_laco(carteira, meses, inflacao, aporte, por)
+        for grupo, serie in antigo.items():
+            calculado = novo.loc[novo[por] == grupo, "patrimonio"].to_numpy()
+            assert np.allclose(calculado, serie, rtol=1e-9), (por, grupo)
+
+    inicio = time.perf_counter()
+    projetar_por_laco(carteira, meses, inflacao, aporte, "tipo")
+    t_antigo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    projetar_carteira(carteira, meses, inflacao, aporte, por="tipo")
+    t_novo = time.perf_counter() - inicio
+
+    print(f"Ativos: {ativos:,} x {meses} meses")
+    print(f"laço por ativo/mês : {t_antigo * 1000:9.1f} ms")
+    print(f"matriz vetorizada  : {t_novo * 1000:9.1f} ms")
+    print(f"Ganho              : {t_antigo / t_novo:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: categorizador compilado (categorizador.Categorizador) x laço
+iterrows + any(palavra in desc ...) da aba Categorias
+
+Gera gastos sintéticos com descrições montadas a partir das palavras-chave
+(mais texto sem categoria), confere que a classificação bate linha a linha
+com o laço antigo nos dois dicionários (card e análise) e compara o tempo
+de classificar a coluna inteira: laço, regex com cache frio e cache quente.
+Por fim confere o save incremental (categorizar_gastos): com as categorias
+já gravadas, só as linhas novas ou com descrição alterada são classificadas
+(linhas antigas ainda sem categoria não viram update em massa).
+
+Uso: python benchmarks/bench_categorizador.py [gastos]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from categorizador import (  # noqa: E402
+    CATEGORIAS_DETALHADAS,
+    PALAVRAS_CHAVE_DETALHADAS,
+    Categorizador,
+    categorizar_gastos,
+)
+
+SEM_CATEGORIA = ["pix joão", "transferência", "diversos", "compra online", "R$ 199 loja"]
+
+
+def gerar_gastos(rng, quantidade, distintas=3_000):
+    palavras = sorted({p for lista in PALAVRAS_CHAVE_DETALHADAS.values() for p in lista})
+    palavras += [p for info in CATEGORIAS_DETALHADAS.values() for p in info["palavras"]]
+    base = [
+        " ".join(rng.choice(palavras + SEM_CATEGORIA, rng.integers(1, 4))).title()
+        for _ in range(distintas)
+    ]
+    return pd.DataFrame({
+        "descricao": rng.choice(base, quantidade),
+        "valor": rng.uniform(2, 800, quantidade).round(2),
+    })
+
+
+def classificar_por_laco(df, palavras_por_categoria, padrao):
+    categorias = []
+    for _, row in df.iterrows():
+        desc_lower = row["descricao"].lower()
+        for categoria, palavras in palavras_por_categoria.items():
+            if any(palavra in desc_lower for palavra in palavras):
+                categorias.append(categoria)
+                break
+        else:
+            categorias.append(padrao)
+    return categorias
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    df = gerar_gastos(np.random.default_rng(22), quantidade)
+
+    card = {nome: info["palavras"] for nome, info in CATEGORIAS_DETALHADAS.items()}
+    for dicionario, padrao in ((card, "Outros - Variados"), (PALAVRAS_CHAVE_DETALHADAS, "📝 Outros - Variados")):
+        esperado = classificar_por_laco(df, dicionario, padrao)
+        obtido = Categorizador(dicionario, padrao).classificar_serie(df["descricao"])
+        assert list(obtido) == esperado, "classificações divergentes"
+
+    inicio = time.perf_counter()
+    classificar_por_laco(df, PALAVRAS_CHAVE_DETALHADAS, "📝 Outros - Variados")
+    t_laco = time.perf_counter() - inicio
+
+    categorizador = Categorizador(PALAVRAS_CHAVE_DETALHADAS, "📝 Outros - Variados")
+    inicio = time.perf_counter()
+    categorizador.classificar_serie(df["descricao"])
+    t_frio = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    subcategorias = categorizador.classificar_serie(df["descricao"])
+    df["valor"].groupby(subcategorias, sort=False).sum()
+    t_quente = time.perf_counter() - inicio
+
+    # Save incremental: 1% das descrições editadas + 100 gastos novos
+    df["id"] = range(len(df))
+    categorizar_gastos(df)
+    anteriores = {row_id: {"descricao": d} for row_id, d in zip(df["id"], df["descricao"])}
+    editados = df.sample(frac=0.01, random_state=1).index
+    df.loc[editados, "descricao"] = "Conta De Luz " + df.loc[editados, "descricao"]
+    novos = gerar_gastos(np.random.default_rng(23), 100).assign(id=None)
+    df = pd.concat([df, novos], ignore_index=True)
+
+    inicio = time.perf_counter()
+    categorizar_gastos(df, anteriores)
+    t_incremental = time.perf_counter() - inicio
+
+    do_zero = categorizar_gastos(df.drop(columns=["categoria_principal", "subcategoria"]))
+    assert (df["subcategoria"] == do_zero["subcategoria"]).all(), "subcategorias divergentes"
+    assert (df["categoria_principal"] == do_zero["categoria_principal"]).all(), "categorias divergentes"
+
+    # Linhas antigas sem categoria e sem edição não entram no save incremental
+    legado = df.drop(index=editados).dropna(subset=["id"]).sample(100, random_state=2).index
+    df.loc[legado, ["categoria_principal", "subcategoria"]] = None
+    categorizar_gastos(df, anteriores)
+    assert df.loc[legado, "subcategoria"].isna().all(), "linhas antigas reclassificadas"
+
+    print(f"Gastos: {quantidade:,} · descrições distintas: {df['descricao'].nunique():,}")
+    print(f"laço iterrows + any : {t_laco * 1000:9.1f} ms")
+    print(f"regex (cache frio)  : {t_frio * 1000:9.1f} ms")
+    print(f"regex (cache quente): {t_quente * 1000:9.1f} ms")
+    print(f"save incremental    : {t_incremental * 1000:9.1f} ms ({len(editados) + len(novos):,} linhas)")
+
+
+if __name__ == "__main__":
+    main()
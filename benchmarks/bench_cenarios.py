@@ -0,0 +1,80 @@
+"""
+Benchmark: simulador de cenários em grade (RELATÓRIO EXECUTIVO)
+
+Monta a mesma grade usada na tela (aporte x corte x rendimento x inflação),
+mede o tempo de simular_grade + plano_mais_barato (alvo: < 100 ms) e
+confere contra a simulação mês a mês uma amostra de células e todas as
+células com rendimento ≈ inflação (taxa real quase zero, onde a fórmula
+fechada perdia precisão).
+
+Uso: python benchmarks/bench_cenarios.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from projecao import plano_mais_barato, simular_grade  # noqa: E402
+
+PATRIMONIO = 85_000
+SALDO_FIXO = 1_200
+DESPESAS_FIXAS = 6_500
+META = 1_000_000
+RENDIMENTO = 0.009
+INFLACAO = 0.004
+
+
+def meses_por_laco(p0, aporte, taxa, meta, horizonte=120):
+    patrimonio = p0
+    for i in range(horizonte + 1):
+        if i > 0:
+            patrimonio += patrimonio * taxa + aporte
+        if patrimonio >= meta:
+            return i
+    return None
+
+
+def main():
+    variacoes = np.array([-0.004, -0.002, 0.0, 0.002, 0.004])
+    argumentos = dict(
+        patrimonio_inicial=PATRIMONIO,
+        saldo_fixo_mensal=SALDO_FIXO,
+        despesas_fixas=DESPESAS_FIXAS,
+        meta_patrimonio=META,
+        aportes=np.arange(0, 5001, 250),
+        cortes=np.arange(0, 51, 5),
+        rendimentos=np.unique(np.clip(RENDIMENTO + variacoes, 0, None)),
+        inflacoes=np.unique(np.clip(INFLACAO + variacoes / 2, 0, None)),
+    )
+
+    tempos = []
+    for _ in range(5):
+        inicio = time.perf_counter()
+        grade = simular_grade(**argumentos)
+        plano = plano_mais_barato(grade, 96, RENDIMENTO, INFLACAO)
+        tempos.append(time.perf_counter() - inicio)
+
+    quase_zero = grade[np.isclose(grade["rendimento"], grade["inflacao"])]
+    assert len(quase_zero), "grade sem cenário de taxa real quase zero"
+    amostra = pd.concat([grade.sample(300, random_state=3), quase_zero])
+    for _, linha in amostra.iterrows():
+        taxa = max(linha["rendimento"] - linha["inflacao"], -0.99)
+        esperado = meses_por_laco(PATRIMONIO, linha["saldo_mensal"], taxa, META)
+        calculado = None if np.isnan(linha["meses_meta"]) else int(linha["meses_meta"])
+        assert esperado == calculado, (linha.to_dict(), esperado)
+
+    print(f"Cenários     : {len(grade):,}")
+    print(f"Tempo        : {min(tempos) * 1000:.1f} ms")
+    if plano is not None:
+        print(
+            f"Plano (96 m) : aporte R$ {plano['aporte_extra']:,.0f}, "
+            f"corte {plano['corte_despesas']:.0f}%, {plano['meses_meta']:.0f} meses"
+        )
+    assert min(tempos) < 0.1, "simulador acima de 100 ms"
+
+
+if __name__ == "__main__":
+    main()
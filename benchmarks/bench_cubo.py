@@ -0,0 +1,98 @@
+"""
+Benchmark: cubo mensal (cubo.CuboMensal) x filtro sobre a tabela inteira
+
+Monta o cubo a partir de um histórico sintético, aplica uma sequência
+aleatória de inserts, edições e exclusões por delta (como o save
+incremental faz) e confere que as somas/contagens por mês e tipo batem
+com um groupby sobre a tabela final. Depois compara o tempo de ler os
+totais do mês no cubo com o filtro strftime("%Y-%m") == mes_atual.
+
+Uso: python benchmarks/bench_cubo.py [linhas]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from cubo import CuboMensal  # noqa: E402
+
+DIMENSOES = ("tipo", "categoria", "responsavel")
+
+
+def gerar_registros(rng, quantidade):
+    datas = pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 2_800, quantidade), unit="D")
+    return [
+        {
+            "data": d.strftime("%Y-%m-%d"),
+            "tipo": t,
+            "categoria": c,
+            "responsavel": r,
+            "valor": float(v),
+        }
+        for d, t, c, r, v in zip(
+            datas,
+            rng.choice(["Receita", "Despesa", "Investimento"], quantidade),
+            rng.choice(["Moradia", "Lazer", "Saúde", "Outros"], quantidade),
+            rng.choice(["🧔 Ele", "👩‍🦰 Ela", "👨‍👩‍👧‍👦 Compartilhado"], quantidade),
+            rng.uniform(5, 3_000, quantidade).round(2),
+        )
+    ]
+
+
+def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(9)
+
+    tabela = dict(enumerate(gerar_registros(rng, linhas)))
+    cubo = CuboMensal(DIMENSOES, tabela.values())
+    proximo_id = linhas
+
+    # Deltas: 1/3 inserts, 1/3 edições, 1/3 exclusões
+    for operacao in rng.integers(0, 3, 3_000):
+        if operacao == 0:
+            novo = gerar_registros(rng, 1)[0]
+            tabela[proximo_id] = novo
+            cubo.adicionar(novo)
+            proximo_id += 1
+        elif operacao == 1:
+            row_id = rng.choice(list(tabela))
+            editado = dict(tabela[row_id], valor=float(rng.uniform(5, 3_000)), tipo="Despesa")
+            cubo.remover(tabela[row_id])
+            cubo.adicionar(editado)
+            tabela[row_id] = editado
+        else:
+            row_id = rng.choice(list(tabela))
+            cubo.remover(tabela.pop(row_id))
+
+    df = pd.DataFrame(list(tabela.values()))
+    df["data"] = pd.to_datetime(df["data"])
+    df["mes"] = df["data"].dt.strftime("%Y-%m")
+
+    esperado = df.groupby(["mes", "tipo"])["valor"].agg(["sum", "count"])
+    obtido = cubo.totais(por=("mes", "tipo")).set_index(["mes", "tipo"])
+    assert np.allclose(esperado["sum"], obtido.loc[esperado.index, "valor"]), "somas divergentes"
+    assert (esperado["count"] == obtido.loc[esperado.index, "quantidade"]).all(), "contagens divergentes"
+
+    mes_atual = df["mes"].max()
+
+    inicio = time.perf_counter()
+    for _ in range(20):
+        mes = df[df["data"].dt.strftime("%Y-%m") == mes_atual]
+        mes.loc[mes["tipo"] == "Receita", "valor"].sum()
+    t_filtro = (time.perf_counter() - inicio) / 20
+
+    inicio = time.perf_counter()
+    for _ in range(20):
+        cubo.soma(mes_atual, tipo="Receita")
+    t_cubo = (time.perf_counter() - inicio) / 20
+
+    print(f"Linhas: {len(df):,} · células no cubo: {len(cubo._celulas):,}")
+    print(f"filtro strftime : {t_filtro * 1000:9.2f} ms")
+    print(f"cubo.soma       : {t_cubo * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
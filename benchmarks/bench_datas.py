@@ -0,0 +1,96 @@
+"""
+Benchmark: parse_datas (vetorizado) x converter_data_para_datetime (por linha)
+
+Gera uma coluna de datas com formatos misturados, como a de um historico
+antigo, e compara o .apply linha a linha usado em LANÇAMENTOS com o
+parser vetorizado de datas.py. Também confere se os resultados batem.
+
+Uso: python benchmarks/bench_datas.py [linhas]
+"""
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from datas import parse_datas  # noqa: E402
+
+
+def converter_data_para_datetime(data_value):
+    """Versão antiga (LANÇAMENTOS), mantida aqui só para comparação"""
+    if pd.isna(data_value) or data_value is None:
+        return pd.NaT
+    if isinstance(data_value, pd.Timestamp):
+        return data_value
+    if isinstance(data_value, datetime):
+        return pd.Timestamp(data_value)
+    if isinstance(data_value, date):
+        return pd.Timestamp(data_value)
+    if isinstance(data_value, str):
+        data_str = data_value.strip()
+        if not data_str:
+            return pd.NaT
+        formatos = [
+            '%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d',
+            '%d.%m.%Y', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M:%S',
+        ]
+        for formato in formatos:
+            try:
+                return pd.to_datetime(data_str, format=formato)
+            except Exception:
+                continue
+        try:
+            return pd.to_datetime(data_str, errors='coerce')
+        except Exception:
+            return pd.NaT
+    try:
+        return pd.to_datetime(data_value, errors='coerce')
+    except Exception:
+        return pd.NaT
+
+
+def gerar_datas(linhas):
+    rng = np.random.default_rng(7)
+    base = pd.date_range("2015-01-01", periods=linhas, freq="6h")
+    formatos = ["%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S", "%d.%m.%Y"]
+    pesos = [0.85, 0.08, 0.05, 0.02]
+    escolhidos = rng.choice(len(formatos), size=linhas, p=pesos)
+    valores = [d.strftime(formatos[i]) for d, i in zip(base, escolhidos)]
+    valores[::997] = ["data inválida"] * len(valores[::997])
+    return pd.Series(valores, dtype=object)
+
+
+def cronometrar(func, repeticoes=3):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    serie = gerar_datas(linhas)
+
+    antigo = serie.apply(converter_data_para_datetime)
+    novo, invalidos = parse_datas(serie, chave="bench", retornar_invalidos=True)
+    # Compara valores (pandas 3 infere datetime64[us] no caminho antigo)
+    antigo = pd.to_datetime(antigo).astype("datetime64[ns]")
+    assert antigo.equals(novo), "resultados divergentes"
+    assert antigo.isna().sum() == len(invalidos), "datas inválidas não reportadas"
+
+    t_antigo = cronometrar(lambda: serie.apply(converter_data_para_datetime))
+    t_novo = cronometrar(lambda: parse_datas(serie, chave="bench"))
+
+    print(f"Linhas: {linhas:,} ({len(invalidos)} inválidas)")
+    print(f"converter por linha : {t_antigo * 1000:9.1f} ms")
+    print(f"parse_datas         : {t_novo * 1000:9.1f} ms")
+    print(f"Ganho               : {t_antigo / t_novo:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
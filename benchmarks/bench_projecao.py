@@ -0,0 +1,120 @@
+"""
+Benchmark: projetar_patrimonio (forma fechada) x laço mês a mês
+
+Roda a projeção antiga (laço com relativedelta) e a nova de projecao.py
+sobre uma grade de cenários, confere se as saídas batem (mesmas colunas,
+mesmo número de linhas, valores iguais a menos de arredondamento) e se
+mes_meta concorda com o primeiro mês da trajetória antiga.
+
+Uso: python benchmarks/bench_projecao.py
+"""
+import itertools
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from projecao import mes_meta, projetar_patrimonio, taxa_real  # noqa: E402
+
+
+def projetar_patrimonio_antigo(
+    patrimonio_inicial,
+    saldo_fixo_mensal,
+    rendimento_mensal,
+    inflacao_mensal,
+    meta_patrimonio,
+    meses=120
+):
+    """Versão antiga (main.py), mantida aqui só para comparação"""
+    taxa_real = rendimento_mensal - inflacao_mensal
+    taxa_real = max(taxa_real, -0.99)
+
+    patrimonio = patrimonio_inicial
+    resultados = []
+
+    data_base = date.today().replace(day=1)
+
+    for i in range(meses):
+        data_ref = data_base + relativedelta(months=i)
+
+        if i > 0:
+            rendimento = patrimonio * taxa_real
+            patrimonio += rendimento + saldo_fixo_mensal
+        else:
+            rendimento = 0
+
+        resultados.append({
+            "data": data_ref,
+            "patrimonio": patrimonio,
+            "rendimento": rendimento,
+            "aporte_fixo": saldo_fixo_mensal if i > 0 else 0,
+            "meta_atingida": patrimonio >= meta_patrimonio
+        })
+
+        if patrimonio >= meta_patrimonio and i >= 12:
+            break
+
+    return pd.DataFrame(resultados)
+
+
+CENARIOS = list(itertools.product(
+    [0, 10_000, 250_000],            # patrimônio inicial
+    [-2_000, 0, 1_500, 8_000],       # saldo fixo
+    [0.0, 0.008, 0.012],             # rendimento
+    [0.0, 0.004, 0.02],              # inflação
+    [100_000, 1_000_000],            # meta
+))
+
+
+def conferir(cenario):
+    antigo = projetar_patrimonio_antigo(*cenario)
+    novo = projetar_patrimonio(*cenario)
+
+    assert list(antigo.columns) == list(novo.columns), cenario
+    assert len(antigo) == len(novo), cenario
+    assert list(antigo["data"]) == list(novo["data"]), cenario
+    for coluna in ("patrimonio", "rendimento", "aporte_fixo"):
+        assert np.allclose(antigo[coluna], novo[coluna], rtol=1e-9, atol=1e-6), (cenario, coluna)
+    assert (antigo["meta_atingida"] == novo["meta_atingida"]).all(), cenario
+
+    # mes_meta (O(1)) x primeiro mês da trajetória do laço antigo
+    p0, aporte, rend, infl, meta = cenario
+    longo = projetar_patrimonio_antigo(p0, aporte, rend, infl, float("inf"), meses=600)
+    acima = np.flatnonzero(longo["patrimonio"].to_numpy() >= meta)
+    esperado = int(acima[0]) if acima.size else None
+    calculado = mes_meta(p0, aporte, taxa_real(rend, infl), meta)
+    if esperado is None:
+        assert calculado is None or calculado >= 600, cenario
+    else:
+        assert calculado == esperado, (cenario, calculado, esperado)
+
+
+def cronometrar(func, repeticoes=3):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    for cenario in CENARIOS:
+        conferir(cenario)
+
+    t_antigo = cronometrar(lambda: [projetar_patrimonio_antigo(*c) for c in CENARIOS])
+    t_novo = cronometrar(lambda: [projetar_patrimonio(*c) for c in CENARIOS])
+
+    print(f"Cenários conferidos: {len(CENARIOS)}")
+    print(f"laço mês a mês : {t_antigo * 1000:9.1f} ms")
+    print(f"forma fechada  : {t_novo * 1000:9.1f} ms")
+    print(f"Ganho          : {t_antigo / t_novo:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
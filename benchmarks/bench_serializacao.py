@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: serialização de registros no DatabaseManager.save
+
+Compara o caminho antigo (to_dict + loop por célula com isoformat) com o
+serializador colunar atual, em um historico sintético.
+
+Uso: python benchmarks/bench_serializacao.py [linhas]
+"""
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from database import DatabaseManager  # noqa: E402
+
+
+def to_records_antigo(df, usuario):
+    df = df.copy()
+    df.columns = df.columns.str.lower()
+    df["usuario"] = usuario
+
+    df = df.replace([float("inf"), float("-inf")], None)
+    df = df.where(pd.notna(df), None)
+
+    records = df.to_dict(orient="records")
+
+    converted = []
+    for record in records:
+        new_record = {}
+        for key, value in record.items():
+            if value is not None and hasattr(value, "isoformat"):
+                new_record[key] = value.isoformat()
+            else:
+                new_record[key] = value
+        converted.append(new_record)
+
+    for record in converted:
+        if "id" in record:
+            del record["id"]
+
+    return converted
+
+
+def gerar_historico(linhas):
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        "id": np.arange(1, linhas + 1),
+        "data": pd.date_range("2015-01-01", periods=linhas, freq="h"),
+        "tipo": rng.choice(["Receita", "Despesa"], linhas),
+        "valor": rng.uniform(1, 5000, linhas).round(2),
+        "categoria": rng.choice(["Moradia", "Lazer", "Salário"], linhas),
+        "descricao": [f"Lançamento {i}" for i in range(linhas)],
+        "responsavel": rng.choice(["Ana", "Bruno"], linhas),
+        "fixo": rng.choice(["Sim", "Não"], linhas),
+        "data_registro": [date(2020, 1, 1)] * linhas,
+    })
+
+
+def cronometrar(func, *args, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    df = gerar_historico(linhas)
+
+    antigo = to_records_antigo(df, "bench")
+    novo = DatabaseManager._to_records(df, "bench", drop=["id"])
+    assert antigo == novo, "registros divergentes"
+
+    t_antigo = cronometrar(to_records_antigo, df, "bench")
+    t_novo = cronometrar(DatabaseManager._to_records, df, "bench", ["id"])
+
+    print(f"Linhas: {linhas:,}")
+    print(f"Loop por célula : {t_antigo * 1000:8.1f} ms")
+    print(f"Colunar         : {t_novo * 1000:8.1f} ms")
+    print(f"Ganho           : {t_antigo / t_novo:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
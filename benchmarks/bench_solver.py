@@ -0,0 +1,114 @@
+"""
+Paridade: solver.py (fv / pmt / nper) x laços mês a mês
+
+Sorteia milhares de combinações (patrimônio, aporte, taxa real incluindo
+zero, quase zero (±1e-15) e negativas, meta, prazo, aporte no início ou no fim do mês) e
+confere as propriedades:
+  - fv bate com o laço que acumula mês a mês;
+  - nper é o primeiro mês em que o laço alcança a meta (ou nunca);
+  - aportando pmt, o laço alcança a meta exatamente no prazo, e com
+    um aporte 1% menor não alcança.
+No fim mede o tempo do laço antigo da tela de Configurações x nper.
+
+Uso: python benchmarks/bench_solver.py [casos]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import solver  # noqa: E402
+
+LIMITE_MESES = 600
+
+
+def acumular(pv, pmt, taxa, meses, inicio):
+    patrimonio = pv
+    for _ in range(meses):
+        if inicio:
+            patrimonio = (patrimonio + pmt) * (1 + taxa)
+        else:
+            patrimonio = patrimonio * (1 + taxa) + pmt
+    return patrimonio
+
+
+def nper_por_laco(pv, pmt, taxa, meta, inicio):
+    patrimonio, meses = pv, 0
+    while patrimonio < meta and meses < LIMITE_MESES:
+        patrimonio = (patrimonio + pmt) * (1 + taxa) if inicio else patrimonio * (1 + taxa) + pmt
+        meses += 1
+    return meses if patrimonio >= meta else None
+
+
+def sortear(rng):
+    taxa = rng.choice([
+        0.0, rng.uniform(-0.02, 0.0), rng.uniform(0.0, 0.02),
+        # Quase zero: 1e-15 e a diferença real de rendimento e inflação "iguais"
+        1e-15, -1e-15, 0.004999999999999999 - 0.005,
+    ])
+    return dict(
+        pv=float(rng.choice([0.0, rng.uniform(0, 500_000)])),
+        pmt=float(rng.choice([0.0, rng.uniform(-500, 10_000)])),
+        taxa=float(taxa),
+        meta=float(rng.uniform(1_000, 2_000_000)),
+        meses=int(rng.integers(1, 400)),
+        inicio=bool(rng.integers(0, 2)),
+    )
+
+
+def conferir(caso):
+    pv, pmt, taxa, meta, meses, inicio = (
+        caso["pv"], caso["pmt"], caso["taxa"], caso["meta"], caso["meses"], caso["inicio"]
+    )
+
+    esperado = acumular(pv, pmt, taxa, meses, inicio)
+    calculado = float(solver.fv(taxa, meses, pmt, pv, inicio=inicio))
+    assert np.isclose(calculado, esperado, rtol=1e-8, atol=1e-4), (caso, calculado, esperado)
+
+    n = float(solver.nper(taxa, pmt, meta, pv, inicio=inicio))
+    n_laco = nper_por_laco(pv, pmt, taxa, meta, inicio)
+    if n_laco is None:
+        assert n > LIMITE_MESES, (caso, n)
+    else:
+        assert n == n_laco, (caso, n, n_laco)
+
+    aporte = float(solver.pmt(taxa, meses, meta, pv, inicio=inicio))
+    if aporte > 0:
+        assert acumular(pv, aporte, taxa, meses, inicio) >= meta * (1 - 1e-9), caso
+        assert acumular(pv, aporte * 0.99, taxa, meses, inicio) < meta, caso
+    else:
+        assert acumular(pv, 0.0, taxa, meses, inicio) >= meta * (1 - 1e-9), caso
+
+
+def main():
+    casos = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    rng = np.random.default_rng(2026)
+    amostra = [sortear(rng) for _ in range(casos)]
+    for caso in amostra:
+        conferir(caso)
+
+    # Tela de Configurações: aporte no início do mês, partindo do zero
+    inicio = time.perf_counter()
+    for caso in amostra:
+        nper_por_laco(0.0, abs(caso["pmt"]) + 1, abs(caso["taxa"]), caso["meta"], True)
+    t_laco = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    solver.nper(
+        np.array([abs(c["taxa"]) for c in amostra]),
+        np.array([abs(c["pmt"]) + 1 for c in amostra]),
+        np.array([c["meta"] for c in amostra]),
+        0.0,
+        inicio=True,
+    )
+    t_solver = time.perf_counter() - inicio
+
+    print(f"Casos conferidos: {casos:,}")
+    print(f"laço while      : {t_laco * 1000:9.1f} ms")
+    print(f"solver.nper     : {t_solver * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+import re
+import threading
+
+import pandas as pd
+
+
+# =========================================================
+# CATEGORIZADOR DE GASTOS POR PALAVRA-CHAVE
+# =========================================================
+
+class Categorizador:
+    """
+    Classifica descrições pela primeira categoria (na ordem do dicionário)
+    que tenha alguma palavra-chave contida no texto.
+
+    Todas as palavras viram uma única regex compilada, com as alternativas
+    ordenadas pela prioridade da categoria dentro de um lookahead: em cada
+    posição do texto ela devolve a palavra de maior prioridade que começa
+    ali, e a categoria final é a de maior prioridade entre as encontradas
+    (mesmo resultado do laço `any(palavra in desc ...)`, sem percorrer
+    categorias x palavras). O resultado fica em cache por descrição, com no
+    máximo `max_cache` entradas (as mais antigas saem primeiro), já que as
+    instâncias do módulo são compartilhadas por todas as sessões.
+    """
+
+    def __init__(self, palavras_por_categoria, padrao, max_cache=20_000):
+        self.padrao = padrao
+        self._categorias = list(palavras_por_categoria)
+        self._prioridade = {}
+        for posicao, palavras in enumerate(palavras_por_categoria.values()):
+            for palavra in palavras:
+                self._prioridade.setdefault(palavra, posicao)
+
+        ordenadas = sorted(self._prioridade, key=self._prioridade.get)
+        self._regex = (
+            re.compile("(?=(" + "|".join(map(re.escape, ordenadas)) + "))")
+            if ordenadas else None
+        )
+        self.max_cache = max_cache
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _guardar(self, categorias):
+        with self._lock:
+            self._cache.update(categorias)
+            excesso = len(self._cache) - self.max_cache
+            if excesso > 0:
+                for descricao in list(self._cache)[:excesso]:
+                    del self._cache[descricao]
+
+    def _classificar_texto(self, descricao):
+        if self._regex is None:
+            return self.padrao
+        encontradas = self._regex.findall(descricao.lower())
+        if not encontradas:
+            return self.padrao
+        return self._categorias[min(self._prioridade[p] for p in encontradas)]
+
+    def classificar(self, descricao):
+        """Categoria de uma descrição (consulta o cache antes da regex)"""
+        descricao = "" if descricao is None or pd.isna(descricao) else str(descricao)
+        categoria = self._cache.get(descricao)
+        if categoria is None:
+            categoria = self._classificar_texto(descricao)
+            self._guardar({descricao: categoria})
+        return categoria
+
+    def classificar_serie(self, descricoes):
+        """
+        Categoria de cada linha da coluna `descricao`. Só as descrições
+        distintas que ainda não estão no cache passam pela regex.
+        """
+        descricoes = pd.Series(descricoes, dtype=object).fillna("").astype(str)
+        categorias = {}
+        novas = {}
+        for descricao in descricoes.unique():
+            categoria = self._cache.get(descricao)
+            if categoria is None:
+                categoria = novas[descricao] = self._classificar_texto(descricao)
+            categorias[descricao] = categoria
+        if novas:
+            self._guardar(novas)
+        return descricoes.map(categorias)
+
+
+# =========================================================
+# DICIONÁRIOS DE PALAVRAS-CHAVE
+# =========================================================
+
+# 🔥 Categorias do card de gasto (com cor e emoji)
+CATEGORIAS_DETALHADAS = {
+    # 🍔 ALIMENTAÇÃO
+    "Alimentação - Restaurante": {
+        "palavras": ['restaurante', 'lanche', 'fast food', 'pizza', 'hamburguer', 'mcdonald', 'bk', 'subway'],
+        "cor": "#ef4444",
+        "emoji": "🍔"
+    },
+    "Alimentação - Supermercado": {
+        "palavras": ['mercado', 'supermercado', 'atacadão', 'atacadista', 'extra', 'carrefour', 'pão de açúcar'],
+        "cor": "#dc2626",
+        "emoji": "🛒"
+    },
+    "Alimentação - Café": {
+        "palavras": ['café', 'cafeteria', 'starbucks', 'padaria', 'padoca', 'confeitaria'],
+        "cor": "#92400e",
+        "emoji": "☕"
+    },
+    "Alimentação - Açougue": {
+        "palavras": ['açougue', 'carnes', 'frango', 'peixe', 'peixaria', 'frutos do mar'],
+        "cor": "#b91c1c",
+        "emoji": "🥩"
+    },
+    "Alimentação - Hortifruti": {
+        "palavras": ['feira', 'hortifruti', 'fruta', 'legume', 'verdura', 'sacolão'],
+        "cor": "#16a34a",
+        "emoji": "🍎"
+    },
+
+    # 🚗 TRANSPORTE
+    "Transporte - Combustível": {
+        "palavras": ['gasolina', 'combustível', 'posto', 'shell', 'ipiranga', 'etanol', 'diesel'],
+        "cor": "#3b82f6",
+        "emoji": "⛽"
+    },
+    "Transporte - Táxi/Uber": {
+        "palavras": ['uber', 'táxi', '99', 'cabify', 'corrida', 'transporte'],
+        "cor": "#1d4ed8",
+        "emoji": "🚕"
+    },
+    "Transporte - Público": {
+        "palavras": ['ônibus', 'metro', 'trem', 'bilhete', 'passagem', 'recarga', 'cartão transporte'],
+        "cor": "#1e40af",
+        "emoji": "🚌"
+    },
+    "Transporte - Estacionamento": {
+        "palavras": ['estacionamento', 'parking', 'garagem', 'zona azul'],
+        "cor": "#0ea5e9",
+        "emoji": "🅿️"
+    },
+    "Transporte - Manutenção": {
+        "palavras": ['oficina', 'mecânico', 'troca de óleo', 'pneu', 'lavagem', 'manutenção carro'],
+        "cor": "#6366f1",
+        "emoji": "🛠️"
+    },
+
+    # 🏠 CASA
+    "Casa - Aluguel": {
+        "palavras": ['aluguel', 'condomínio', 'iptu', 'taxa condominial'],
+        "cor": "#8b5cf6",
+        "emoji": "🏠"
+    },
+    "Casa - Energia": {
+        "palavras": ['luz', 'energia', 'conta de luz', 'energisa', 'enel', 'light'],
+        "cor": "#f59e0b",
+        "emoji": "💡"
+    },
+    "Casa - Água": {
+        "palavras": ['água', 'conta de água', 'sabesp', 'cedae', 'caesb'],
+        "cor": "#0ea5e9",
+        "emoji": "💧"
+    },
+    "Casa - Gás": {
+        "palavras": ['gás', 'botijão', 'gás natural', 'conta de gás'],
+        "cor": "#ef4444",
+        "emoji": "🔥"
+    },
+    "Casa - Internet/TV": {
+        "palavras": ['internet', 'net', 'claro', 'vivo', 'oi', 'sky', 'tv a cabo'],
+        "cor": "#8b5cf6",
+        "emoji": "📡"
+    },
+
+    # 🛒 COMPRAS
+    "Compras - Roupas": {
+        "palavras": ['roupa', 'calçado', 'sapato', 'tenis', 'camiseta', 'loja de roupa', 'renner', 'c&a'],
+        "cor": "#ec4899",
+        "emoji": "👕"
+    },
+    "Compras - Eletrônicos": {
+        "palavras": ['celular', 'notebook', 'tablet', 'tv', 'eletrônico', 'informática'],
+        "cor": "#6b7280",
+        "emoji": "📱"
+    },
+    "Compras - Beleza": {
+        "palavras": ['farmácia', 'drogaria', 'perfume', 'maquiagem', 'cosmético', 'beleza'],
+        "cor": "#f472b6",
+        "emoji": "💄"
+    },
+    "Compras - Livros": {
+        "palavras": ['livro', 'revista', 'jornal', 'leitura', 'livraria', 'saraiva', 'cultura'],
+        "cor": "#84cc16",
+        "emoji": "📚"
+    },
+    "Compras - Presentes": {
+        "palavras": ['presente', 'aniversário', 'natal', 'dia das mães', 'dia dos pais'],
+        "cor": "#a855f7",
+        "emoji": "🎁"
+    },
+
+    # 🎯 LAZER
+    "Lazer - Cinema": {
+        "palavras": ['cinema', 'filme', 'ingresso', 'netflix', 'prime video', 'disney+'],
+        "cor": "#a78bfa",
+        "emoji": "🎬"
+    },
+    "Lazer - Bar": {
+        "palavras": ['bar', 'boteco', 'cerveja', 'drink', 'happy hour', 'balada'],
+        "cor": "#f59e0b",
+        "emoji": "🍻"
+    },
+    "Lazer - Viagem": {
+        "palavras": ['viagem', 'hotel', 'passagem', 'turismo', 'resort', 'pousada'],
+        "cor": "#3b82f6",
+        "emoji": "✈️"
+    },
+    "Lazer - Games": {
+        "palavras": ['jogo', 'game', 'playstation', 'xbox', 'steam', 'nintendo'],
+        "cor": "#8b5cf6",
+        "emoji": "🎮"
+    },
+    "Lazer - Esportes": {
+        "palavras": ['academia', 'ginásio', 'esporte', 'natação', 'futebol', 'personal trainer'],
+        "cor": "#10b981",
+        "emoji": "🏋️"
+    },
+
+    # 💼 TRABALHO
+    "Trabalho - Material": {
+        "palavras": ['material', 'escritório', 'caneta', 'papel', 'impressão', 'toner'],
+        "cor": "#6b7280",
+        "emoji": "📎"
+    },
+    "Trabalho - Software": {
+        "palavras": ['software', 'assinatura', 'licença', 'app', 'aplicativo', 'programa'],
+        "cor": "#3b82f6",
+        "emoji": "💻"
+    },
+    "Trabalho - Telefone": {
+        "palavras": ['telefone', 'celular empresa', 'recarga', 'plano empresarial'],
+        "cor": "#10b981",
+        "emoji": "📞"
+    },
+
+    # 🧑‍⚕️ SAÚDE
+    "Saúde - Consulta": {
+        "palavras": ['consulta', 'médico', 'dentista', 'psicólogo', 'terapia', 'clínica'],
+        "cor": "#10b981",
+        "emoji": "🏥"
+    },
+    "Saúde - Medicamento": {
+        "palavras": ['remédio', 'medicamento', 'farmacia', 'drogaria'],
+        "cor": "#ef4444",
+        "emoji": "💊"
+    },
+    "Saúde - Plano": {
+        "palavras": ['plano de saúde', 'unimed', 'amil', 'sulamerica'],
+        "cor": "#dc2626",
+        "emoji": "❤️"
+    },
+
+    # 🧾 FINANÇAS
+    "Finanças - Taxa Bancária": {
+        "palavras": ['taxa', 'tarifa', 'anuidade', 'banco', 'cartão', 'empréstimo'],
+        "cor": "#059669",
+        "emoji": "🏦"
+    },
+    "Finanças - Investimento": {
+        "palavras": ['investimento', 'ações', 'fii', 'tesouro', 'cdb', 'bolsa'],
+        "cor": "#84cc16",
+        "emoji": "📈"
+    },
+    "Finanças - Seguro": {
+        "palavras": ['seguro', 'apólice', 'previdência', 'resgate'],
+        "cor": "#3b82f6",
+        "emoji": "🛡️"
+    },
+
+    # 👨‍👩‍👧‍👦 FAMÍLIA
+    "Família - Filhos": {
+        "palavras": ['creche', 'escola', 'material escolar', 'uniforme', 'curso', 'aula'],
+        "cor": "#f472b6",
+        "emoji": "👶"
+    },
+    "Família - Pets": {
+        "palavras": ['pet', 'veterinário', 'ração', 'gato', 'cachorro', 'animal'],
+        "cor": "#f59e0b",
+        "emoji": "🐕"
+    },
+    "Família - Eventos": {
+        "palavras": ['festa', 'casamento', 'formatura', 'comemoração', 'confraternização'],
+        "cor": "#8b5cf6",
+        "emoji": "🎉"
+    },
+
+    # 💰 OUTROS
+    "Outros - Assinaturas": {
+        "palavras": ['assinatura', 'streaming', 'spotify', 'youtube premium'],
+        "cor": "#6b7280",
+        "emoji": "🎫"
+    },
+    "Outros - Variados": {
+        "palavras": [],
+        "cor": "#9ca3af",
+        "emoji": "📝"
+    }
+}
+
+
+# 📊 Subcategorias da análise por categoria (aba Categorias)
+PALAVRAS_CHAVE_DETALHADAS = {
+    "🍔 Alimentação - Restaurante": ['restaurante', 'lanche', 'fast food', 'pizza', 'hamburguer'],
+    "🍎 Alimentação - Supermercado": ['mercado', 'supermercado', 'atacadão'],
+    "☕ Alimentação - Café": ['café', 'cafeteria', 'starbucks', 'padaria'],
+    "🥩 Alimentação - Açougue": ['açougue', 'carnes', 'frango', 'peixe'],
+    "🍎 Alimentação - Hortifruti": ['feira', 'hortifruti', 'fruta', 'legume'],
+    "🚗 Transporte - Combustível": ['gasolina', 'combustível', 'posto'],
+    "🚕 Transporte - Táxi/Uber": ['uber', 'táxi', '99', 'cabify'],
+    "🚌 Transporte - Público": ['ônibus', 'metro', 'trem', 'bilhete'],
+    "🅿️ Transporte - Estacionamento": ['estacionamento', 'parking', 'garagem'],
+    "🛠️ Transporte - Manutenção": ['oficina', 'mecânico', 'troca de óleo'],
+    "🏠 Casa - Aluguel": ['aluguel', 'condomínio', 'iptu'],
+    "💡 Casa - Energia": ['luz', 'energia', 'conta de luz'],
+    "💧 Casa - Água": ['água', 'conta de água', 'sabesp'],
+    "🔥 Casa - Gás": ['gás', 'botijão', 'gás natural'],
+    "📡 Casa - Internet/TV": ['internet', 'net', 'claro', 'vivo'],
+    "🛍️ Compras - Roupas": ['roupa', 'calçado', 'sapato', 'tenis'],
+    "📱 Compras - Eletrônicos": ['celular', 'notebook', 'tablet', 'tv'],
+    "💄 Compras - Beleza": ['farmácia', 'drogaria', 'perfume', 'maquiagem'],
+    "📚 Compras - Livros": ['livro', 'revista', 'jornal', 'leitura'],
+    "🎁 Compras - Presentes": ['presente', 'aniversário', 'natal'],
+    "🎬 Lazer - Cinema": ['cinema', 'filme', 'ingresso', 'netflix'],
+    "🍻 Lazer - Bar": ['bar', 'boteco', 'cerveja', 'drink'],
+    "✈️ Lazer - Viagem": ['viagem', 'hotel', 'passagem', 'turismo'],
+    "🎮 Lazer - Games": ['jogo', 'game', 'playstation', 'xbox'],
+    "🏋️ Lazer - Esportes": ['academia', 'ginásio', 'esporte', 'natação'],
+    "💼 Trabalho - Material": ['material', 'escritório', 'caneta', 'papel'],
+    "💻 Trabalho - Software": ['software', 'assinatura', 'licença', 'app'],
+    "📞 Trabalho - Telefone": ['telefone', 'celular empresa', 'recarga'],
+    "🏥 Saúde - Consulta": ['consulta', 'médico', 'dentista', 'psicólogo'],
+    "💊 Saúde - Medicamento": ['remédio', 'medicamento', 'farmacia'],
+    "❤️ Saúde - Plano": ['plano de saúde', 'unimed', 'amil'],
+    "🏦 Finanças - Taxa Bancária": ['taxa', 'tarifa', 'anuidade', 'banco'],
+    "📊 Finanças - Investimento": ['investimento', 'ações', 'fii', 'tesouro'],
+    "🧾 Finanças - Seguro": ['seguro', 'apólice', 'previdência'],
+    "👶 Família - Filhos": ['creche', 'escola', 'material escolar', 'uniforme'],
+    "🐕 Família - Pets": ['pet', 'veterinário', 'ração', 'gato'],
+    "🎉 Família - Eventos": ['festa', 'casamento', 'formatura', 'comemoração'],
+    "🎫 Outros - Assinaturas": ['assinatura', 'streaming', 'spotify', 'youtube'],
+    "📝 Outros - Variados": []
+}
+
+
+# 🗂️ Hierarquia categoria principal → subcategorias (com cores)
+CATEGORIAS_HIERARQUICAS = {
+    "🍔 Alimentação": {
+        "subcategorias": {
+            "🍔 Alimentação - Restaurante": "#ef4444",
+            "🍎 Alimentação - Supermercado": "#dc2626",
+            "☕ Alimentação - Café": "#92400e",
+            "🥩 Alimentação - Açougue": "#b91c1c",
+            "🍎 Alimentação - Hortifruti": "#16a34a"
+        },
+        "cor": "#ef4444"
+    },
+    "🚗 Transporte": {
+        "subcategorias": {
+            "🚗 Transporte - Combustível": "#3b82f6",
+            "🚕 Transporte - Táxi/Uber": "#1d4ed8",
+            "🚌 Transporte - Público": "#1e40af",
+            "🅿️ Transporte - Estacionamento": "#0ea5e9",
+            "🛠️ Transporte - Manutenção": "#6366f1"
+        },
+        "cor": "#3b82f6"
+    },
+    "🏠 Casa": {
+        "subcategorias": {
+            "🏠 Casa - Aluguel": "#8b5cf6",
+            "💡 Casa - Energia": "#f59e0b",
+            "💧 Casa - Água": "#0ea5e9",
+            "🔥 Casa - Gás": "#ef4444",
+            "📡 Casa - Internet/TV": "#8b5cf6"
+        },
+        "cor": "#8b5cf6"
+    },
+    "🛒 Compras": {
+        "subcategorias": {
+            "🛍️ Compras - Roupas": "#ec4899",
+            "📱 Compras - Eletrônicos": "#6b7280",
+            "💄 Compras - Beleza": "#f472b6",
+            "📚 Compras - Livros": "#84cc16",
+            "🎁 Compras - Presentes": "#a855f7"
+        },
+        "cor": "#ec4899"
+    },
+    "🎯 Lazer": {
+        "subcategorias": {
+            "🎬 Lazer - Cinema": "#a78bfa",
+            "🍻 Lazer - Bar": "#f59e0b",
+            "✈️ Lazer - Viagem": "#3b82f6",
+            "🎮 Lazer - Games": "#8b5cf6",
+            "🏋️ Lazer - Esportes": "#10b981"
+        },
+        "cor": "#a78bfa"
+    },
+    "🧑‍⚕️ Saúde": {
+        "subcategorias": {
+            "🏥 Saúde - Consulta": "#10b981",
+            "💊 Saúde - Medicamento": "#ef4444",
+            "❤️ Saúde - Plano": "#dc2626"
+        },
+        "cor": "#10b981"
+    },
+    "💼 Trabalho": {
+        "subcategorias": {
+            "💼 Trabalho - Material": "#6b7280",
+            "💻 Trabalho - Software": "#3b82f6",
+            "📞 Trabalho - Telefone": "#10b981"
+        },
+        "cor": "#6b7280"
+    },
+    "🧾 Finanças": {
+        "subcategorias": {
+            "🏦 Finanças - Taxa Bancária": "#059669",
+            "📊 Finanças - Investimento": "#84cc16",
+            "🧾 Finanças - Seguro": "#3b82f6"
+        },
+        "cor": "#059669"
+    },
+    "👨‍👩‍👧‍👦 Família": {
+        "subcategorias": {
+            "👶 Família - Filhos": "#f472b6",
+            "🐕 Família - Pets": "#f59e0b",
+            "🎉 Família - Eventos": "#8b5cf6"
+        },
+        "cor": "#f472b6"
+    },
+    "💰 Outros": {
+        "subcategorias": {
+            "🎫 Outros - Assinaturas": "#6b7280",
+            "📝 Outros - Variados": "#9ca3af"
+        },
+        "cor": "#6b7280"
+    }
+}
+
+# Subcategoria → categoria principal
+CATEGORIA_PRINCIPAL = {
+    subcategoria: principal
+    for principal, info in CATEGORIAS_HIERARQUICAS.items()
+    for subcategoria in info["subcategorias"]
+}
+
+
+CATEGORIZADOR_CARD = Categorizador(
+    {nome: info["palavras"] for nome, info in CATEGORIAS_DETALHADAS.items()},
+    padrao="Outros - Variados"
+)
+CATEGORIZADOR_ANALISE = Categorizador(PALAVRAS_CHAVE_DETALHADAS, padrao="📝 Outros - Variados")
+
+
+# =========================================================
+# CATEGORIA PERSISTIDA EM CONTROLE_GASTOS
+# =========================================================
+
+COLUNAS_CATEGORIA = ("categoria_principal", "subcategoria")
+
+
+def categorizar_gastos(df, anteriores=None):
+    """
+    Preenche (no próprio DataFrame) as colunas categoria_principal e
+    subcategoria de controle_gastos, classificando só as linhas que
+    precisam. Sem `anteriores` (save completo): linhas sem categoria.
+    Com `anteriores` ({id: registro persistido}): só linhas novas ou com a
+    descrição alterada — linhas antigas ainda nulas no banco não são
+    reclassificadas em massa (a tela as classifica na leitura).
+    """
+    if df is None or "descricao" not in df.columns:
+        return df
+
+    for coluna in COLUNAS_CATEGORIA:
+        if coluna not in df.columns:
+            df[coluna] = None
+
+    if anteriores is None:
+        pendentes = df["subcategoria"].isna() | df["categoria_principal"].isna()
+    else:
+        ids = df["id"] if "id" in df.columns else pd.Series(None, index=df.index, dtype=object)
+        descricao_anterior = ids.map(
+            lambda row_id: anteriores.get(row_id, {}).get("descricao") if pd.notna(row_id) else None
+        )
+        pendentes = ~ids.isin(list(anteriores)) | (df["descricao"] != descricao_anterior)
+
+    if pendentes.any():
+        subcategorias = CATEGORIZADOR_ANALISE.classificar_serie(df.loc[pendentes, "descricao"])
+        df.loc[pendentes, "subcategoria"] = subcategorias
+        df.loc[pendentes, "categoria_principal"] = subcategorias.map(CATEGORIA_PRINCIPAL)
+
+    return df
@@ -0,0 +1,124 @@
+import re
+from collections import defaultdict
+
+import pandas as pd
+
+
+# =========================================================
+# CUBO MENSAL (SOMA/CONTAGEM POR MÊS x DIMENSÕES)
+# =========================================================
+
+_MES_ISO = re.compile(r"^(\d{4})-(\d{2})")
+
+
+def mes_do_registro(valor):
+    """'YYYY-MM' de uma data (texto ISO, date, Timestamp) ou None"""
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        encontrado = _MES_ISO.match(valor)
+        if encontrado:
+            return f"{encontrado.group(1)}-{encontrado.group(2)}"
+    data = pd.to_datetime(valor, errors="coerce", dayfirst=isinstance(valor, str))
+    return None if pd.isna(data) else data.strftime("%Y-%m")
+
+
+class CuboMensal:
+    """
+    Agregado em memória de uma tabela de lançamentos: para cada
+    (mês, *dimensões) guarda soma de `valor` e quantidade de linhas.
+
+    É montado uma vez a partir dos registros carregados e depois mantido
+    por deltas (adicionar/remover registro) a cada insert, update e delete
+    confirmados, então cards e gráficos mensais leem O(células) em vez de
+    varrer todos os lançamentos.
+
+    `resumo` traz células já agregadas de meses que não foram carregados
+    (ex.: fora da janela MESES_CARREGADOS), para os totais de todos os
+    meses continuarem corretos.
+    """
+
+    def __init__(self, dimensoes, registros=(), resumo=()):
+        self.dimensoes = tuple(dimensoes)
+        self._celulas = defaultdict(lambda: [0.0, 0])
+        for linha in resumo:
+            self.adicionar_resumo(linha)
+        for registro in registros:
+            self.adicionar(registro)
+
+    def _chave(self, registro):
+        chave = [mes_do_registro(registro.get("data"))]
+        for dimensao in self.dimensoes:
+            valor = registro.get(dimensao)
+            if isinstance(valor, str):
+                valor = valor.strip()
+                if dimensao == "tipo":
+                    valor = valor.title()
+            chave.append(valor if valor not in ("", None) else None)
+        return tuple(chave)
+
+    @staticmethod
+    def _valor(registro):
+        try:
+            valor = float(registro.get("valor") or 0)
+        except (TypeError, ValueError):
+            return 0.0
+        return 0.0 if pd.isna(valor) else valor
+
+    def adicionar(self, registro, sinal=1):
+        chave = self._chave(registro)
+        celula = self._celulas[chave]
+        celula[0] += sinal * self._valor(registro)
+        celula[1] += sinal
+
+        if celula[1] <= 0:
+            del self._celulas[chave]
+
+    def remover(self, registro):
+        self.adicionar(registro, sinal=-1)
+
+    def adicionar_resumo(self, linha):
+        """Célula agregada: {mes, *dimensões, valor, quantidade}"""
+        quantidade = int(linha.get("quantidade") or 0)
+        if quantidade <= 0:
+            return
+        # NaN (groupby do agregado no cliente) conta como dimensão vazia
+        linha = {k: (None if isinstance(v, float) and pd.isna(v) else v) for k, v in linha.items()}
+        celula = self._celulas[self._chave({**linha, "data": linha.get("mes")})]
+        celula[0] += self._valor(linha)
+        celula[1] += quantidade
+
+    def _filtrar(self, mes, filtros):
+        posicoes = {d: i + 1 for i, d in enumerate(self.dimensoes)}
+        for chave, (soma, qtd) in self._celulas.items():
+            if mes is not None and chave[0] != mes:
+                continue
+            if any(chave[posicoes[d]] != v for d, v in filtros.items()):
+                continue
+            yield chave, soma, qtd
+
+    def soma(self, mes=None, **filtros):
+        """Soma de valor no mês (ou em todos), opcionalmente filtrada por dimensão"""
+        return sum(soma for _, soma, _ in self._filtrar(mes, filtros))
+
+    def contagem(self, mes=None, **filtros):
+        return sum(qtd for _, _, qtd in self._filtrar(mes, filtros))
+
+    def meses(self):
+        return sorted({chave[0] for chave in self._celulas if chave[0] is not None})
+
+    def totais(self, por=("mes",), mes=None, **filtros):
+        """
+        DataFrame com colunas <por...>, valor e quantidade, agregado a partir
+        das células (não dos lançamentos).
+        """
+        colunas = ("mes",) + self.dimensoes
+        linhas = [
+            dict(zip(colunas, chave), valor=soma, quantidade=qtd)
+            for chave, soma, qtd in self._filtrar(mes, filtros)
+        ]
+        if not linhas:
+            return pd.DataFrame(columns=list(por) + ["valor", "quantidade"])
+
+        df = pd.DataFrame(linhas)
+        return df.groupby(list(por), dropna=False)[["valor", "quantidade"]].sum().reset_index()
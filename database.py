@@ -1,6 +1,877 @@
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import date
+
+import httpx
+import numpy as np
 import streamlit as st
 import pandas as pd
+from dateutil.relativedelta import relativedelta
 from supabase import create_client
+from postgrest.exceptions import APIError
+
+from categorizador import COLUNAS_CATEGORIA, categorizar_gastos
+from cubo import CuboMensal
+
+
+# ===============================
+# POOL DE CLIENTES SUPABASE
+# ===============================
+class SupabasePool:
+    """
+    Pool limitado e thread-safe de clientes Supabase.
+
+    Uma única instância vive por processo do servidor Streamlit, então
+    sessões e reruns reaproveitam a mesma conexão keep-alive em vez de
+    abrir um cliente (e um handshake TLS) a cada clique.
+    """
+
+    def __init__(self, factory, max_size=8, max_idle=300, timeout=30):
+        self._factory = factory
+        self._max_size = max_size
+        self._max_idle = max_idle
+        self._timeout = timeout
+
+        self._livres = []  # [(client, ultimo_uso)]
+        self._total = 0
+        self._cond = threading.Condition()
+
+        self._abertas = 0
+        self._reutilizadas = 0
+        self._descartadas = 0
+
+    def _saudavel(self, ultimo_uso):
+        # Conexões ociosas por muito tempo já tiveram o keep-alive derrubado
+        return (time.monotonic() - ultimo_uso) < self._max_idle
+
+    @staticmethod
+    def _fechar(clients):
+        """Fecha a sessão HTTP (postgrest) dos clientes descartados"""
+        for client in clients:
+            try:
+                client.postgrest.aclose()
+            except Exception:
+                # Cliente já quebrado: não há mais o que liberar
+                pass
+
+    def acquire(self):
+        deadline = time.monotonic() + self._timeout
+        vencidos = []
+
+        try:
+            with self._cond:
+                while True:
+                    while self._livres:
+                        client, ultimo_uso = self._livres.pop()
+                        if self._saudavel(ultimo_uso):
+                            self._reutilizadas += 1
+                            return client
+                        self._total -= 1
+                        self._descartadas += 1
+                        vencidos.append(client)
+
+                    if self._total < self._max_size:
+                        self._total += 1
+                        break
+
+                    restante = deadline - time.monotonic()
+                    if restante <= 0:
+                        raise TimeoutError("Pool de conexões Supabase esgotado.")
+                    self._cond.wait(restante)
+        finally:
+            # Fechamento fora do lock: pode esperar pela rede
+            self._fechar(vencidos)
+
+        # Criação fora do lock: não bloqueia quem só quer reutilizar
+        try:
+            client = self._factory()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._abertas += 1
+
+        return client
+
+    def release(self, client, saudavel=True):
+        with self._cond:
+            # Nunca guarda mais ociosos que o tamanho do pool
+            guardar = saudavel and len(self._livres) < self._max_size
+            if guardar:
+                self._livres.append((client, time.monotonic()))
+            else:
+                self._total -= 1
+                self._descartadas += 1
+            self._cond.notify()
+
+        if not guardar:
+            self._fechar([client])
+
+    @contextmanager
+    def connection(self):
+        client = self.acquire()
+        saudavel = True
+        try:
+            yield client
+        except APIError:
+            # Erro de negócio do PostgREST: a conexão continua válida
+            raise
+        except Exception:
+            # Erro de rede/transporte: descarta o cliente
+            saudavel = False
+            raise
+        finally:
+            self.release(client, saudavel)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "abertas": self._abertas,
+                "reutilizadas": self._reutilizadas,
+                "descartadas": self._descartadas,
+                "em_uso": self._total - len(self._livres),
+                "livres": len(self._livres),
+                "max_size": self._max_size,
+            }
+
+
+# ===============================
+# CACHE DE LEITURA (POR PROCESSO)
+# ===============================
+class TableCache:
+    """
+    Cache de leituras compartilhado entre sessões do mesmo processo.
+
+    Chave: (usuario, tabela, versão, variante). A versão de (usuario, tabela)
+    é incrementada a cada escrita, então entradas antigas ficam inacessíveis
+    na hora e saem pelo LRU. Os registros guardados nunca são alterados.
+    """
+
+    def __init__(self, ttl=300, max_entries=256):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entradas = OrderedDict()  # chave -> (expira_em, registros)
+        self._versoes = {}
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def _chave(self, usuario, tabela, variante):
+        return (usuario, tabela, self._versoes.get((usuario, tabela), 0), variante)
+
+    def get(self, usuario, tabela, variante=None):
+        with self._lock:
+            chave = self._chave(usuario, tabela, variante)
+            entrada = self._entradas.get(chave)
+
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    del self._entradas[chave]
+                self._misses += 1
+                return None
+
+            self._entradas.move_to_end(chave)
+            self._hits += 1
+            return entrada[1]
+
+    def put(self, usuario, tabela, registros, variante=None, versao=None):
+        with self._lock:
+            # Escrita concorrente durante a leitura: não guarda dado velho
+            if versao is not None and versao != self._versoes.get((usuario, tabela), 0):
+                return
+
+            self._entradas[self._chave(usuario, tabela, variante)] = (
+                time.monotonic() + self._ttl,
+                registros
+            )
+            self._entradas.move_to_end(self._chave(usuario, tabela, variante))
+
+            while len(self._entradas) > self._max_entries:
+                self._entradas.popitem(last=False)
+                self._evictions += 1
+
+    def version(self, usuario, tabela):
+        with self._lock:
+            return self._versoes.get((usuario, tabela), 0)
+
+    def invalidate(self, usuario, tabela):
+        with self._lock:
+            self._versoes[(usuario, tabela)] = self._versoes.get((usuario, tabela), 0) + 1
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "entradas": len(self._entradas),
+            }
+
+
+# ===============================
+# ESCRITA EM MASSA (LOTES + RETRY)
+# ===============================
+# Erros em que a requisição comprovadamente não chegou a ser aplicada
+_ERROS_NAO_ENVIADOS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# PostgREST sem conexão com o banco / statement timeout
+_CODIGOS_TRANSITORIOS = {"PGRST000", "PGRST001", "PGRST002", "PGRST003", "57014"}
+
+
+class BulkWriter:
+    """
+    Grava muitos registros em lotes limitados por bytes e por linhas,
+    com concorrência limitada e retry com backoff exponencial.
+
+    Retries são idempotentes: upserts repetem em qualquer erro transitório;
+    inserts só repetem quando o erro garante que nada foi gravado.
+    """
+
+    def __init__(
+        self,
+        tabela,
+        max_bytes=512_000,
+        max_rows=1000,
+        max_workers=3,
+        max_tentativas=4,
+        backoff=0.5
+    ):
+        self.tabela = tabela
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.max_workers = max_workers
+        self.max_tentativas = max_tentativas
+        self.backoff = backoff
+        self.stats = {}
+
+    def _lotes(self, registros):
+        lote, tamanho = [], 0
+        for registro in registros:
+            bytes_registro = len(json.dumps(registro, default=str)) + 1
+            if lote and (
+                tamanho + bytes_registro > self.max_bytes
+                or len(lote) >= self.max_rows
+            ):
+                yield lote, tamanho
+                lote, tamanho = [], 0
+            lote.append(registro)
+            tamanho += bytes_registro
+        if lote:
+            yield lote, tamanho
+
+    @staticmethod
+    def _transitorio(erro, idempotente):
+        if isinstance(erro, _ERROS_NAO_ENVIADOS):
+            return True
+        if isinstance(erro, APIError):
+            return getattr(erro, "code", None) in _CODIGOS_TRANSITORIOS
+        return idempotente and isinstance(erro, httpx.TransportError)
+
+    def _enviar(self, lote, on_conflict):
+        idempotente = on_conflict is not None
+        tentativa = 0
+
+        while True:
+            tentativa += 1
+            try:
+                with DatabaseManager._connection() as supabase:
+                    tabela = supabase.table(self.tabela)
+                    if idempotente:
+                        res = tabela.upsert(lote, on_conflict=on_conflict).execute()
+                    else:
+                        res = tabela.insert(lote).execute()
+                return res.data or [], tentativa
+            except Exception as e:
+                if tentativa >= self.max_tentativas or not self._transitorio(e, idempotente):
+                    raise
+                time.sleep(self.backoff * (2 ** (tentativa - 1)))
+
+    def _desfazer(self, linhas, por_requisicao=500):
+        """
+        Remove (por id) as linhas inseridas por um write que falhou no
+        meio. Delete por id é idempotente: repete em erro transitório.
+        """
+        ids = [linha["id"] for linha in linhas if linha.get("id") is not None]
+        for inicio in range(0, len(ids), por_requisicao):
+            parte = ids[inicio:inicio + por_requisicao]
+            tentativa = 0
+            while True:
+                tentativa += 1
+                try:
+                    with DatabaseManager._connection() as supabase:
+                        supabase.table(self.tabela).delete().in_("id", parte).execute()
+                    break
+                except Exception as e:
+                    if tentativa >= self.max_tentativas or not self._transitorio(e, True):
+                        raise
+                    time.sleep(self.backoff * (2 ** (tentativa - 1)))
+
+    def write(self, registros, on_conflict=None):
+        """
+        Insere (ou faz upsert, se on_conflict) todos os registros.
+        Retorna as linhas gravadas na mesma ordem dos registros.
+
+        Se algum lote de insert falhar de vez, as linhas que os outros
+        lotes já gravaram são removidas antes de repassar o erro (senão a
+        tabela ficaria com o conteúdo antigo mais parte do novo).
+        """
+        inicio = time.perf_counter()
+        lotes = list(self._lotes(registros))
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(self.max_workers, len(lotes))),
+            thread_name_prefix=f"bulk_{self.tabela}"
+        ) as executor:
+            futures = [
+                executor.submit(self._enviar, lote, on_conflict)
+                for lote, _ in lotes
+            ]
+            respostas, erro = [], None
+            for future in futures:
+                try:
+                    respostas.append(future.result())
+                except Exception as e:
+                    erro = erro or e
+
+        if erro is not None:
+            if on_conflict is None:
+                try:
+                    self._desfazer([linha for linhas, _ in respostas for linha in linhas])
+                except Exception:
+                    # Limpeza também falhou: repassa o erro original (o da
+                    # limpeza fica em __context__)
+                    raise erro
+            raise erro
+
+        segundos = max(time.perf_counter() - inicio, 1e-9)
+        total_bytes = sum(tamanho for _, tamanho in lotes)
+
+        self.stats = {
+            "linhas": len(registros),
+            "bytes": total_bytes,
+            "lotes": len(lotes),
+            "tentativas": sum(t for _, t in respostas),
+            "segundos": segundos,
+            "linhas_por_s": len(registros) / segundos,
+            "bytes_por_s": total_bytes / segundos,
+        }
+
+        return [linha for linhas, _ in respostas for linha in linhas]
+
+
+# ===============================
+# LOTE DE ESCRITA (TRANSAÇÃO ÚNICA)
+# ===============================
+class WriteBatch:
+    """
+    Acumula mutações de várias tabelas e grava tudo em uma única chamada
+    à RPC `aplicar_mutacoes` (supabase/migrations), que roda em uma só
+    transação no Postgres.
+    """
+
+    RPC = "aplicar_mutacoes"
+
+    # Acima disso o lote não cabe em uma requisição: grava em partes
+    MAX_RPC_BYTES = 1_000_000
+
+    # Sem a migration aplicada, cai para chamadas separadas (não atômicas)
+    _rpc_disponivel = True
+
+    def __init__(self, usuario):
+        self.usuario = usuario
+        self._mutacoes = []
+        self._callbacks = []
+        self._resultados = None
+
+    def _add(self, mutacao):
+        self._mutacoes.append(mutacao)
+        return len(self._mutacoes) - 1
+
+    def insert(self, tabela, registros):
+        return self._add({"tabela": tabela, "op": "insert", "registros": registros})
+
+    def update(self, tabela, registros):
+        return self._add({"tabela": tabela, "op": "update", "registros": registros})
+
+    def upsert(self, tabela, registros, on_conflict):
+        return self._add({
+            "tabela": tabela,
+            "op": "upsert",
+            "registros": registros,
+            "on_conflict": list(on_conflict)
+        })
+
+    def delete(self, tabela, ids):
+        return self._add({"tabela": tabela, "op": "delete", "ids": list(ids)})
+
+    def delete_all(self, tabela):
+        return self._add({"tabela": tabela, "op": "delete_all"})
+
+    def on_commit(self, callback):
+        self._callbacks.append(callback)
+
+    def result(self, indice):
+        return self._resultados[indice] or []
+
+    def commit(self):
+        if not self._mutacoes:
+            return []
+
+        journal = DatabaseManager._get_journal()
+        if journal is None:
+            return self.commit_remote()
+
+        # Offline-first: grava local e devolve na hora; o syncer envia depois
+        self._resultados = journal.append(self.usuario, self._mutacoes)
+        self._invalidate_cache()
+
+        for callback in self._callbacks:
+            callback()
+
+        return self._resultados
+
+    def _invalidate_cache(self):
+        # Write-through: qualquer tabela tocada deixa de valer no cache
+        cache = DatabaseManager._get_cache()
+        for tabela in {m["tabela"] for m in self._mutacoes}:
+            cache.invalidate(self.usuario, tabela)
+
+    def commit_remote(self):
+        if not self._mutacoes:
+            return []
+
+        try:
+            self._executar()
+        finally:
+            self._invalidate_cache()
+
+        for callback in self._callbacks:
+            callback()
+
+        return self._resultados
+
+    def _executar(self):
+        tamanho = len(json.dumps(self._mutacoes, default=str))
+        if tamanho <= self.MAX_RPC_BYTES and WriteBatch._rpc_disponivel:
+            with DatabaseManager._connection() as supabase:
+                try:
+                    res = supabase.rpc(self.RPC, {
+                        "p_usuario": self.usuario,
+                        "p_mutacoes": self._mutacoes
+                    }).execute()
+                    self._resultados = res.data
+                    return
+                except APIError as e:
+                    # PGRST202: função não encontrada no schema cache
+                    if getattr(e, "code", None) != "PGRST202":
+                        raise
+                    WriteBatch._rpc_disponivel = False
+
+        # Lote grande demais ou sem a RPC: em partes, sem nunca esvaziar a
+        # tabela antes de o novo conteúdo estar gravado
+        self._executar_em_partes()
+
+    def _executar_em_partes(self):
+        """
+        Lote grande demais para uma requisição (ou sem a RPC): uma
+        requisição por mutação/lote. Deixa de ser atômico, mas nunca apaga
+        antes de inserir (delete_all + insert vira insert + delete_except).
+        """
+        self._resultados = []
+        i = 0
+
+        while i < len(self._mutacoes):
+            m = self._mutacoes[i]
+            seguinte = self._mutacoes[i + 1] if i + 1 < len(self._mutacoes) else None
+
+            if (
+                m["op"] == "delete_all"
+                and seguinte is not None
+                and seguinte["op"] == "insert"
+                and seguinte["tabela"] == m["tabela"]
+            ):
+                # Substituição: insere o novo conteúdo e só então remove o antigo
+                inseridos = BulkWriter(m["tabela"]).write(seguinte["registros"])
+                self._run_single({
+                    "tabela": m["tabela"],
+                    "op": "delete_except",
+                    "ids": [r["id"] for r in inseridos]
+                })
+                self._resultados += [None, inseridos]
+                i += 2
+                continue
+
+            if m["op"] == "insert":
+                resultado = BulkWriter(m["tabela"]).write(m["registros"])
+            elif m["op"] == "update":
+                # Update de verdade (nunca upsert): linha apagada em outro
+                # dispositivo não volta e não entra no resultado
+                resultado = []
+                for lote, _ in BulkWriter(m["tabela"])._lotes(m["registros"]):
+                    resultado += self._run_single({**m, "registros": lote}) or []
+            elif m["op"] == "upsert":
+                on_conflict = ",".join(m["on_conflict"])
+                resultado = BulkWriter(m["tabela"]).write(m["registros"], on_conflict)
+            elif m["op"] == "delete":
+                resultado = 0
+                for inicio in range(0, len(m["ids"]), 500):
+                    resultado += self._run_single({**m, "ids": m["ids"][inicio:inicio + 500]}) or 0
+            else:
+                resultado = self._run_single(m)
+
+            self._resultados.append(resultado)
+            i += 1
+
+    def _run_single(self, m):
+        with DatabaseManager._connection() as supabase:
+            if WriteBatch._rpc_disponivel:
+                try:
+                    return supabase.rpc(self.RPC, {
+                        "p_usuario": self.usuario,
+                        "p_mutacoes": [m]
+                    }).execute().data[0]
+                except APIError as e:
+                    if getattr(e, "code", None) != "PGRST202":
+                        raise
+                    WriteBatch._rpc_disponivel = False
+            return self._apply(supabase, m)
+
+    def _apply(self, supabase, m):
+        tabela = supabase.table(m["tabela"])
+
+        if m["op"] == "insert":
+            return tabela.insert(m["registros"]).execute().data
+        if m["op"] == "update":
+            # Como a RPC: só altera linhas que ainda existem e são do usuário,
+            # e devolve só as que casaram (as demais viram conflito)
+            atualizados = []
+            for registro in m["registros"]:
+                valores = {k: v for k, v in registro.items() if k != "id"}
+                res = tabela.update(valores) \
+                    .eq("id", registro["id"]) \
+                    .eq("usuario", self.usuario) \
+                    .execute()
+                atualizados.extend(res.data or [])
+            return atualizados
+        if m["op"] == "upsert":
+            return tabela.upsert(
+                m["registros"],
+                on_conflict=",".join(m["on_conflict"])
+            ).execute().data
+        # Deletes devolvem quantas linhas o banco removeu (como a RPC), não
+        # quantos ids foram pedidos: a detecção de conflito depende disso
+        if m["op"] == "delete":
+            return self._contagem(
+                tabela.delete(count="exact", returning="minimal")
+                .eq("usuario", self.usuario)
+                .in_("id", m["ids"])
+                .execute()
+            )
+        if m["op"] == "delete_all":
+            return self._contagem(
+                tabela.delete(count="exact", returning="minimal")
+                .eq("usuario", self.usuario)
+                .execute()
+            )
+        if m["op"] == "delete_except":
+            return self._contagem(
+                tabela.delete(count="exact", returning="minimal")
+                .eq("usuario", self.usuario)
+                .not_.in_("id", m["ids"])
+                .execute()
+            )
+
+        raise ValueError(f"Operação inválida: {m['op']}")
+
+    @staticmethod
+    def _contagem(res):
+        if res.count is not None:
+            return res.count
+        return len(res.data or [])
+
+
+# ===============================
+# JOURNAL LOCAL (OFFLINE-FIRST)
+# ===============================
+class WriteJournal:
+    """
+    Journal append-only em SQLite para gravações offline-first.
+
+    O save grava as mutações aqui (fsync local) e volta na hora para a UI;
+    uma thread em segundo plano envia as entradas ao Supabase na ordem em
+    que foram registradas. Linhas inseridas recebem ids temporários
+    negativos, trocados pelos ids reais (tabela id_map) quando sincronizadas.
+    """
+
+    # Espaço de ids temporários por entrada do journal
+    _IDS_POR_ENTRADA = 1_000_000
+
+    def __init__(self, caminho, intervalo=1.0, max_backoff=60.0):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+        self.ultimo_erro = None
+
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+        with self._conectar() as con:
+            con.executescript("""
+                create table if not exists mutacoes (
+                    seq integer primary key autoincrement,
+                    usuario text not null,
+                    payload text not null,
+                    status text not null default 'pendente',
+                    tentativas integer not null default 0,
+                    erro text,
+                    criado_em real not null
+                );
+                create table if not exists id_map (
+                    tabela text not null,
+                    tmp_id integer not null,
+                    real_id text not null,
+                    primary key (tabela, tmp_id)
+                );
+                create table if not exists conflitos (
+                    seq integer not null,
+                    tabela text not null,
+                    op text not null,
+                    detalhe text,
+                    criado_em real not null
+                );
+            """)
+
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho, timeout=30)
+        con.execute("pragma journal_mode=wal")
+        con.execute("pragma synchronous=full")
+        return con
+
+    # ---------- ESCRITA LOCAL ----------
+    def append(self, usuario, mutacoes):
+        """
+        Registra as mutações e devolve resultados no mesmo formato do
+        WriteBatch (inserts voltam com ids temporários).
+        """
+        with self._lock, self._conectar() as con:
+            seq = con.execute(
+                "insert into mutacoes (usuario, payload, criado_em) values (?, '[]', ?)",
+                (usuario, time.time())
+            ).lastrowid
+
+            proximo = 0
+            resultados = []
+            payload = []
+            for m in mutacoes:
+                m = dict(m)
+                if m["op"] == "insert":
+                    tmp_ids = [
+                        -(seq * self._IDS_POR_ENTRADA + proximo + k + 1)
+                        for k in range(len(m["registros"]))
+                    ]
+                    proximo += len(tmp_ids)
+                    m["tmp_ids"] = tmp_ids
+                    resultados.append([
+                        {**registro, "id": tmp_id}
+                        for registro, tmp_id in zip(m["registros"], tmp_ids)
+                    ])
+                else:
+                    resultados.append(None)
+                payload.append(m)
+
+            con.execute(
+                "update mutacoes set payload = ? where seq = ?",
+                (json.dumps(payload, default=str), seq)
+            )
+
+        self.start()
+        self._acordar.set()
+        return resultados
+
+    # ---------- SINCRONIZAÇÃO ----------
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop,
+                    name="journal_sync",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _loop(self):
+        espera = self.intervalo
+        while True:
+            self._acordar.wait(espera)
+            self._acordar.clear()
+            try:
+                while self.sync_once():
+                    pass
+                espera = self.intervalo
+                self.ultimo_erro = None
+            except Exception as e:
+                # Backend fora: tenta de novo com backoff, sem perder a ordem
+                self.ultimo_erro = str(e) or type(e).__name__
+                espera = min(max(espera * 2, self.intervalo), self.max_backoff)
+
+    def _traduzir(self, con, tabela, row_id):
+        if not isinstance(row_id, int) or row_id >= 0:
+            return row_id
+        linha = con.execute(
+            "select real_id from id_map where tabela = ? and tmp_id = ?",
+            (tabela, row_id)
+        ).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def sync_once(self):
+        """Envia a entrada pendente mais antiga. Retorna False se não há nada."""
+        with self._conectar() as con:
+            linha = con.execute(
+                "select seq, usuario, payload from mutacoes "
+                "where status = 'pendente' order by seq limit 1"
+            ).fetchone()
+        if linha is None:
+            return False
+
+        seq, usuario, payload = linha
+        mutacoes = json.loads(payload)
+        conflitos = []
+        enviar = []
+
+        with self._conectar() as con:
+            for m in mutacoes:
+                tabela = m["tabela"]
+                if m["op"] in ("update",):
+                    registros = []
+                    for r in m["registros"]:
+                        real_id = self._traduzir(con, tabela, r["id"])
+                        if real_id is None:
+                            conflitos.append((tabela, "update", f"id {r['id']} nunca sincronizado"))
+                            continue
+                        registros.append({**r, "id": real_id})
+                    if registros:
+                        enviar.append({**m, "registros": registros})
+                elif m["op"] in ("delete", "delete_except"):
+                    ids = []
+                    for tmp_id in m["ids"]:
+                        real_id = self._traduzir(con, tabela, tmp_id)
+                        if real_id is None:
+                            conflitos.append((tabela, m["op"], f"id {tmp_id} nunca sincronizado"))
+                            continue
+                        ids.append(real_id)
+                    if m["op"] == "delete_except" and len(ids) < len(m["ids"]):
+                        # Com ids a menos, apagaria linhas que deviam ficar
+                        # (com lista vazia, a tabela inteira): não envia
+                        conflitos.append((
+                            tabela, "delete_except",
+                            f"{len(m['ids']) - len(ids)} id(s) sem tradução; exclusão não enviada"
+                        ))
+                        continue
+                    if ids:
+                        enviar.append({**m, "ids": ids})
+                else:
+                    enviar.append({k: v for k, v in m.items() if k != "tmp_ids"})
+
+        lote = WriteBatch(usuario)
+        lote._mutacoes = enviar
+        try:
+            resultados = lote.commit_remote()
+        except APIError as e:
+            if getattr(e, "code", None) in _CODIGOS_TRANSITORIOS:
+                raise
+            # Erro permanente (ex.: constraint): registra e segue a fila
+            with self._conectar() as con:
+                con.execute(
+                    "update mutacoes set status = 'erro', erro = ?, "
+                    "tentativas = tentativas + 1 where seq = ?",
+                    (str(e), seq)
+                )
+            return True
+
+        # Detecção de conflito: linhas que sumiram no servidor nesse meio tempo
+        for m, resultado in zip(enviar, resultados):
+            if m["op"] == "update" and len(resultado or []) < len(m["registros"]):
+                conflitos.append((
+                    m["tabela"], "update",
+                    f"{len(m['registros']) - len(resultado or [])} linha(s) não existem mais"
+                ))
+            elif m["op"] == "delete" and (resultado or 0) < len(m["ids"]):
+                conflitos.append((
+                    m["tabela"], "delete",
+                    f"{len(m['ids']) - (resultado or 0)} linha(s) já removidas"
+                ))
+
+        with self._lock, self._conectar() as con:
+            originais = iter(m for m in mutacoes if m["op"] == "insert")
+            for m, resultado in zip(enviar, resultados):
+                if m["op"] != "insert":
+                    continue
+                original = next(originais)
+                con.executemany(
+                    "insert or replace into id_map (tabela, tmp_id, real_id) values (?, ?, ?)",
+                    [
+                        (m["tabela"], tmp_id, json.dumps(row["id"]))
+                        for tmp_id, row in zip(original["tmp_ids"], resultado or [])
+                    ]
+                )
+            con.executemany(
+                "insert into conflitos (seq, tabela, op, detalhe, criado_em) values (?, ?, ?, ?, ?)",
+                [(seq, t, op, detalhe, time.time()) for t, op, detalhe in conflitos]
+            )
+            con.execute("update mutacoes set status = 'enviado' where seq = ?", (seq,))
+
+        return True
+
+    def status(self):
+        with self._conectar() as con:
+            pendentes, erros = con.execute(
+                "select "
+                "sum(status = 'pendente'), sum(status = 'erro') "
+                "from mutacoes"
+            ).fetchone()
+            conflitos = con.execute("select count(*) from conflitos").fetchone()[0]
+
+        return {
+            "pendentes": pendentes or 0,
+            "erros": erros or 0,
+            "conflitos": conflitos,
+            "ultimo_erro": self.ultimo_erro,
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_journal = None
+_journal_lock = threading.Lock()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Versões de tabela por sessão (invalidam métricas derivadas)
+_versao_seq = itertools.count(1)
 
 
 class DatabaseManager:
@@ -9,20 +880,86 @@ class DatabaseManager:
     # CONEXÃO SUPABASE
     # ===============================
     @staticmethod
-    def _get_client():
-        return create_client(
-            st.secrets["SUPABASE_URL"],
-            st.secrets["SUPABASE_KEY"]
-        )
+    def _get_pool():
+        global _pool
+
+        if _pool is None:
+            with _pool_lock:
+                if _pool is None:
+                    _pool = SupabasePool(
+                        lambda: create_client(
+                            st.secrets["SUPABASE_URL"],
+                            st.secrets["SUPABASE_KEY"]
+                        ),
+                        max_size=int(st.secrets.get("SUPABASE_POOL_SIZE", 8))
+                    )
+
+        return _pool
+
+    @staticmethod
+    def _connection():
+        return DatabaseManager._get_pool().connection()
+
+    @staticmethod
+    def pool_stats():
+        """Contadores de conexões abertas x reutilizadas no processo"""
+        return DatabaseManager._get_pool().stats()
+
+    # ===============================
+    # CACHE COMPARTILHADO
+    # ===============================
+    @staticmethod
+    def _get_cache():
+        global _cache
+
+        if _cache is None:
+            with _cache_lock:
+                if _cache is None:
+                    _cache = TableCache(
+                        ttl=int(st.secrets.get("CACHE_TTL", 300)),
+                        max_entries=int(st.secrets.get("CACHE_MAX_ENTRIES", 256))
+                    )
+
+        return _cache
+
+    @staticmethod
+    def cache_stats():
+        """Hits/misses do cache de leitura compartilhado"""
+        return DatabaseManager._get_cache().stats()
+
+    # ===============================
+    # JOURNAL LOCAL (OPCIONAL)
+    # ===============================
+    @staticmethod
+    def _get_journal():
+        """Ativo só com JOURNAL_PATH nos secrets; sem ele o save é síncrono"""
+        global _journal
+
+        if _journal is None:
+            caminho = st.secrets.get("JOURNAL_PATH")
+            if not caminho:
+                return None
+
+            with _journal_lock:
+                if _journal is None:
+                    _journal = WriteJournal(caminho)
+                    # Entradas pendentes de uma execução anterior
+                    _journal.start()
+
+        return _journal
+
+    @staticmethod
+    def journal_status():
+        journal = DatabaseManager._get_journal()
+        return journal.status() if journal is not None else None
 
     # ===============================
     # USUÁRIOS
     # ===============================
     @staticmethod
     def load_users():
-        supabase = DatabaseManager._get_client()
-
-        res = supabase.table("usuarios").select("*").execute()
+        with DatabaseManager._connection() as supabase:
+            res = supabase.table("usuarios").select("*").execute()
 
         if not res.data:
             return pd.DataFrame(
@@ -38,8 +975,6 @@ class DatabaseManager:
 
     @staticmethod
     def create_user(usuario, nome, senha_hash, perfil):
-        supabase = DatabaseManager._get_client()
-
         payload = {
             "usuario": usuario.strip().lower(),
             "nome": nome.strip(),
@@ -48,13 +983,12 @@ class DatabaseManager:
             "ativo": "ativo"
         }
 
-        supabase.table("usuarios").insert(payload).execute()
+        with DatabaseManager._connection() as supabase:
+            supabase.table("usuarios").insert(payload).execute()
         return True
 
     @staticmethod
     def update_user(usuario, perfil=None, ativo=None):
-        supabase = DatabaseManager._get_client()
-
         data = {}
         if perfil is not None:
             data["perfil"] = perfil
@@ -62,245 +996,942 @@ class DatabaseManager:
             data["ativo"] = ativo
 
         if data:
+            with DatabaseManager._connection() as supabase:
+                supabase.table("usuarios") \
+                    .update(data) \
+                    .eq("usuario", usuario) \
+                    .execute()
+
+        return True
+
+    @staticmethod
+    def update_password(usuario, senha_hash):
+        with DatabaseManager._connection() as supabase:
             supabase.table("usuarios") \
-                .update(data) \
+                .update({"senha": senha_hash}) \
                 .eq("usuario", usuario) \
                 .execute()
 
         return True
 
+    # ===============================
+    # LOAD DADOS (POR USUÁRIO)
+    # ===============================
+    TABLES = [
+        "historico",
+        "investimentos",
+        "sonhos_projetos",
+        "config",
+        "categorias",
+        "fluxo_fixo",
+        "relatorios_historicos",
+        "controle_gastos"
+    ]
+
+    # Limite padrão de linhas por resposta do PostgREST (max-rows)
+    PAGE_SIZE = 1000
+
+    # Coluna de data usada no modo "últimos N meses"
+    DATE_COLUMNS = {
+        "historico": "data",
+        "controle_gastos": "data"
+    }
+
+    # Coluna única (por usuário) da paginação keyset; padrão: id
+    ORDER_COLUMNS = {
+        "config": "chave",
+        "categorias": "nome",
+        "relatorios_historicos": "mes"
+    }
+
     @staticmethod
-    def update_password(usuario, senha_hash):
-        supabase = DatabaseManager._get_client()
+    def _data_corte(meses):
+        inicio_mes = date.today().replace(day=1)
+        return (inicio_mes - relativedelta(months=max(int(meses), 1) - 1)).isoformat()
 
-        supabase.table("usuarios") \
-            .update({"senha": senha_hash}) \
-            .eq("usuario", usuario) \
-            .execute()
+    @staticmethod
+    def _iter_pages(table, usuario, colunas="*", page_size=None, meses=None, antes_de=None):
+        """
+        Lê a tabela em páginas com paginação keyset (coluna de ordem >
+        último valor visto, ver ORDER_COLUMNS), sem depender do limite de
+        linhas do PostgREST nem de OFFSET.
+        antes_de: só linhas com data anterior (o complemento de `meses`)
+        """
+        page_size = page_size or DatabaseManager.PAGE_SIZE
+        coluna_data = DatabaseManager.DATE_COLUMNS.get(table)
+        coluna_ordem = DatabaseManager.ORDER_COLUMNS.get(table, "id")
+        ultimo = None
 
-        return True
+        while True:
+            with DatabaseManager._connection() as supabase:
+                query = supabase.table(table) \
+                    .select(colunas) \
+                    .eq("usuario", usuario)
+
+                if meses and coluna_data:
+                    query = query.gte(coluna_data, DatabaseManager._data_corte(meses))
+                if antes_de and coluna_data:
+                    query = query.lt(coluna_data, antes_de)
+                if ultimo is not None:
+                    query = query.gt(coluna_ordem, ultimo)
+
+                res = query.order(coluna_ordem).limit(page_size).execute()
+
+            registros = res.data or []
+            if registros:
+                yield registros
+
+            if len(registros) < page_size:
+                break
+            ultimo = registros[-1][coluna_ordem]
+
+    @staticmethod
+    def iter_table(table, usuario, colunas="*", page_size=None, meses=None):
+        """Gera a tabela do usuário em blocos de DataFrame (um por página)"""
+        for registros in DatabaseManager._iter_pages(
+            table, usuario, colunas, page_size, meses
+        ):
+            df = pd.DataFrame(registros)
+            df.columns = df.columns.str.lower()
+            yield df
+
+    @staticmethod
+    def load_recent(table, usuario, meses=3, colunas="*"):
+        """Carrega só os últimos N meses (tabelas com coluna de data)"""
+        blocos = list(DatabaseManager.iter_table(table, usuario, colunas, meses=meses))
+        return pd.concat(blocos, ignore_index=True) if blocos else pd.DataFrame()
 
     # ===============================
-    # LOAD DADOS (POR USUÁRIO)
+    # PROJEÇÃO DE COLUNAS
     # ===============================
+    # Colunas de texto livre que só algumas telas exibem
+    HEAVY_COLUMNS = {
+        "historico": ["descricao"],
+        "investimentos": ["observacao"],
+        "sonhos_projetos": ["descricao"],
+        "fluxo_fixo": ["observacao"],
+        "relatorios_historicos": ["texto_executivo"]
+    }
+
+    # Carregamento inicial (leve): tudo menos as colunas pesadas
+    PROJECTIONS = {
+        "historico": [
+            "id", "usuario", "data", "tipo", "valor",
+            "categoria", "subcategoria", "responsavel", "fixo"
+        ],
+        "investimentos": [
+            "id", "usuario", "instituicao", "ativo", "tipo", "valor_atual",
+            "data_entrada", "rendimento_mensal", "categoria"
+        ],
+        "sonhos_projetos": [
+            "id", "usuario", "nome", "valor_alvo", "valor_atual",
+            "data_alvo", "prioridade", "status", "categoria"
+        ],
+        "fluxo_fixo": [
+            "id", "usuario", "nome", "valor", "tipo", "categoria",
+            "data_inicio", "data_fim", "recorrencia"
+        ],
+        "relatorios_historicos": [
+            "id", "usuario", "mes", "patrimonio", "saldo_fixo",
+            "saldo_variavel", "perc_meta", "status"
+        ]
+    }
+
+    # Colunas pesadas que cada tela precisa (buscadas sob demanda)
+    VIEWS = {
+        "lancamentos": {"historico": ["descricao"]},
+        "investimentos": {"investimentos": ["observacao"]},
+        "sonhos": {"sonhos_projetos": ["descricao"]},
+        "fluxos": {"fluxo_fixo": ["observacao"]}
+    }
+
     @staticmethod
-    def load_all(usuario):
-        supabase = DatabaseManager._get_client()
+    def _pending_columns():
+        return st.session_state.setdefault("_colunas_pendentes", {})
+
+    @staticmethod
+    def ensure_columns(dados, table, usuario, colunas):
+        """
+        Busca sob demanda colunas pesadas que ficaram fora do carregamento
+        inicial e as incorpora (por id) ao DataFrame da sessão e ao snapshot.
+        """
+        pendentes = DatabaseManager._pending_columns().get((usuario, table), set())
+        faltando = [c for c in colunas if c in pendentes]
+        if not faltando:
+            return dados[table]
+
+        df = dados[table]
+        if not df.empty and "id" in df.columns:
+            registros = []
+            for pagina in DatabaseManager._iter_pages(
+                table, usuario, colunas=",".join(["id"] + faltando)
+            ):
+                registros.extend(pagina)
+
+            extra = pd.DataFrame(registros, columns=["id"] + faltando).set_index("id")
+            snapshot = DatabaseManager._get_snapshot(table, usuario)
+
+            for col in faltando:
+                mapeado = df["id"].map(extra[col])
+                # Linhas novas (ainda sem id) já trazem o valor digitado
+                df[col] = mapeado.where(mapeado.notna(), df[col]) if col in df.columns else mapeado
+
+                if snapshot is not None:
+                    for row_id, valor in extra[col].items():
+                        if row_id in snapshot:
+                            snapshot[row_id][col] = valor
+
+        pendentes.difference_update(faltando)
+        return df
+
+    @staticmethod
+    def ensure_view(dados, view, usuario):
+        """Garante as colunas pesadas usadas por uma tela (ver VIEWS)"""
+        for table, colunas in DatabaseManager.VIEWS.get(view, {}).items():
+            DatabaseManager.ensure_columns(dados, table, usuario, colunas)
+
+    # ===============================
+    # SCHEMA TIPADO (APLICADO NO LOAD)
+    # ===============================
+    # "money"/"float" → float64, "datetime" → datetime64,
+    # ("category", [valores]) → categórico (valores da UI + os observados)
+    SCHEMAS = {
+        "historico": {
+            "data": "datetime",
+            "valor": "money",
+            "tipo": ("category", ["Receita", "Despesa", "Investimento"])
+        },
+        "controle_gastos": {
+            "data": "datetime",
+            "valor": "money"
+        },
+        "investimentos": {
+            "valor_atual": "money",
+            "rendimento_mensal": "float"
+        },
+        "sonhos_projetos": {
+            "valor_alvo": "money",
+            "valor_atual": "money",
+            "status": ("category", ["Em Andamento", "Concluído", "Desistido"])
+        },
+        "fluxo_fixo": {
+            "valor": "money",
+            "tipo": ("category", ["Receita", "Despesa"])
+        },
+        "relatorios_historicos": {
+            "patrimonio": "money",
+            "saldo_fixo": "money",
+            "saldo_variavel": "money",
+            "perc_meta": "float"
+        }
+    }
+
+    @staticmethod
+    def apply_schema(table, df):
+        """
+        Converte as colunas declaradas em SCHEMAS uma única vez.
+        Se algum valor não converter, a coluna fica como veio (nunca perde dado).
+        """
+        if df is None or df.empty:
+            return df
+
+        for col, tipo in DatabaseManager.SCHEMAS.get(table, {}).items():
+            if col not in df.columns:
+                continue
+
+            serie = df[col]
+
+            if tipo in ("money", "float"):
+                convertida = pd.to_numeric(serie, errors="coerce").astype("float64")
+            elif tipo == "datetime":
+                if pd.api.types.is_datetime64_any_dtype(serie):
+                    continue
+                convertida = pd.to_datetime(serie, errors="coerce", format="ISO8601")
+            else:
+                _, valores = tipo
+                observados = [v for v in serie.dropna().unique() if v not in valores]
+                df[col] = pd.Categorical(serie, categories=list(valores) + observados)
+                continue
+
+            if (convertida.isna() & serie.notna()).any():
+                continue
+            df[col] = convertida
+
+        return df
+
+    @staticmethod
+    def _load_table(table, usuario, meses=None, lazy=False):
+        colunas = "*"
+        if lazy and table in DatabaseManager.PROJECTIONS:
+            colunas = ",".join(DatabaseManager.PROJECTIONS[table])
+
+        cache = DatabaseManager._get_cache()
+        variante = (colunas, meses)
+
+        registros = cache.get(usuario, table, variante)
+        if registros is None:
+            versao = cache.version(usuario, table)
+            registros = []
+            for pagina in DatabaseManager._iter_pages(table, usuario, colunas, meses=meses):
+                registros.extend(pagina)
+            cache.put(usuario, table, registros, variante, versao)
+
+        df = pd.DataFrame(registros) if registros else pd.DataFrame()
+
+        # 🔒 NORMALIZA SEMPRE
+        if not df.empty:
+            df.columns = df.columns.str.lower()
+            
+            # Normalização específica para fluxo_fixo
+            if table == "fluxo_fixo" and "tipo" in df.columns:
+                df["tipo"] = df["tipo"].astype(str).str.strip().str.title()
+
+            df = DatabaseManager.apply_schema(table, df)
+
+        # Fora da janela de meses: só o agregado mensal, para o cubo
+        resumo = None
+        if meses and table in DatabaseManager.DATE_COLUMNS and table in DatabaseManager.CUBE_TABLES:
+            resumo = DatabaseManager._resumo_anterior(table, usuario, meses)
+
+        return df, registros, resumo
+
+    # RPC de agregado mensal (supabase/migrations); sem ela, agrega no cliente
+    RESUMO_RPC = "resumo_mensal"
+    _resumo_rpc_disponivel = True
+
+    @staticmethod
+    def _resumo_anterior(table, usuario, meses):
+        """
+        Soma/quantidade por (mês, dimensões do cubo) das linhas anteriores à
+        janela de `meses`, calculadas no banco; as linhas em si não são lidas.
+        """
+        corte = DatabaseManager._data_corte(meses)
+        ausentes = DatabaseManager._missing_columns(table)
+        dimensoes = [d for d in DatabaseManager.CUBE_TABLES[table] if d not in ausentes]
+
+        if DatabaseManager._resumo_rpc_disponivel:
+            try:
+                with DatabaseManager._connection() as supabase:
+                    res = supabase.rpc(DatabaseManager.RESUMO_RPC, {
+                        "p_usuario": usuario,
+                        "p_tabela": table,
+                        "p_dimensoes": dimensoes,
+                        "p_ate": corte
+                    }).execute()
+                return res.data or []
+            except APIError as e:
+                # PGRST202: função não encontrada no schema cache
+                if getattr(e, "code", None) != "PGRST202":
+                    raise
+                DatabaseManager._resumo_rpc_disponivel = False
+
+        # Sem a migration: percorre as páginas antigas só com as colunas do
+        # cubo e guarda o agregado, não as linhas
+        cubo = CuboMensal(dimensoes)
+        colunas = ",".join(["id", DatabaseManager.DATE_COLUMNS[table], "valor", *dimensoes])
+        for pagina in DatabaseManager._iter_pages(table, usuario, colunas, antes_de=corte):
+            for registro in pagina:
+                cubo.adicionar(registro)
+        return cubo.totais(por=("mes", *dimensoes)).to_dict(orient="records")
+
+    @staticmethod
+    def _resumos():
+        return st.session_state.setdefault("_resumos", {})
+
+    @staticmethod
+    def load_all_concurrent(usuario, tables=None, timeout=15, meses=None, lazy=False):
+        """
+        Busca todas as tabelas em paralelo.
+        meses: se informado, historico/controle_gastos trazem só os últimos N meses
+               (os meses anteriores entram no cubo mensal como agregado)
+        lazy: carrega só PROJECTIONS; as colunas pesadas vêm com ensure_columns
+        timeout: segundos por tabela; a que estoura vai para falhas (ou é
+                 cancelada, se nem começou) sem atrasar as demais
+        Retorna: (dados, falhas) — falhas mapeia tabela -> mensagem de erro
+        """
+        tables = tables or DatabaseManager.TABLES
         dados = {}
+        falhas = {}
 
-        tables = [
-            "historico",
-            "investimentos",
-            "sonhos_projetos",
-            "config",
-            "categorias",
-            "fluxo_fixo",
-            "relatorios_historicos",
-            "controle_gastos"
-        ]
+        executor = ThreadPoolExecutor(
+            max_workers=len(tables),
+            thread_name_prefix="load_all"
+        )
 
-        for table in tables:
-            res = supabase.table(table) \
-                .select("*") \
-                .eq("usuario", usuario) \
-                .execute()
+        # Prazo por tabela: `timeout` a partir de quando o worker começou
+        # (ou foi enviado, se ainda está na fila)
+        inicios = {}
+
+        def carregar(table):
+            inicios[table] = time.monotonic()
+            return DatabaseManager._load_table(table, usuario, meses, lazy)
+
+        try:
+            enviado = time.monotonic()
+            futures = {executor.submit(carregar, table): table for table in tables}
+            pendentes = set(futures)
+
+            while pendentes:
+                agora = time.monotonic()
+                proximo_prazo = min(
+                    inicios.get(futures[f], enviado) + timeout for f in pendentes
+                )
+                prontos, pendentes = wait(
+                    pendentes,
+                    timeout=max(proximo_prazo - agora, 0),
+                    return_when=FIRST_COMPLETED
+                )
 
-            df = pd.DataFrame(res.data) if res.data else pd.DataFrame()
+                for future in prontos:
+                    table = futures[future]
+                    try:
+                        dados[table], registros, resumo = future.result()
+                    except Exception as e:
+                        falhas[table] = str(e) or type(e).__name__
+                        continue
 
-            # 🔒 NORMALIZA SEMPRE
-            if not df.empty:
-                df.columns = df.columns.str.lower()
-                
-                # Normalização específica para fluxo_fixo
-                if table == "fluxo_fixo" and "tipo" in df.columns:
-                    df["tipo"] = df["tipo"].astype(str).str.strip().str.title()
+                    # Meses fora da janela: entram no cubo só como agregado
+                    if resumo is None:
+                        DatabaseManager._resumos().pop((usuario, table), None)
+                    else:
+                        DatabaseManager._resumos()[(usuario, table)] = resumo
+
+                    # Snapshot registrado aqui (thread da sessão), não no worker
+                    if table in DatabaseManager.DIFF_TABLES:
+                        DatabaseManager._register_snapshot(table, usuario, registros)
+
+                    DatabaseManager._bump_versions([table])
+
+                    if lazy and table in DatabaseManager.HEAVY_COLUMNS:
+                        DatabaseManager._pending_columns()[(usuario, table)] = set(
+                            DatabaseManager.HEAVY_COLUMNS[table]
+                        )
+
+                # Tabelas que estouraram o próprio prazo: desiste delas e segue
+                agora = time.monotonic()
+                for future in list(pendentes):
+                    table = futures[future]
+                    if agora < inicios.get(table, enviado) + timeout:
+                        continue
+                    pendentes.discard(future)
+                    if future.cancel():
+                        falhas[table] = f"Não iniciada em {timeout}s (cancelada)"
+                    else:
+                        falhas[table] = f"Tempo limite de {timeout}s excedido"
+        finally:
+            # Não espera threads presas em timeout; o que ainda está na fila é cancelado
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        for table in falhas:
+            dados[table] = pd.DataFrame()
 
-            dados[table] = df
+        # Mantém a ordem declarada das tabelas
+        dados = {table: dados[table] for table in tables}
+
+        return dados, falhas
+
+    @staticmethod
+    def load_all(usuario):
+        dados, falhas = DatabaseManager.load_all_concurrent(usuario)
+
+        if falhas:
+            detalhes = "; ".join(f"{t}: {m}" for t, m in falhas.items())
+            raise RuntimeError(f"Falha ao carregar tabelas ({detalhes})")
 
         return dados
 
     # ===============================
-    # SAVE GENÉRICO (POR USUÁRIO) - VERSÃO DEFINITIVA
+    # SNAPSHOTS (ÚLTIMO ESTADO PERSISTIDO)
     # ===============================
+    # Tabelas com id estável: salvas por diff (insert/update/delete)
+    DIFF_TABLES = [
+        "historico",
+        "controle_gastos",
+        "investimentos",
+        "sonhos_projetos",
+        "fluxo_fixo"
+    ]
+
     @staticmethod
-    def save(table_name, df, usuario):
-        supabase = DatabaseManager._get_client()
+    def _snapshots():
+        return st.session_state.setdefault("_snapshots", {})
 
-        if df is None or df.empty:
+    @staticmethod
+    def _row_id(valor):
+        if valor is None or valor is pd.NA or (isinstance(valor, float) and pd.isna(valor)):
+            return None
+        if isinstance(valor, float) and valor.is_integer():
+            return int(valor)
+        return valor
+
+    # ===============================
+    # IDENTIDADE DAS LINHAS (ID → POSIÇÃO)
+    # ===============================
+    # O id do banco é a chave estável de cada linha das DIFF_TABLES: vem no
+    # load e, para linhas novas, é gravado no DataFrame quando o save
+    # confirma. Edição e exclusão localizam a linha pelo id em O(1); linhas
+    # ainda sem id (save pendente/falho) caem para o rótulo no DataFrame.
+    @staticmethod
+    def _indices():
+        return st.session_state.setdefault("_indices_ids", {})
+
+    @staticmethod
+    def row_index(table_name, df, usuario):
+        """
+        {id: posição} das linhas da tabela da sessão. Refeito só quando a
+        tabela é recarregada/salva ou muda de tamanho (cópias da mesma
+        tabela reaproveitam o índice; row_position confere cada acerto).
+        """
+        marca = (len(df), DatabaseManager.table_versions().get(table_name))
+        guardado = DatabaseManager._indices().get((usuario, table_name))
+        if guardado is not None and guardado[0] == marca:
+            return guardado[1]
+
+        indice = {}
+        if "id" in df.columns:
+            for pos, valor in enumerate(df["id"].tolist()):
+                row_id = DatabaseManager._row_id(valor)
+                if row_id is not None:
+                    indice[row_id] = pos
+
+        DatabaseManager._indices()[(usuario, table_name)] = (marca, indice)
+        return indice
+
+    @staticmethod
+    def row_position(table_name, df, usuario, row_id, linha=None):
+        """
+        Posição da linha com esse id em `df` (None se não existir). Sem id,
+        usa `linha` (rótulo do índice de `df`), desde que ela também não
+        tenha id.
+        """
+        if df is None:
+            return None
+
+        row_id = DatabaseManager._row_id(row_id)
+        if row_id is None:
+            return DatabaseManager._label_position(df, linha)
+        if "id" not in df.columns:
+            return None
+
+        pos = DatabaseManager.row_index(table_name, df, usuario).get(row_id)
+
+        # Confere a posição (o DataFrame pode ter sido reordenado no lugar)
+        if pos is not None and DatabaseManager._row_id(df["id"].iat[pos]) != row_id:
+            DatabaseManager._indices().pop((usuario, table_name), None)
+            pos = DatabaseManager.row_index(table_name, df, usuario).get(row_id)
+        return pos
+
+    @staticmethod
+    def _label_position(df, linha):
+        """Posição do rótulo `linha` em `df`, só para linha sem id"""
+        if linha is None or not df.index.is_unique or linha not in df.index:
+            return None
+        pos = df.index.get_loc(linha)
+        if "id" in df.columns and DatabaseManager._row_id(df["id"].iat[pos]) is not None:
+            return None
+        return pos
+
+    @staticmethod
+    def update_row(table_name, df, usuario, row_id, valores, linha=None):
+        """
+        Altera, no próprio `df`, as colunas de `valores` ({coluna: valor})
+        da linha com esse id (ou, sem id, do rótulo `linha`).
+        Retorna False se a linha não existir.
+        """
+        pos = DatabaseManager.row_position(table_name, df, usuario, row_id, linha)
+        if pos is None:
+            return False
+
+        for coluna, valor in valores.items():
+            if coluna not in df.columns:
+                df[coluna] = None
+            df.iat[pos, df.columns.get_loc(coluna)] = valor
+        return True
+
+    @staticmethod
+    def delete_row(table_name, df, usuario, row_id, linha=None):
+        """
+        Novo DataFrame sem a linha com esse id (ou, sem id, do rótulo
+        `linha`); None se a linha não existir.
+        """
+        pos = DatabaseManager.row_position(table_name, df, usuario, row_id, linha)
+        if pos is None:
+            return None
+        return pd.concat([df.iloc[:pos], df.iloc[pos + 1:]], ignore_index=True)
+
+    @staticmethod
+    def delete_rows(table_name, df, usuario, row_ids, linhas=()):
+        """
+        Novo DataFrame sem as linhas com esses ids (linhas[i] é o rótulo
+        usado quando row_ids[i] não tem id); None se nenhuma existir.
+        """
+        linhas = list(linhas) or [None] * len(row_ids)
+        posicoes = {
+            DatabaseManager.row_position(table_name, df, usuario, row_id, linha)
+            for row_id, linha in zip(row_ids, linhas)
+        }
+        posicoes.discard(None)
+        if not posicoes:
+            return None
+        manter = [pos for pos in range(len(df)) if pos not in posicoes]
+        return df.iloc[manter].reset_index(drop=True)
+
+    @staticmethod
+    def _register_snapshot(table_name, usuario, records):
+        """Guarda {id: record} do que está no banco após load/save"""
+        snapshot = {}
+        for record in records:
+            row_id = DatabaseManager._row_id(record.get("id"))
+            if row_id is not None:
+                snapshot[row_id] = {
+                    k.lower(): v for k, v in record.items() if k.lower() != "id"
+                }
+        DatabaseManager._snapshots()[(usuario, table_name)] = snapshot
+
+        if table_name in DatabaseManager.CUBE_TABLES:
+            DatabaseManager._cubos()[(usuario, table_name)] = CuboMensal(
+                DatabaseManager.CUBE_TABLES[table_name],
+                snapshot.values(),
+                DatabaseManager._resumos().get((usuario, table_name), ())
+            )
+
+    # ===============================
+    # CUBO MENSAL (AGREGADOS MANTIDOS POR DELTA)
+    # ===============================
+    # Tabelas de lançamentos com soma/contagem por (mês, dimensões)
+    # (só colunas que existem na tabela; controle_gastos não tem tipo/responsável)
+    CUBE_TABLES = {
+        "historico": ("tipo", "categoria", "responsavel"),
+        "controle_gastos": COLUNAS_CATEGORIA
+    }
+
+    @staticmethod
+    def _cubos():
+        return st.session_state.setdefault("_cubos", {})
+
+    @staticmethod
+    def cube(table_name, usuario, df=None):
+        """
+        CuboMensal da tabela (montado no load e atualizado a cada save).
+        Se ainda não existir e `df` for informado, monta a partir dele.
+        """
+        cubo = DatabaseManager._cubos().get((usuario, table_name))
+        if cubo is None and df is not None and table_name in DatabaseManager.CUBE_TABLES:
+            registros = DatabaseManager._to_records(df, usuario) if not df.empty else []
+            cubo = CuboMensal(
+                DatabaseManager.CUBE_TABLES[table_name],
+                registros,
+                DatabaseManager._resumos().get((usuario, table_name), ())
+            )
+            DatabaseManager._cubos()[(usuario, table_name)] = cubo
+        return cubo
+
+    @staticmethod
+    def _bump_versions(tables):
+        """Nova versão (única no processo) para as tabelas da sessão"""
+        versoes = st.session_state.setdefault("_versoes", {})
+        for table in tables:
+            versoes[table] = next(_versao_seq)
+
+    @staticmethod
+    def table_versions():
+        """Versão atual de cada tabela da sessão (muda a cada load/save)"""
+        return st.session_state.setdefault("_versoes", {})
+
+    @staticmethod
+    def _get_snapshot(table_name, usuario):
+        return DatabaseManager._snapshots().get((usuario, table_name))
+
+    @staticmethod
+    def _same_value(a, b):
+        if a == b:
             return True
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            return float(a) == float(b)
+        if isinstance(a, str) and isinstance(b, str):
+            # Datas: "2024-01-05T00:00:00" (pandas) x "2024-01-05" (Postgres date)
+            return a.replace("T00:00:00", "") == b.replace("T00:00:00", "")
+        return False
 
-        df = df.copy()
+    @staticmethod
+    def _record_changed(record, anterior):
+        return any(
+            not DatabaseManager._same_value(valor, anterior.get(chave))
+            for chave, valor in record.items()
+            if chave != "id"
+        )
+
+    # ===============================
+    # COLUNAS OPCIONAIS (MIGRATIONS)
+    # ===============================
+    # Colunas que só existem depois de uma migration: sem ela, ficam fora do
+    # payload em vez de derrubar o save com PGRST204
+    OPTIONAL_COLUMNS = {
+        "controle_gastos": COLUNAS_CATEGORIA
+    }
+
+    # tabela -> colunas opcionais ausentes no banco (verificado uma vez por processo)
+    _colunas_ausentes = {}
+
+    @staticmethod
+    def _missing_columns(table_name):
+        colunas = DatabaseManager.OPTIONAL_COLUMNS.get(table_name)
+        if not colunas:
+            return []
+
+        if table_name not in DatabaseManager._colunas_ausentes:
+            try:
+                with DatabaseManager._connection() as supabase:
+                    supabase.table(table_name).select(",".join(colunas)).limit(1).execute()
+                ausentes = []
+            except APIError as e:
+                # 42703: coluna inexistente / PGRST204: fora do schema cache
+                if getattr(e, "code", None) not in ("42703", "PGRST204"):
+                    raise
+                ausentes = list(colunas)
+            DatabaseManager._colunas_ausentes[table_name] = ausentes
+
+        return DatabaseManager._colunas_ausentes[table_name]
+
+    # ===============================
+    # SAVE GENÉRICO (POR USUÁRIO) - VERSÃO DEFINITIVA
+    # ===============================
+    @staticmethod
+    def _iso_text(serie, unidade):
+        """
+        datetime64 sem fuso → texto ISO ("s": YYYY-MM-DDTHH:MM:SS, "D":
+        YYYY-MM-DD) via numpy, bem mais rápido que .dt.strftime; NaT → None
+        """
+        texto = np.datetime_as_string(serie.to_numpy(dtype=f"datetime64[{unidade}]"), unit=unidade)
+        resultado = pd.Series(texto, index=serie.index, dtype=object)
+        resultado[serie.isna().to_numpy()] = None
+        return resultado
+
+    @staticmethod
+    def _serialize_column(serie):
+        """Converte uma coluna de datas para texto ISO de uma vez (sem loop por célula)"""
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            if getattr(serie.dt, "tz", None) is not None:
+                return serie.dt.strftime("%Y-%m-%dT%H:%M:%S%z")
+            return DatabaseManager._iso_text(serie, "s")
+
+        if serie.dtype != object:
+            return serie
+
+        tipo = pd.api.types.infer_dtype(serie, skipna=True)
+
+        if tipo == "date":
+            # datetime.date puro (ex.: st.date_input) → "YYYY-MM-DD"
+            return DatabaseManager._iso_text(pd.to_datetime(serie), "D")
+        if tipo == "datetime":
+            return DatabaseManager._serialize_column(pd.to_datetime(serie))
+        if tipo == "mixed":
+            # Texto misturado com datas: só aqui cai para conversão por valor
+            return serie.map(lambda v: v.isoformat() if hasattr(v, "isoformat") else v)
+
+        return serie
+
+    @staticmethod
+    def _column_values(serie):
+        """Valores da coluna como lista Python, com NaN/NaT/inf já trocados por None"""
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.astype(object)
+
+        if pd.api.types.is_float_dtype(serie.dtype):
+            numeros = serie.to_numpy(dtype=float)
+            valores = numeros.tolist()
+            faltando = np.flatnonzero(~np.isfinite(numeros))
+        elif pd.api.types.is_integer_dtype(serie.dtype) and not pd.api.types.is_extension_array_dtype(serie.dtype):
+            return serie.tolist()
+        elif pd.api.types.is_bool_dtype(serie.dtype) and not pd.api.types.is_extension_array_dtype(serie.dtype):
+            return serie.tolist()
+        else:
+            valores = serie.tolist()
+            faltando = np.flatnonzero(
+                (pd.isna(serie) | serie.isin([float("inf"), float("-inf")])).to_numpy()
+            )
+
+        for pos in faltando:
+            valores[pos] = None
+        return valores
+
+    @staticmethod
+    def _to_records(df, usuario, drop=()):
+        df = df.copy(deep=False)
         df.columns = df.columns.str.lower()
 
+        # 🔥 Remove colunas (ex.: id) antes de montar o payload
+        descartar = [c for c in drop if c in df.columns]
+        if descartar:
+            df = df.drop(columns=descartar)
+
         # garantir coluna usuario
         df["usuario"] = usuario
 
-        df = df.replace([float("inf"), float("-inf")], None)
-        df = df.where(pd.notna(df), None)
-
-        records = df.to_dict(orient="records")
-
-        # 🔥 FUNÇÃO AUXILIAR: Converte TODAS as datas para string
-        def convert_dates_in_records(records_list):
-            converted = []
-            for record in records_list:
-                new_record = {}
-                for key, value in record.items():
-                    if value is not None:
-                        # Converter datas para string ISO
-                        if hasattr(value, 'isoformat'):
-                            new_record[key] = value.isoformat()
-                        elif isinstance(value, pd.Timestamp):
-                            new_record[key] = value.strftime('%Y-%m-%d')
-                        else:
-                            new_record[key] = value
-                    else:
-                        new_record[key] = value
-                converted.append(new_record)
-            return converted
-        
-        # 🔥 Converter TODAS as datas em TODOS os records
-        records = convert_dates_in_records(records)
+        # 🔥 Converte coluna a coluna (datas → texto ISO, NaN/inf → None) e
+        # só no fim monta os dicts, sem passar por astype(object)/where/to_dict
+        colunas = list(df.columns)
+        valores = [
+            DatabaseManager._column_values(DatabaseManager._serialize_column(df[col]))
+            for col in colunas
+        ]
+        return [dict(zip(colunas, linha)) for linha in zip(*valores)]
+
+    @staticmethod
+    def save(table_name, df, usuario):
+        return DatabaseManager.save_many({table_name: df}, usuario)
+
+    @staticmethod
+    def save_many(tabelas, usuario):
+        """
+        Salva várias tabelas ({nome: df}) em uma única ida ao banco, de forma
+        atômica: ou todas as mutações são gravadas, ou nenhuma.
+        """
+        with DatabaseManager.batch(usuario) as lote:
+            for table_name, df in tabelas.items():
+                DatabaseManager._stage(lote, table_name, df, usuario)
+
+        DatabaseManager._bump_versions(tabelas)
+        return True
+
+    @staticmethod
+    @contextmanager
+    def batch(usuario):
+        lote = WriteBatch(usuario)
+        yield lote
+        lote.commit()
+
+    @staticmethod
+    def _stage(lote, table_name, df, usuario):
+        # 🏷️ CONTROLE_GASTOS → grava a categoria (se a migration já rodou);
+        # só classifica linhas novas/alteradas
+        if (
+            table_name == "controle_gastos"
+            and df is not None
+            and not df.empty
+            and not DatabaseManager._missing_columns(table_name)
+        ):
+            categorizar_gastos(df, DatabaseManager._get_snapshot(table_name, usuario))
+
+        # 🔥 TABELAS COM SNAPSHOT → SALVA SÓ O QUE MUDOU
+        if (
+            table_name in DatabaseManager.DIFF_TABLES
+            and df is not None
+            and DatabaseManager._get_snapshot(table_name, usuario) is not None
+        ):
+            DatabaseManager._stage_incremental(lote, table_name, df, usuario)
+            return
+
+        if df is None or df.empty:
+            return
 
         # 🔥 CONFIG → UPSERT (usuario + chave)
         if table_name == "config":
-            supabase.table("config") \
-                .upsert(records, on_conflict="usuario,chave") \
-                .execute()
-            return True
+            records = DatabaseManager._to_records(df, usuario)
+            lote.upsert("config", records, on_conflict=["usuario", "chave"])
+            return
+
+        # Remover coluna id (e colunas opcionais ausentes no banco) se existir
+        records = DatabaseManager._to_records(
+            df, usuario, drop=["id", *DatabaseManager._missing_columns(table_name)]
+        )
 
         # 🔥 RELATORIOS_HISTORICOS → UPSERT (usuario + mes)
         if table_name == "relatorios_historicos":
-            # Remover coluna id se existir
-            for record in records:
-                if "id" in record:
-                    del record["id"]
-            
-            supabase.table("relatorios_historicos") \
-                .upsert(records, on_conflict="usuario,mes") \
-                .execute()
-            return True
+            lote.upsert("relatorios_historicos", records, on_conflict=["usuario", "mes"])
+            return
 
         # 🔥 CATEGORIAS → UPSERT (usuario + nome)
         if table_name == "categorias":
-            # Remover coluna id se existir
-            for record in records:
-                if "id" in record:
-                    del record["id"]
-            
             # Garantir que temos as colunas necessárias para o upsert
             for record in records:
                 if "nome" not in record:
                     record["nome"] = ""
-            
-            supabase.table("categorias") \
-                .upsert(records, on_conflict="usuario,nome") \
-                .execute()
-            return True
 
-        # 🔥 FLUXO_FIXO → DELETE + INSERT
-        if table_name == "fluxo_fixo":
-            # Remover coluna id se existir
-            for record in records:
-                if "id" in record:
-                    del record["id"]
-            
-            # Primeiro deletar todos os fluxos do usuário
-            supabase.table("fluxo_fixo") \
-                .delete() \
-                .eq("usuario", usuario) \
-                .execute()
-            
-            # Depois inserir os novos
-            supabase.table("fluxo_fixo") \
-                .insert(records) \
-                .execute()
-            return True
+            lote.upsert("categorias", records, on_conflict=["usuario", "nome"])
+            return
 
-        # 🔥 SONHOS_PROJETOS → DELETE + INSERT
-        if table_name == "sonhos_projetos":
-            # Remover coluna id se existir
-            for record in records:
-                if "id" in record:
-                    del record["id"]
-            
-            # Primeiro deletar todos os sonhos do usuário
-            supabase.table("sonhos_projetos") \
-                .delete() \
-                .eq("usuario", usuario) \
-                .execute()
-            
-            # Depois inserir os novos
-            supabase.table("sonhos_projetos") \
-                .insert(records) \
-                .execute()
-            return True
+        # 🔥 HISTORICO, CONTROLE_GASTOS, INVESTIMENTOS, SONHOS_PROJETOS, FLUXO_FIXO
+        # E OUTRAS TABELAS → DELETE DO USUÁRIO + INSERT (na mesma transação)
+        # (usado só enquanto não há snapshot; depois o save é incremental)
+        lote.delete_all(table_name)
+        i_insert = lote.insert(table_name, records)
 
-        # 🔥 INVESTIMENTOS → DELETE + INSERT
-        if table_name == "investimentos":
-            # Remover coluna id se existir
-            for record in records:
-                if "id" in record:
-                    del record["id"]
-            
-            # Primeiro deletar todos os investimentos do usuário
-            supabase.table("investimentos") \
-                .delete() \
-                .eq("usuario", usuario) \
-                .execute()
-            
-            # Depois inserir os novos
-            supabase.table("investimentos") \
-                .insert(records) \
-                .execute()
-            return True
+        if table_name in DatabaseManager.DIFF_TABLES:
+            def registrar_ids():
+                # Devolve os ids gerados ao DataFrame da sessão e passa a salvar por diff
+                inseridos = lote.result(i_insert)
+                if len(inseridos) == len(df):
+                    df["id"] = [r["id"] for r in inseridos]
+                    DatabaseManager._register_snapshot(table_name, usuario, inseridos)
 
-        # 🔥 HISTORICO → DELETE + INSERT
-        if table_name == "historico":
-            # Remover coluna id se existir
-            for record in records:
-                if "id" in record:
-                    del record["id"]
-            
-            # Primeiro deletar todo o histórico do usuário
-            supabase.table("historico") \
-                .delete() \
-                .eq("usuario", usuario) \
-                .execute()
-            
-            # Depois inserir os novos
-            supabase.table("historico") \
-                .insert(records) \
-                .execute()
-            return True
+            lote.on_commit(registrar_ids)
 
-        # 🔥 CONTROLE_GASTOS → DELETE + INSERT
-        if table_name == "controle_gastos":
-            # Remover coluna id se existir
-            for record in records:
-                if "id" in record:
-                    del record["id"]
-            
-            # Primeiro deletar todos os gastos do usuário
-            supabase.table("controle_gastos") \
-                .delete() \
-                .eq("usuario", usuario) \
-                .execute()
-            
-            # Depois inserir os novos
-            supabase.table("controle_gastos") \
-                .insert(records) \
-                .execute()
-            return True
+    @staticmethod
+    def _stage_incremental(lote, table_name, df, usuario):
+        """
+        Compara o DataFrame da sessão com o último snapshot persistido (por id)
+        e envia apenas inserts, updates e deletes. Nunca apaga a tabela inteira.
+        """
+        snapshot = DatabaseManager._get_snapshot(table_name, usuario)
+
+        if df.empty:
+            ids, records = [], []
+        else:
+            ids = df["id"].tolist() if "id" in df.columns else [None] * len(df)
+            records = DatabaseManager._to_records(
+                df, usuario, drop=["id", *DatabaseManager._missing_columns(table_name)]
+            )
+
+        novos, novos_pos = [], []
+        alterados = []
+        presentes = set()
+
+        for pos, (row_id, record) in enumerate(zip(ids, records)):
+            row_id = DatabaseManager._row_id(row_id)
+
+            if row_id is None or row_id not in snapshot:
+                novos.append(record)
+                novos_pos.append(pos)
+                continue
+
+            presentes.add(row_id)
+            if DatabaseManager._record_changed(record, snapshot[row_id]):
+                alterados.append({"id": row_id, **record})
+
+        removidos = [row_id for row_id in snapshot if row_id not in presentes]
+
+        # Ordem segura: insere e atualiza antes de remover
+        i_insert = lote.insert(table_name, novos) if novos else None
+        if alterados:
+            lote.update(table_name, alterados)
+        if removidos:
+            lote.delete(table_name, removidos)
+
+        def atualizar_snapshot():
+            # O cubo recebe só o delta: sai o estado anterior, entra o novo
+            cubo = DatabaseManager._cubos().get((usuario, table_name))
+
+            for row_id in removidos:
+                anterior = snapshot.pop(row_id, None)
+                if cubo is not None and anterior is not None:
+                    cubo.remover(anterior)
 
-        # 🔥 OUTRAS TABELAS → DELETE DO USUÁRIO + INSERT
-        supabase.table(table_name) \
-            .delete() \
-            .eq("usuario", usuario) \
-            .execute()
+            for record in alterados:
+                novo = {k: v for k, v in record.items() if k != "id"}
+                if cubo is not None:
+                    cubo.remover(snapshot[record["id"]])
+                    cubo.adicionar(novo)
+                snapshot[record["id"]] = novo
 
-        supabase.table(table_name) \
-            .insert(records) \
-            .execute()
+            if i_insert is not None:
+                if "id" not in df.columns:
+                    df["id"] = None
+                id_col = df.columns.get_loc("id")
+                for pos, row in zip(novos_pos, lote.result(i_insert)):
+                    df.iat[pos, id_col] = row["id"]
+                    snapshot[row["id"]] = {k: v for k, v in row.items() if k != "id"}
+                    if cubo is not None:
+                        cubo.adicionar(snapshot[row["id"]])
 
-        return True
\ No newline at end of file
+        lote.on_commit(atualizar_snapshot)
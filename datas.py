@@ -0,0 +1,116 @@
+import threading
+from datetime import date, datetime
+
+import pandas as pd
+
+
+# =========================================================
+# PARSER DE DATAS VETORIZADO (MULTI-FORMATO)
+# =========================================================
+
+# Mesma ordem de tentativa do antigo converter_data_para_datetime
+FORMATOS_DATA = [
+    '%Y-%m-%d',           # 2024-01-26
+    '%d/%m/%Y',           # 26/01/2024
+    '%d-%m-%Y',           # 26-01-2024
+    '%Y/%m/%d',           # 2024/01/26
+    '%d.%m.%Y',           # 26.01.2024
+    '%Y-%m-%d %H:%M:%S',  # Com hora
+    '%d/%m/%Y %H:%M:%S',  # Com hora
+]
+
+# Formato dominante detectado por coluna (ex.: "historico.data")
+_formatos_detectados = {}
+_formatos_lock = threading.Lock()
+
+
+def parse_datas(serie, chave=None, retornar_invalidos=False):
+    """
+    Converte uma coluna inteira de datas para datetime64 de uma vez.
+
+    Strings são testadas formato a formato sobre a coluna toda (só as que
+    ainda não converteram passam para o próximo formato). O formato que
+    resolve mais linhas fica em cache por `chave` e é tentado primeiro
+    nas próximas chamadas.
+
+    Retorna a série convertida; com retornar_invalidos=True, retorna
+    (série, índice das linhas que tinham valor mas não converteram).
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return (serie, serie.index[:0]) if retornar_invalidos else serie
+
+    # Trabalha em índice posicional (o índice original pode ter duplicatas)
+    valores = serie.reset_index(drop=True)
+    resultado = pd.Series(pd.NaT, index=valores.index, dtype="datetime64[ns]")
+
+    tipo = pd.api.types.infer_dtype(valores, skipna=True)
+    if tipo == "string":
+        eh_texto = valores.notna()
+        eh_data = pd.Series(False, index=valores.index)
+    elif tipo in ("date", "datetime", "datetime64"):
+        eh_data = valores.notna()
+        eh_texto = pd.Series(False, index=valores.index)
+    else:
+        eh_data = valores.map(lambda v: isinstance(v, (pd.Timestamp, datetime, date)))
+        eh_texto = valores.map(lambda v: isinstance(v, str))
+
+    # Objetos de data (Timestamp, datetime, date): conversão direta
+    if eh_data.any():
+        resultado[eh_data] = pd.to_datetime(valores[eh_data], errors="coerce")
+
+    # Strings: formato a formato, sempre sobre o que ainda falta
+    textos = valores[eh_texto].str.strip()
+    vazios = textos.index[textos == ""]
+    textos = textos[textos != ""]
+
+    if not textos.empty:
+        with _formatos_lock:
+            cacheado = _formatos_detectados.get(chave)
+
+        formatos = FORMATOS_DATA
+        if cacheado:
+            formatos = [cacheado] + [f for f in FORMATOS_DATA if f != cacheado]
+
+        restantes = textos
+        melhor_formato, melhor_qtd = None, 0
+
+        for formato in formatos:
+            if restantes.empty:
+                break
+            convertidos = pd.to_datetime(restantes, format=formato, errors="coerce")
+            ok = convertidos.notna()
+            if ok.any():
+                resultado[convertidos.index[ok]] = convertidos[ok]
+                if ok.sum() > melhor_qtd:
+                    melhor_formato, melhor_qtd = formato, int(ok.sum())
+                restantes = restantes[~ok]
+
+        # Sobras: conversão genérica (mesmo fallback do código antigo)
+        if not restantes.empty:
+            convertidos = pd.to_datetime(restantes, errors="coerce", format="mixed")
+            ok = convertidos.notna()
+            resultado[convertidos.index[ok]] = convertidos[ok]
+
+        if chave and melhor_formato:
+            with _formatos_lock:
+                _formatos_detectados[chave] = melhor_formato
+
+    # Outros tipos (números etc.): tentativa genérica
+    outros = ~(eh_data | eh_texto) & valores.notna()
+    if outros.any():
+        resultado[outros] = pd.to_datetime(valores[outros], errors="coerce")
+
+    resultado.index = serie.index
+    if not retornar_invalidos:
+        return resultado
+
+    tinha_valor = valores.notna()
+    tinha_valor[vazios] = False
+    invalidos = serie.index[(tinha_valor & resultado.isna().to_numpy()).to_numpy()]
+    return resultado, invalidos
+
+
+def formato_detectado(chave):
+    """Formato dominante já detectado para a coluna (ou None)"""
+    with _formatos_lock:
+        return _formatos_detectados.get(chave)
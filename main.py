@@ -1,14 +1,28 @@
 import streamlit as st
 
 import pandas as pd
+import numpy as np
 from datetime import date, datetime, timedelta
 import plotly.express as px
 
 from database import DatabaseManager
-from dateutil.relativedelta import relativedelta
+from categorizador import (
+    CATEGORIAS_DETALHADAS,
+    CATEGORIAS_HIERARQUICAS,
+    CATEGORIZADOR_CARD,
+    categorizar_gastos,
+)
+from datas import parse_datas
+from metricas import MetricasEngine, meses_fechados
+import solver
+from projecao import (
+    plano_mais_barato, probabilidade_meta, projetar_carteira, projetar_patrimonio,
+    simular_grade, simular_monte_carlo, superficie_meta
+)
 
 import io
 import os
+import time
 import bcrypt
 
 
@@ -410,7 +424,8 @@ def salvar_relatorio_mensal(
     st.session_state["dados"] = dados
 
     usuario = st.session_state["usuario"]
-    DatabaseManager.save("relatorios_historicos", df_final, usuario)
+    # Upsert por (usuario, mes): basta gravar o relatório do mês
+    DatabaseManager.save("relatorios_historicos", novo, usuario)
 
     return True, f"Relatório salvo como {status}."
 
@@ -556,7 +571,34 @@ if "usuario" not in st.session_state:
 # =========================================================
 if "dados" not in st.session_state:
     usuario = st.session_state["usuario"]
-    st.session_state["dados"] = DatabaseManager.load_all(usuario)
+
+    # Recarrega apenas as tabelas que falharam na tentativa anterior
+    dados_parciais = st.session_state.get("dados_parciais", {})
+    pendentes = [t for t in DatabaseManager.TABLES if t not in dados_parciais]
+
+    # MESES_CARREGADOS (secrets): limita historico/controle_gastos aos últimos N meses
+    dados_carregados, falhas = DatabaseManager.load_all_concurrent(
+        usuario,
+        pendentes,
+        meses=st.secrets.get("MESES_CARREGADOS"),
+        lazy=True
+    )
+    for tabela, df_tabela in dados_carregados.items():
+        if tabela not in falhas:
+            dados_parciais[tabela] = df_tabela
+
+    if falhas:
+        # 🔒 Não segue com tabelas vazias: um save sobrescreveria os dados reais
+        st.session_state["dados_parciais"] = dados_parciais
+        st.error("❌ Não foi possível carregar todos os seus dados.")
+        for tabela, erro in falhas.items():
+            st.caption(f"• {tabela}: {erro}")
+        if st.button("🔄 Tentar novamente", type="primary"):
+            st.rerun()
+        st.stop()
+
+    st.session_state.pop("dados_parciais", None)
+    st.session_state["dados"] = {t: dados_parciais[t] for t in DatabaseManager.TABLES}
 
 dados = st.session_state["dados"]
 for chave in dados:
@@ -580,69 +622,50 @@ if "msg_tipo" not in st.session_state:
 hoje = date.today()
 mes_atual = hoje.strftime("%Y-%m")
 
+# Cada agregado só é recalculado quando sua tabela de origem muda (load/save)
+metricas = MetricasEngine(
+    st.session_state.setdefault("_metricas", {}),
+    DatabaseManager.table_versions()
+)
+
 # ---------------- PATRIMÔNIO ----------------
-patrimonio = dados["investimentos"]["valor_atual"].sum() if not dados["investimentos"].empty else 0
+patrimonio = metricas.get("patrimonio", dados)
 
 # ---------------- HISTÓRICO (VARIÁVEL) ----------------
-if not dados["historico"].empty:
-    hist = dados["historico"].copy()
-    
-    # 🔥 NORMALIZAR COLUNAS PRIMEIRO
-    hist.columns = hist.columns.str.lower()
-    
-    # Converter data
-    hist["data"] = pd.to_datetime(hist["data"])
-    hist["mes"] = hist["data"].dt.strftime("%Y-%m")
-    hist_mes = hist[hist["mes"] == mes_atual]
-
-    # 🔥 BUSCAR COM VALORES EM MINÚSCULO
-    receitas_variaveis = hist_mes[hist_mes["tipo"].str.lower() == "receita"]["valor"].sum()
-    despesas_variaveis = hist_mes[hist_mes["tipo"].str.lower() == "despesa"]["valor"].sum()
-else:
-    receitas_variaveis = despesas_variaveis = 0
+# Cubo mensal: lê só as células do mês, sem varrer o histórico
+cubo_historico = DatabaseManager.cube("historico", usuario, dados["historico"])
+receitas_variaveis = cubo_historico.soma(mes_atual, tipo="Receita")
+despesas_variaveis = cubo_historico.soma(mes_atual, tipo="Despesa")
 
 
 # ---------------- CONTROLE DE GASTOS (DESPESA VARIÁVEL) ----------------
-if not dados.get("controle_gastos", pd.DataFrame()).empty:
-    gastos_rapidos_mes = dados["controle_gastos"]["valor"].sum()
-else:
-    gastos_rapidos_mes = 0
+# 🔥 só o mês aberto; meses anteriores ficam arquivados no cubo mensal
+cubo_gastos = DatabaseManager.cube(
+    "controle_gastos", usuario, dados.get("controle_gastos", pd.DataFrame())
+)
+gastos_rapidos_mes = cubo_gastos.soma(mes_atual)
 
 
 # ---------------- SALDO VARIÁVEL FINAL ----------------
 saldo_variavel = receitas_variaveis - despesas_variaveis - gastos_rapidos_mes
 
 # ---------------- FLUXO FIXO ----------------
-if not dados["fluxo_fixo"].empty:
-    receitas_fixas = dados["fluxo_fixo"][dados["fluxo_fixo"]["tipo"] == "Receita"]["valor"].sum()
-    despesas_fixas = dados["fluxo_fixo"][dados["fluxo_fixo"]["tipo"] == "Despesa"]["valor"].sum()
-    saldo_fixo = receitas_fixas - despesas_fixas
-else:
-    receitas_fixas = despesas_fixas = saldo_fixo = 0
+# 🔥 só fluxos vigentes no mês (data_inicio/data_fim), pelo valor mensal equivalente
+receitas_fixas, despesas_fixas, saldo_fixo = metricas.get("fluxo_fixo", dados, mes_atual)
+
+# Agenda mês a mês do fluxo fixo (recorrência e vigência), para a projeção
+agenda_fluxos = metricas.get("agenda_fluxos", dados, mes_atual)
+saldo_fixo_agenda = agenda_fluxos.sum(axis=0)
 
 # ---------------- SONHOS - CORREÇÃO: FILTRAR APENAS SONHOS ATIVOS ----------------
-if not dados["sonhos_projetos"].empty:
-    # 🔥 FILTRAR: considerar apenas sonhos com status diferente de "Desistido"
-    sonhos_ativos = dados["sonhos_projetos"][dados["sonhos_projetos"]["status"] != "Desistido"]
-    
-    if not sonhos_ativos.empty:
-        total_sonhos = sonhos_ativos["valor_alvo"].sum()
-        total_atual = sonhos_ativos["valor_atual"].sum()
-        progresso_sonhos = (total_atual / total_sonhos * 100) if total_sonhos > 0 else 0
-    else:
-        total_sonhos = total_atual = progresso_sonhos = 0
-else:
-    total_sonhos = total_atual = progresso_sonhos = 0
+# 🔥 considera apenas sonhos com status diferente de "Desistido"
+total_sonhos, total_atual, progresso_sonhos = metricas.get("sonhos", dados)
 
 # =========================================================
 # CONFIGURAÇÕES (BLOCO 4)
 # =========================================================
 
-config_dict = {}
-
-if not dados["config"].empty:
-    for _, row in dados["config"].iterrows():
-        config_dict[row["chave"]] = row["valor"]
+config_dict = metricas.get("config", dados)
 
 # Valores com fallback seguro
 meta_patrimonio = float(config_dict.get("meta_patrimonio", 0))
@@ -664,44 +687,7 @@ nome_familia = config_dict.get("nome_familia", "Família")
 # =========================================================
 # PROJEÇÃO DE PATRIMÔNIO (BLOCO 5)
 # =========================================================
-
-def projetar_patrimonio(
-    patrimonio_inicial,
-    saldo_fixo_mensal,
-    rendimento_mensal,
-    inflacao_mensal,
-    meta_patrimonio,
-    meses=120
-):
-    taxa_real = rendimento_mensal - inflacao_mensal
-    taxa_real = max(taxa_real, -0.99)
-
-    patrimonio = patrimonio_inicial
-    resultados = []
-
-    data_base = date.today().replace(day=1)
-
-    for i in range(meses):
-        data_ref = data_base + relativedelta(months=i)
-
-        if i > 0:
-            rendimento = patrimonio * taxa_real
-            patrimonio += rendimento + saldo_fixo_mensal
-        else:
-            rendimento = 0
-
-        resultados.append({
-            "data": data_ref,
-            "patrimonio": patrimonio,
-            "rendimento": rendimento,
-            "aporte_fixo": saldo_fixo_mensal if i > 0 else 0,
-            "meta_atingida": patrimonio >= meta_patrimonio
-        })
-
-        if patrimonio >= meta_patrimonio and i >= 12:
-            break
-
-    return pd.DataFrame(resultados)
+# projetar_patrimonio vem de projecao.py (trajetoria em forma fechada)
 
 # =========================================================
 # TEXTO EXECUTIVO AUTOMÁTICO
@@ -876,22 +862,16 @@ def calcular_aporte_ideal_para_meta(
     if meta_patrimonio <= patrimonio_atual:
         return 0, True  # Meta já atingida
     
-    taxa_real = rendimento_mensal - inflacao_mensal
-    taxa_real = max(taxa_real, 0.001)  # Mínimo 0.1% para evitar divisão por zero
-    
     meses_totais = tempo_desejado_anos * 12
     
-    # Fórmula: PMT = (FV * i) / ((1 + i)^n - 1)
-    # Onde: FV = meta - patrimônio atual (valor futuro necessário)
-    fv_necessario = meta_patrimonio - patrimonio_atual
-    
-    if taxa_real <= 0 or meses_totais <= 0:
-        # Se não há rendimento, divide igualmente
-        aporte_mensal = fv_necessario / max(meses_totais, 1)
-    else:
-        # Cálculo com juros compostos
-        fator = (1 + taxa_real) ** meses_totais
-        aporte_mensal = (fv_necessario * taxa_real) / (fator - 1)
+    # Solver único (solver.py): considera o rendimento do patrimônio atual
+    # e trata taxa real zero ou negativa sem clamp artificial
+    aporte_mensal = float(solver.pmt(
+        solver.taxa_real(rendimento_mensal, inflacao_mensal),
+        meses_totais,
+        meta_patrimonio,
+        pv=patrimonio_atual
+    ))
     
     # Verificar viabilidade (se aporte não é absurdamente alto)
     limite_razoavel = 0.5  # 50% da meta como aporte máximo mensal
@@ -906,17 +886,81 @@ def calcular_aporte_ideal_para_meta(
 # EXECUTA PROJEÇÃO (CRIAR df_projecao)
 # =========================================================
 
-df_projecao = projetar_patrimonio(
-    patrimonio_inicial=patrimonio,
-    saldo_fixo_mensal=saldo_fixo,
-    rendimento_mensal=rendimento_mensal,
-    inflacao_mensal=inflacao_mensal,
-    meta_patrimonio=meta_patrimonio,
-    meses=120
+# Recalcula só quando algum parâmetro (ou o mês corrente) muda
+df_projecao = metricas.calcular(
+    "projecao",
+    lambda: projetar_patrimonio(
+        patrimonio_inicial=patrimonio,
+        saldo_fixo_mensal=saldo_fixo,
+        rendimento_mensal=rendimento_mensal,
+        inflacao_mensal=inflacao_mensal,
+        meta_patrimonio=meta_patrimonio,
+        meses=120,
+        fluxo_mensal=saldo_fixo_agenda
+    ),
+    dependencias=("fluxo_fixo",),
+    params=(patrimonio, saldo_fixo, rendimento_mensal, inflacao_mensal, meta_patrimonio, mes_atual)
 )
 
 
-def mostrar_gasto_card(idx, row, df_original, unique_counter):
+# =========================================================
+# GRADE DE LANÇAMENTOS (UM PAYLOAD, LINHAS VIRTUALIZADAS)
+# =========================================================
+ICONES_TIPO = {"Despesa": "📉", "Receita": "💰", "Investimento": "📈"}
+
+COLUNAS_GRADE_LANCAMENTOS = {
+    "data": st.column_config.DateColumn("📅 Data", format="DD/MM/YYYY"),
+    "tipo": st.column_config.TextColumn("Tipo"),
+    "descricao": st.column_config.TextColumn("Descrição", width="large"),
+    "categoria": st.column_config.TextColumn("📂 Categoria"),
+    "subcategoria": st.column_config.TextColumn("🏷️ Subcategoria"),
+    "responsavel": st.column_config.TextColumn("👤 Responsável"),
+    "valor": st.column_config.NumberColumn("Valor (R$)", format="R$ %.2f"),
+    "fixo": st.column_config.CheckboxColumn("🔄 Recorrente")
+}
+
+
+def tabela_lancamentos(df):
+    """
+    Payload da grade de lançamentos: as colunas exibidas, na mesma ordem
+    das linhas de `df` (a posição selecionada na grade é a posição em df).
+    """
+    vazio = pd.Series("", index=df.index)
+    tipo = df["tipo"].astype(str)
+    return pd.DataFrame({
+        "id": df["id"] if "id" in df.columns else pd.Series(None, index=df.index, dtype=object),
+        "data": df["data"],
+        "tipo": tipo.map(ICONES_TIPO).fillna("•") + " " + tipo,
+        "descricao": df.get("descricao", vazio).fillna(""),
+        "categoria": df.get("categoria", vazio).fillna(""),
+        "subcategoria": df.get("subcategoria", vazio).fillna(""),
+        "responsavel": df.get("responsavel", vazio).fillna(""),
+        "valor": df["valor"],
+        "fixo": df.get("fixo", vazio).eq("Sim")
+    }).reset_index(drop=True)
+
+
+def chave_grade(prefixo, df):
+    """
+    Key da grade ligada às linhas exibidas (ordem, filtro e versão da
+    tabela): quando mudam, a seleção antiga é descartada em vez de apontar
+    para outra linha na mesma posição.
+    """
+    assinatura = int(pd.util.hash_pandas_object(df.index.to_series(), index=False).sum())
+    versao = DatabaseManager.table_versions().get("historico", 0)
+    return f"{prefixo}_{versao}_{assinatura:x}"
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def simular_grade_memo(**entradas):
+    """
+    simular_grade memoizado pelas entradas: o Mapa de Cenários roda a cada
+    rerun da página, mas a grade só muda quando algum parâmetro muda.
+    """
+    return simular_grade(**entradas)
+
+
+def mostrar_gasto_card(idx, row, unique_counter):
     """Função auxiliar para mostrar um card de gasto"""
     # Usar um contador único em vez do índice do DataFrame
     unique_key = f"del_btn_{unique_counter}"
@@ -932,246 +976,14 @@ def mostrar_gasto_card(idx, row, df_original, unique_counter):
         dia_semana = ""
         data_completa = data_str
     
-    # 🔥 SISTEMA DE CATEGORIAS AVANÇADO
-    # Definir todas as categorias com palavras-chave
-    CATEGORIAS_DETALHADAS = {
-        # 🍔 ALIMENTAÇÃO
-        "Alimentação - Restaurante": {
-            "palavras": ['restaurante', 'lanche', 'fast food', 'pizza', 'hamburguer', 'mcdonald', 'bk', 'subway'],
-            "cor": "#ef4444",
-            "emoji": "🍔"
-        },
-        "Alimentação - Supermercado": {
-            "palavras": ['mercado', 'supermercado', 'atacadão', 'atacadista', 'extra', 'carrefour', 'pão de açúcar'],
-            "cor": "#dc2626",
-            "emoji": "🛒"
-        },
-        "Alimentação - Café": {
-            "palavras": ['café', 'cafeteria', 'starbucks', 'padaria', 'padoca', 'confeitaria'],
-            "cor": "#92400e",
-            "emoji": "☕"
-        },
-        "Alimentação - Açougue": {
-            "palavras": ['açougue', 'carnes', 'frango', 'peixe', 'peixaria', 'frutos do mar'],
-            "cor": "#b91c1c",
-            "emoji": "🥩"
-        },
-        "Alimentação - Hortifruti": {
-            "palavras": ['feira', 'hortifruti', 'fruta', 'legume', 'verdura', 'sacolão'],
-            "cor": "#16a34a",
-            "emoji": "🍎"
-        },
-        
-        # 🚗 TRANSPORTE
-        "Transporte - Combustível": {
-            "palavras": ['gasolina', 'combustível', 'posto', 'shell', 'ipiranga', 'etanol', 'diesel'],
-            "cor": "#3b82f6",
-            "emoji": "⛽"
-        },
-        "Transporte - Táxi/Uber": {
-            "palavras": ['uber', 'táxi', '99', 'cabify', 'corrida', 'transporte'],
-            "cor": "#1d4ed8",
-            "emoji": "🚕"
-        },
-        "Transporte - Público": {
-            "palavras": ['ônibus', 'metro', 'trem', 'bilhete', 'passagem', 'recarga', 'cartão transporte'],
-            "cor": "#1e40af",
-            "emoji": "🚌"
-        },
-        "Transporte - Estacionamento": {
-            "palavras": ['estacionamento', 'parking', 'garagem', 'zona azul'],
-            "cor": "#0ea5e9",
-            "emoji": "🅿️"
-        },
-        "Transporte - Manutenção": {
-            "palavras": ['oficina', 'mecânico', 'troca de óleo', 'pneu', 'lavagem', 'manutenção carro'],
-            "cor": "#6366f1",
-            "emoji": "🛠️"
-        },
-        
-        # 🏠 CASA
-        "Casa - Aluguel": {
-            "palavras": ['aluguel', 'condomínio', 'iptu', 'taxa condominial'],
-            "cor": "#8b5cf6",
-            "emoji": "🏠"
-        },
-        "Casa - Energia": {
-            "palavras": ['luz', 'energia', 'conta de luz', 'energisa', 'enel', 'light'],
-            "cor": "#f59e0b",
-            "emoji": "💡"
-        },
-        "Casa - Água": {
-            "palavras": ['água', 'conta de água', 'sabesp', 'cedae', 'caesb'],
-            "cor": "#0ea5e9",
-            "emoji": "💧"
-        },
-        "Casa - Gás": {
-            "palavras": ['gás', 'botijão', 'gás natural', 'conta de gás'],
-            "cor": "#ef4444",
-            "emoji": "🔥"
-        },
-        "Casa - Internet/TV": {
-            "palavras": ['internet', 'net', 'claro', 'vivo', 'oi', 'sky', 'tv a cabo'],
-            "cor": "#8b5cf6",
-            "emoji": "📡"
-        },
-        
-        # 🛒 COMPRAS
-        "Compras - Roupas": {
-            "palavras": ['roupa', 'calçado', 'sapato', 'tenis', 'camiseta', 'loja de roupa', 'renner', 'c&a'],
-            "cor": "#ec4899",
-            "emoji": "👕"
-        },
-        "Compras - Eletrônicos": {
-            "palavras": ['celular', 'notebook', 'tablet', 'tv', 'eletrônico', 'informática'],
-            "cor": "#6b7280",
-            "emoji": "📱"
-        },
-        "Compras - Beleza": {
-            "palavras": ['farmácia', 'drogaria', 'perfume', 'maquiagem', 'cosmético', 'beleza'],
-            "cor": "#f472b6",
-            "emoji": "💄"
-        },
-        "Compras - Livros": {
-            "palavras": ['livro', 'revista', 'jornal', 'leitura', 'livraria', 'saraiva', 'cultura'],
-            "cor": "#84cc16",
-            "emoji": "📚"
-        },
-        "Compras - Presentes": {
-            "palavras": ['presente', 'aniversário', 'natal', 'dia das mães', 'dia dos pais'],
-            "cor": "#a855f7",
-            "emoji": "🎁"
-        },
-        
-        # 🎯 LAZER
-        "Lazer - Cinema": {
-            "palavras": ['cinema', 'filme', 'ingresso', 'netflix', 'prime video', 'disney+'],
-            "cor": "#a78bfa",
-            "emoji": "🎬"
-        },
-        "Lazer - Bar": {
-            "palavras": ['bar', 'boteco', 'cerveja', 'drink', 'happy hour', 'balada'],
-            "cor": "#f59e0b",
-            "emoji": "🍻"
-        },
-        "Lazer - Viagem": {
-            "palavras": ['viagem', 'hotel', 'passagem', 'turismo', 'resort', 'pousada'],
-            "cor": "#3b82f6",
-            "emoji": "✈️"
-        },
-        "Lazer - Games": {
-            "palavras": ['jogo', 'game', 'playstation', 'xbox', 'steam', 'nintendo'],
-            "cor": "#8b5cf6",
-            "emoji": "🎮"
-        },
-        "Lazer - Esportes": {
-            "palavras": ['academia', 'ginásio', 'esporte', 'natação', 'futebol', 'personal trainer'],
-            "cor": "#10b981",
-            "emoji": "🏋️"
-        },
-        
-        # 💼 TRABALHO
-        "Trabalho - Material": {
-            "palavras": ['material', 'escritório', 'caneta', 'papel', 'impressão', 'toner'],
-            "cor": "#6b7280",
-            "emoji": "📎"
-        },
-        "Trabalho - Software": {
-            "palavras": ['software', 'assinatura', 'licença', 'app', 'aplicativo', 'programa'],
-            "cor": "#3b82f6",
-            "emoji": "💻"
-        },
-        "Trabalho - Telefone": {
-            "palavras": ['telefone', 'celular empresa', 'recarga', 'plano empresarial'],
-            "cor": "#10b981",
-            "emoji": "📞"
-        },
-        
-        # 🧑‍⚕️ SAÚDE
-        "Saúde - Consulta": {
-            "palavras": ['consulta', 'médico', 'dentista', 'psicólogo', 'terapia', 'clínica'],
-            "cor": "#10b981",
-            "emoji": "🏥"
-        },
-        "Saúde - Medicamento": {
-            "palavras": ['remédio', 'medicamento', 'farmacia', 'drogaria'],
-            "cor": "#ef4444",
-            "emoji": "💊"
-        },
-        "Saúde - Plano": {
-            "palavras": ['plano de saúde', 'unimed', 'amil', 'sulamerica'],
-            "cor": "#dc2626",
-            "emoji": "❤️"
-        },
-        
-        # 🧾 FINANÇAS
-        "Finanças - Taxa Bancária": {
-            "palavras": ['taxa', 'tarifa', 'anuidade', 'banco', 'cartão', 'empréstimo'],
-            "cor": "#059669",
-            "emoji": "🏦"
-        },
-        "Finanças - Investimento": {
-            "palavras": ['investimento', 'ações', 'fii', 'tesouro', 'cdb', 'bolsa'],
-            "cor": "#84cc16",
-            "emoji": "📈"
-        },
-        "Finanças - Seguro": {
-            "palavras": ['seguro', 'apólice', 'previdência', 'resgate'],
-            "cor": "#3b82f6",
-            "emoji": "🛡️"
-        },
-        
-        # 👨‍👩‍👧‍👦 FAMÍLIA
-        "Família - Filhos": {
-            "palavras": ['creche', 'escola', 'material escolar', 'uniforme', 'curso', 'aula'],
-            "cor": "#f472b6",
-            "emoji": "👶"
-        },
-        "Família - Pets": {
-            "palavras": ['pet', 'veterinário', 'ração', 'gato', 'cachorro', 'animal'],
-            "cor": "#f59e0b",
-            "emoji": "🐕"
-        },
-        "Família - Eventos": {
-            "palavras": ['festa', 'casamento', 'formatura', 'comemoração', 'confraternização'],
-            "cor": "#8b5cf6",
-            "emoji": "🎉"
-        },
-        
-        # 💰 OUTROS
-        "Outros - Assinaturas": {
-            "palavras": ['assinatura', 'streaming', 'spotify', 'youtube premium'],
-            "cor": "#6b7280",
-            "emoji": "🎫"
-        },
-        "Outros - Variados": {
-            "palavras": [],
-            "cor": "#9ca3af",
-            "emoji": "📝"
-        }
+    # 🔥 SISTEMA DE CATEGORIAS AVANÇADO (categorizador compilado, com cache)
+    cat_nome = CATEGORIZADOR_CARD.classificar(row['descricao'])
+    categoria_detectada = {
+        "nome": cat_nome,
+        "cor": CATEGORIAS_DETALHADAS[cat_nome]["cor"],
+        "emoji": CATEGORIAS_DETALHADAS[cat_nome]["emoji"]
     }
     
-    # Determinar categoria automaticamente
-    desc_lower = row['descricao'].lower()
-    categoria_detectada = None
-    
-    for cat_nome, cat_info in CATEGORIAS_DETALHADAS.items():
-        if any(palavra in desc_lower for palavra in cat_info["palavras"]):
-            categoria_detectada = {
-                "nome": cat_nome,
-                "cor": cat_info["cor"],
-                "emoji": cat_info["emoji"]
-            }
-            break
-    
-    # Se não detectou, usar "Outros"
-    if not categoria_detectada:
-        categoria_detectada = {
-            "nome": "Outros - Variados",
-            "cor": "#9ca3af",
-            "emoji": "📝"
-        }
-    
     # Card para cada gasto
     with st.container():
         st.markdown(f"""
@@ -1242,38 +1054,19 @@ def mostrar_gasto_card(idx, row, df_original, unique_counter):
                 col_conf1, col_conf2 = st.columns(2)
                 with col_conf1:
                     if st.button("✅ Sim", key=f"confirm_yes_{unique_key}", use_container_width=True):
-                        row_data = row['data']
-                        
-                        if isinstance(row_data, pd.Timestamp):
-                            row_data_date = row_data.date()
-                        elif isinstance(row_data, str):
-                            row_data_date = pd.to_datetime(row_data).date()
-                        else:
-                            row_data_date = row_data
+                        # Exclui pelo id (exato e O(1)), direto na tabela da sessão
+                        df_novo = DatabaseManager.delete_row(
+                            "controle_gastos", dados["controle_gastos"], usuario, row.get('id'), linha=idx
+                        )
                         
-                        for df_idx, df_row in df_original.iterrows():
-                            df_row_data = df_row['data']
-                            
-                            if isinstance(df_row_data, pd.Timestamp):
-                                df_row_data_date = df_row_data.date()
-                            elif isinstance(df_row_data, str):
-                                df_row_data_date = pd.to_datetime(df_row_data).date()
-                            else:
-                                df_row_data_date = df_row_data
+                        if df_novo is not None:
+                            dados["controle_gastos"] = df_novo
+                            st.session_state["dados"] = dados
+                            DatabaseManager.save("controle_gastos", df_novo, usuario)
                             
-                            if (df_row_data_date == row_data_date and 
-                                df_row['descricao'] == row['descricao'] and 
-                                df_row['valor'] == row['valor']):
-                                
-                                df_novo = df_original.drop(df_idx).reset_index(drop=True)
-                                dados["controle_gastos"] = df_novo
-                                st.session_state["dados"] = dados
-                                DatabaseManager.save("controle_gastos", df_novo, usuario)
-                                
-                                st.session_state[f"confirm_delete_{unique_key}"] = False
-                                st.success("Gasto excluído!")
-                                st.rerun()
-                                break
+                            st.session_state[f"confirm_delete_{unique_key}"] = False
+                            st.success("Gasto excluído!")
+                            st.rerun()
                         
                         st.session_state[f"confirm_delete_{unique_key}"] = False
                         st.error("Não foi possível encontrar o gasto para exclusão.")
@@ -1564,6 +1357,21 @@ with st.sidebar:
             data_hoje=date.today().strftime("%d/%m/%Y")
         ), unsafe_allow_html=True)
 
+    # ===============================
+    # SINCRONIZAÇÃO (JOURNAL LOCAL)
+    # ===============================
+    status_journal = DatabaseManager.journal_status()
+    if status_journal:
+        if status_journal["pendentes"]:
+            st.caption(f"🔄 {status_journal['pendentes']} alteração(ões) aguardando sincronização")
+        if status_journal["ultimo_erro"]:
+            st.caption("📴 Servidor indisponível — suas alterações estão salvas localmente")
+        if status_journal["erros"] or status_journal["conflitos"]:
+            st.caption(
+                f"⚠️ {status_journal['erros']} erro(s) e "
+                f"{status_journal['conflitos']} conflito(s) de sincronização"
+            )
+
     # ===============================
     # BOTÃO DE LOGOUT ESTILIZADO
     # ===============================
@@ -1583,6 +1391,9 @@ with st.sidebar:
 # =========================================================
 
 if menu == "📝 LANÇAMENTOS":
+
+    # Colunas pesadas desta tela (fora do carregamento inicial)
+    DatabaseManager.ensure_view(dados, "lancamentos", usuario)
     
     st.markdown("""
     <div style="
@@ -1656,28 +1467,12 @@ if menu == "📝 LANÇAMENTOS":
     hoje = date.today()
     mes_atual = hoje.strftime("%Y-%m")
     
-    if not dados["historico"].empty:
-        df_historico = dados["historico"].copy()
-        df_historico.columns = df_historico.columns.str.lower()
-        
-        # Converter data
-        df_historico["data"] = pd.to_datetime(df_historico["data"], errors='coerce')
-        df_historico["mes"] = df_historico["data"].dt.strftime("%Y-%m")
-        
-        # Filtrar mês atual
-        historico_mes = df_historico[df_historico["mes"] == mes_atual]
-        
-        if not historico_mes.empty:
-            receitas_mes = historico_mes[historico_mes["tipo"].str.lower() == "receita"]["valor"].sum()
-            despesas_mes = historico_mes[historico_mes["tipo"].str.lower() == "despesa"]["valor"].sum()
-            investimentos_mes = historico_mes[historico_mes["tipo"].str.lower() == "investimento"]["valor"].sum()
-            total_mes = len(historico_mes)
-        else:
-            receitas_mes = despesas_mes = investimentos_mes = 0
-            total_mes = 0
-    else:
-        receitas_mes = despesas_mes = investimentos_mes = 0
-        total_mes = 0
+    # Totais do mês direto do cubo mensal (atualizado a cada save)
+    cubo_historico = DatabaseManager.cube("historico", usuario, dados["historico"])
+    receitas_mes = cubo_historico.soma(mes_atual, tipo="Receita")
+    despesas_mes = cubo_historico.soma(mes_atual, tipo="Despesa")
+    investimentos_mes = cubo_historico.soma(mes_atual, tipo="Investimento")
+    total_mes = cubo_historico.contagem(mes_atual)
     
     saldo_mes = receitas_mes - despesas_mes - investimentos_mes
 
@@ -1874,12 +1669,12 @@ if menu == "📝 LANÇAMENTOS":
                         st.error("❌ O valor deve ser maior que zero.")
                         st.stop()
                     
-                    # CORREÇÃO: Garantir que a data seja salva como string ISO para consistência
-                    data_iso = data.isoformat()  # Converte date para string no formato YYYY-MM-DD
+                    # Mesmo tipo do schema (datetime64); o save converte para ISO
+                    data_ts = pd.Timestamp(data)
                     
                     # Criar novo lançamento
                     nova = pd.DataFrame([{
-                        "data": data_iso,  # Salva como string ISO
+                        "data": data_ts,
                         "tipo": tipo,
                         "valor": valor,
                         "categoria": categoria,
@@ -1918,76 +1713,29 @@ if menu == "📝 LANÇAMENTOS":
     # ================= HISTÓRICO DE LANÇAMENTOS =================
     st.markdown("### 📋 Histórico de Transações")
 
+    meses_carregados = st.secrets.get("MESES_CARREGADOS")
+    if meses_carregados:
+        st.caption(
+            f"🗓️ Lista com os lançamentos dos últimos {int(meses_carregados)} meses; "
+            "totais e gráficos mensais consideram todo o histórico."
+        )
+
     if not dados["historico"].empty:
         df_historico_total = dados["historico"].copy()
         df_historico_total.columns = df_historico_total.columns.str.lower()
         
-        # CORREÇÃO ROBUSTA: Função para converter QUALQUER formato de data para datetime
-        def converter_data_para_datetime(data_value):
-            """Converte qualquer formato de data para datetime pandas"""
-            # Se for NaN ou None
-            if pd.isna(data_value) or data_value is None:
-                return pd.NaT
-            
-            # Se já for pandas Timestamp, retorna como está
-            if isinstance(data_value, pd.Timestamp):
-                return data_value
-            
-            # Se for datetime.datetime, converte para Timestamp
-            if isinstance(data_value, datetime):  # CORREÇÃO AQUI: apenas datetime
-                return pd.Timestamp(data_value)
-            
-            # Se for date object, converte
-            if isinstance(data_value, date):
-                return pd.Timestamp(data_value)
-            
-            # Se for string, tenta vários formatos
-            if isinstance(data_value, str):
-                # Remove espaços extras
-                data_str = data_value.strip()
-                
-                # Se string vazia
-                if not data_str:
-                    return pd.NaT
-                
-                # Tenta diferentes formatos de data
-                formatos = [
-                    '%Y-%m-%d',      # 2024-01-26
-                    '%d/%m/%Y',      # 26/01/2024
-                    '%d-%m-%Y',      # 26-01-2024
-                    '%Y/%m/%d',      # 2024/01/26
-                    '%d.%m.%Y',      # 26.01.2024
-                    '%Y-%m-%d %H:%M:%S',  # Com hora
-                    '%d/%m/%Y %H:%M:%S',  # Com hora
-                ]
-                
-                for formato in formatos:
-                    try:
-                        return pd.to_datetime(data_str, format=formato)
-                    except:
-                        continue
-                
-                # Se nenhum formato funcionar, tenta conversão genérica
-                try:
-                    return pd.to_datetime(data_str, errors='coerce')
-                except:
-                    return pd.NaT
-            
-            # Para qualquer outro tipo, tenta converter
-            try:
-                return pd.to_datetime(data_value, errors='coerce')
-            except:
-                return pd.NaT
-        
-        # Aplicar a conversão a TODAS as datas
+        # Converter TODAS as datas de uma vez (vários formatos, vetorizado)
         if "data" in df_historico_total.columns:
-            df_historico_total["data"] = df_historico_total["data"].apply(converter_data_para_datetime)
+            df_historico_total["data"] = parse_datas(
+                df_historico_total["data"],
+                chave="historico.data"
+            )
             
-            # Remover entradas com datas inválidas
-            df_historico_total = df_historico_total.dropna(subset=["data"])
-        
-        # CORREÇÃO: Garantir que o tipo seja datetime64[ns]
-        df_historico_total["data"] = pd.to_datetime(df_historico_total["data"])
+            # Remover entradas sem data válida (inválida ou vazia), sempre
+            sem_data = int(df_historico_total["data"].isna().sum())
+            if sem_data:
+                st.caption(f"⚠️ {sem_data} lançamento(s) sem data válida foram ocultados.")
+                df_historico_total = df_historico_total.dropna(subset=["data"])
         
         # Agora sim pode ordenar
         df_historico_total = df_historico_total.sort_values("data", ascending=False)
@@ -2072,48 +1820,33 @@ if menu == "📝 LANÇAMENTOS":
         </div>
         """, unsafe_allow_html=True)
         
-        # CORREÇÃO: Definir total_paginas com valor padrão
-        total_paginas = 1  # Valor padrão mínimo
-        
-        # CORREÇÃO: Verificar se há dados filtrados antes de mostrar paginação
         if total_filtrado > 0:
-            # Paginação
-            if "pagina_lancamentos" not in st.session_state:
-                st.session_state["pagina_lancamentos"] = 1
-            
-            itens_por_pagina = 10
-            total_paginas = max(1, (total_filtrado - 1) // itens_por_pagina + 1)  # Garantir no mínimo 1 página
-            
-            # Ajustar página atual se necessário
-            if st.session_state["pagina_lancamentos"] > total_paginas:
-                st.session_state["pagina_lancamentos"] = total_paginas
-            
-            # Controle de página
-            col_pagina1, col_pagina2, col_pagina3 = st.columns([1, 2, 1])
-            with col_pagina2:
-                pagina_selecionada = st.number_input(
-                    "📄 Página",
-                    min_value=1,
-                    max_value=total_paginas,
-                    value=st.session_state["pagina_lancamentos"],
-                    key="pagina_input_lanc"
-                )
-            
-            # Atualizar se o usuário mudou manualmente
-            if pagina_selecionada != st.session_state["pagina_lancamentos"]:
-                st.session_state["pagina_lancamentos"] = pagina_selecionada
-                st.rerun()
-            
-            inicio = (st.session_state["pagina_lancamentos"] - 1) * itens_por_pagina
-            fim = min(inicio + itens_por_pagina, total_filtrado)
-            
-            # Mostrar transações da página atual
-            df_pagina = df_filtrado.iloc[inicio:fim].reset_index(drop=True)
+            # Grade única e virtualizada: um payload com todas as transações
+            # filtradas; o navegador só desenha as linhas visíveis e a seleção
+            # de linha volta como um único evento
+            tabela = tabela_lancamentos(df_filtrado)
+            evento = st.dataframe(
+                tabela,
+                column_config=COLUNAS_GRADE_LANCAMENTOS,
+                column_order=[col for col in tabela.columns if col != "id"],
+                hide_index=True,
+                use_container_width=True,
+                height=420,
+                on_select="rerun",
+                selection_mode="single-row",
+                key=chave_grade("grade_lancamentos", df_filtrado)
+            )
+            st.caption(f"📋 {total_filtrado} transações • selecione uma linha para editar, excluir ou mudar a recorrência")
             
-            # Mostrar cards das transações
-            for idx, row in df_pagina.iterrows():
-                # Encontrar o índice original correspondente
-                idx_original = df_filtrado.iloc[inicio:fim].index[idx]
+            linhas_selecionadas = evento.selection.rows
+            if linhas_selecionadas:
+                row = df_filtrado.iloc[linhas_selecionadas[0]]
+                
+                # Chave estável da linha (id do banco): ações e widgets seguem
+                # o lançamento mesmo depois de exclusões e reordenações
+                row_id = row.get('id')
+                rotulo = df_filtrado.index[linhas_selecionadas[0]]
+                idx_original = row_id if pd.notna(row_id) else f"novo_{rotulo}"
                 
                 # Dados da transação
                 data_transacao = row['data']
@@ -2124,271 +1857,186 @@ if menu == "📝 LANÇAMENTOS":
                 responsavel_transacao = row['responsavel']
                 fixo_transacao = row.get('fixo', 'Não')
                 subcategoria_transacao = row.get('subcategoria', '')
-                
+
                 # Formatar data
                 if isinstance(data_transacao, pd.Timestamp):
                     data_formatada = data_transacao.strftime("%d/%m/%Y")
-                    dia_semana = data_transacao.strftime("%a")
                 else:
                     data_formatada = str(data_transacao)[:10]
-                    dia_semana = ""
-                
-                # Cores baseadas no tipo
-                if tipo_transacao == "Despesa":
-                    cor_tipo = "#ef4444"
-                    icone_tipo = "📉"
-                    prefixo_valor = "-"
-                elif tipo_transacao == "Receita":
-                    cor_tipo = "#10b981"
-                    icone_tipo = "💰"
-                    prefixo_valor = "+"
-                else:  # Investimento
-                    cor_tipo = "#3b82f6"
-                    icone_tipo = "📈"
-                    prefixo_valor = "↗️"
+
+                st.markdown(f"**{descricao_transacao[:50]}** • 📅 {data_formatada} • R$ {valor_transacao:,.2f}")
                 
-                # Card para cada transação
-                with st.container():
-                    st.markdown(f"""
-                    <div style="
-                        background: #1f2937;
-                        border-radius: 12px;
-                        padding: 20px;
-                        margin-bottom: 16px;
-                        border-left: 4px solid {cor_tipo};
-                        border: 1px solid #374151;
-                    ">
-                    """, unsafe_allow_html=True)
-                    
-                    # Cabeçalho
-                    col_header1, col_header2 = st.columns([3, 1])
-                    
-                    with col_header1:
-                        st.markdown(f"""
-                        <div style="
-                            font-size: 18px;
-                            font-weight: bold;
-                            color: #f9fafb;
-                            margin-bottom: 4px;
-                        ">{icone_tipo} {descricao_transacao[:50]}{'...' if len(descricao_transacao) > 50 else ''}</div>
-                        <div style="
-                            font-size: 14px;
-                            color: #9ca3af;
-                            margin-bottom: 8px;
-                        ">
-                            📂 {categoria_transacao} • 👤 {responsavel_transacao} • 📅 {data_formatada} {f'({dia_semana})' if dia_semana else ''}
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col_header2:
-                        st.markdown(f"""
-                        <div style="text-align: right;">
-                            <div style="
-                                font-size: 24px;
-                                font-weight: bold;
-                                color: {cor_tipo};
-                                margin-bottom: 4px;
-                            ">{prefixo_valor} R$ {valor_transacao:,.2f}</div>
-                            <div style="
-                                font-size: 12px;
-                                color: #6b7280;
-                            ">
-                                {tipo_transacao} {'• 🔄 Recorrente' if fixo_transacao == 'Sim' else ''}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Subcategoria se existir
-                    if subcategoria_transacao:
-                        st.markdown(f"""
-                        <div style="
-                            background: {cor_tipo}20;
-                            border-radius: 6px;
-                            padding: 8px 12px;
-                            margin-top: 8px;
-                            display: inline-block;
-                        ">
-                            <span style="font-size: 12px; color: {cor_tipo};">
-                                🏷️ {subcategoria_transacao}
-                            </span>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Ações
-                    st.markdown("<div style='margin-top: 16px;'></div>", unsafe_allow_html=True)
-                    
-                    col_acoes1, col_acoes2, col_acoes3 = st.columns(3, gap="small")
-                    
-                    with col_acoes1:
-                        # Botão para marcar como recorrente/não recorrente
-                        if fixo_transacao == 'Sim':
-                            if st.button("🔄 Não Recorrente", key=f"fixo_no_{idx_original}", use_container_width=True):
-                                df_historico_total.at[idx_original, 'fixo'] = 'Não'
-                                dados["historico"] = df_historico_total
-                                st.session_state["dados"] = dados
-                                DatabaseManager.save("historico", df_historico_total, usuario)
-                                st.session_state["msg"] = "Transação marcada como não recorrente!"
-                                st.session_state["msg_tipo"] = "success"
-                                st.rerun()
-                        else:
-                            if st.button("🔄 Tornar Recorrente", key=f"fixo_sim_{idx_original}", use_container_width=True):
-                                df_historico_total.at[idx_original, 'fixo'] = 'Sim'
-                                dados["historico"] = df_historico_total
-                                st.session_state["dados"] = dados
-                                DatabaseManager.save("historico", df_historico_total, usuario)
-                                st.session_state["msg"] = "Transação marcada como recorrente!"
-                                st.session_state["msg_tipo"] = "success"
-                                st.rerun()
-                    
-                    with col_acoes2:
-                        # Botão de edição rápida
-                        if st.button("✏️ Editar", key=f"edit_lanc_{idx_original}", use_container_width=True):
-                            st.session_state[f"editing_lanc_{idx_original}"] = True
+                # Ações
+                st.markdown("<div style='margin-top: 16px;'></div>", unsafe_allow_html=True)
+
+                col_acoes1, col_acoes2, col_acoes3 = st.columns(3, gap="small")
+
+                with col_acoes1:
+                    # Botão para marcar como recorrente/não recorrente
+                    if fixo_transacao == 'Sim':
+                        if st.button("🔄 Não Recorrente", key=f"fixo_no_{idx_original}", use_container_width=True):
+                            DatabaseManager.update_row("historico", dados["historico"], usuario, row_id, {"fixo": "Não"}, linha=rotulo)
+                            st.session_state["dados"] = dados
+                            DatabaseManager.save("historico", dados["historico"], usuario)
+                            st.session_state["msg"] = "Transação marcada como não recorrente!"
+                            st.session_state["msg_tipo"] = "success"
                             st.rerun()
-                    
-                    with col_acoes3:
-                        # Botão de exclusão com confirmação
-                        if st.button("🗑️ Excluir", key=f"del_lanc_{idx_original}", use_container_width=True, type="secondary"):
-                            st.session_state[f"confirm_del_lanc_{idx_original}"] = True
+                    else:
+                        if st.button("🔄 Tornar Recorrente", key=f"fixo_sim_{idx_original}", use_container_width=True):
+                            DatabaseManager.update_row("historico", dados["historico"], usuario, row_id, {"fixo": "Sim"}, linha=rotulo)
+                            st.session_state["dados"] = dados
+                            DatabaseManager.save("historico", dados["historico"], usuario)
+                            st.session_state["msg"] = "Transação marcada como recorrente!"
+                            st.session_state["msg_tipo"] = "success"
                             st.rerun()
-                    
-                    # Confirmação de exclusão
-                    if st.session_state.get(f"confirm_del_lanc_{idx_original}", False):
 
-                        
-                        col_confirm1, col_confirm2 = st.columns([2, 1])
-                        
-                        with col_confirm1:
-                            st.warning(f"⚠️ **Confirmar exclusão da transação?**")
-                            st.caption(f"'{descricao_transacao[:50]}...' • {data_formatada} • R$ {valor_transacao:,.2f}")
-                        
-                        with col_confirm2:
-                            col_yes, col_no = st.columns(2)
-                            with col_yes:
-                                if st.button("✅ Sim", key=f"yes_del_lanc_{idx_original}", use_container_width=True):
-                                    # Excluir transação
-                                    df_historico_total = df_historico_total.drop(idx_original).reset_index(drop=True)
-                                    dados["historico"] = df_historico_total
+                with col_acoes2:
+                    # Botão de edição rápida
+                    if st.button("✏️ Editar", key=f"edit_lanc_{idx_original}", use_container_width=True):
+                        st.session_state[f"editing_lanc_{idx_original}"] = True
+                        st.rerun()
+
+                with col_acoes3:
+                    # Botão de exclusão com confirmação
+                    if st.button("🗑️ Excluir", key=f"del_lanc_{idx_original}", use_container_width=True, type="secondary"):
+                        st.session_state[f"confirm_del_lanc_{idx_original}"] = True
+                        st.rerun()
+
+                # Confirmação de exclusão
+                if st.session_state.get(f"confirm_del_lanc_{idx_original}", False):
+
+
+                    col_confirm1, col_confirm2 = st.columns([2, 1])
+
+                    with col_confirm1:
+                        st.warning(f"⚠️ **Confirmar exclusão da transação?**")
+                        st.caption(f"'{descricao_transacao[:50]}...' • {data_formatada} • R$ {valor_transacao:,.2f}")
+
+                    with col_confirm2:
+                        col_yes, col_no = st.columns(2)
+                        with col_yes:
+                            if st.button("✅ Sim", key=f"yes_del_lanc_{idx_original}", use_container_width=True):
+                                # Excluir transação (pelo id, na tabela da sessão)
+                                df_novo = DatabaseManager.delete_row("historico", dados["historico"], usuario, row_id, linha=rotulo)
+                                if df_novo is not None:
+                                    dados["historico"] = df_novo
                                     st.session_state["dados"] = dados
-                                    DatabaseManager.save("historico", df_historico_total, usuario)
+                                    DatabaseManager.save("historico", df_novo, usuario)
                                     st.session_state["msg"] = f"✅ Transação excluída com sucesso!"
                                     st.session_state["msg_tipo"] = "success"
-                                    st.session_state[f"confirm_del_lanc_{idx_original}"] = False
-                                    st.rerun()
-                            with col_no:
-                                if st.button("❌ Não", key=f"no_del_lanc_{idx_original}", use_container_width=True):
-                                    st.session_state[f"confirm_del_lanc_{idx_original}"] = False
-                                    st.rerun()
-                        
-                        st.markdown("</div>", unsafe_allow_html=True)
-                    
-                    # Formulário de edição
-                    if st.session_state.get(f"editing_lanc_{idx_original}", False):
+                                else:
+                                    st.session_state["msg"] = "❌ Transação não encontrada."
+                                    st.session_state["msg_tipo"] = "error"
+                                st.session_state[f"confirm_del_lanc_{idx_original}"] = False
+                                st.rerun()
+                        with col_no:
+                            if st.button("❌ Não", key=f"no_del_lanc_{idx_original}", use_container_width=True):
+                                st.session_state[f"confirm_del_lanc_{idx_original}"] = False
+                                st.rerun()
 
-                        
-                        with st.form(f"form_edit_lanc_{idx_original}"):
-                            st.markdown(f"### ✏️ Editando: {descricao_transacao[:30]}...")
-                            
-                            col_edit1, col_edit2 = st.columns(2, gap="small")
-                            
-                            with col_edit1:
-                                edit_data = st.date_input(
-                                    "Data",
-                                    value=pd.to_datetime(data_transacao).date() if isinstance(data_transacao, pd.Timestamp) else date.today(),
-                                    key=f"edit_data_lanc_{idx_original}"
-                                )
-                                
-                                edit_tipo = st.selectbox(
-                                    "Tipo",
-                                    ["Despesa", "Receita", "Investimento"],
-                                    index=["Despesa", "Receita", "Investimento"].index(tipo_transacao) if tipo_transacao in ["Despesa", "Receita", "Investimento"] else 0,
-                                    key=f"edit_tipo_lanc_{idx_original}"
-                                )
-                                
-                                edit_valor = st.number_input(
-                                    "Valor (R$)",
-                                    min_value=0.0,
-                                    step=10.0,
-                                    value=valor_transacao,
-                                    key=f"edit_valor_lanc_{idx_original}"
-                                )
-                            
-                            with col_edit2:
-                                edit_categoria = st.selectbox(
-                                    "Categoria",
-                                    categorias_disponiveis,
-                                    index=categorias_disponiveis.index(categoria_transacao) if categoria_transacao in categorias_disponiveis else 0,
-                                    key=f"edit_cat_lanc_{idx_original}"
-                                )
-                                
-                                edit_subcategoria = st.text_input(
-                                    "Subcategoria",
-                                    value=subcategoria_transacao,
-                                    key=f"edit_subcat_lanc_{idx_original}"
-                                )
-                                
-                                edit_responsavel = st.radio(
-                                    "Responsável",
-                                    ["🧔 Ele", "👩‍🦰 Ela", "👨‍👩‍👧‍👦 Compartilhado"],
-                                    index=["🧔 Ele", "👩‍🦰 Ela", "👨‍👩‍👧‍👦 Compartilhado"].index(responsavel_transacao) if responsavel_transacao in ["🧔 Ele", "👩‍🦰 Ela", "👨‍👩‍👧‍👦 Compartilhado"] else 0,
-                                    horizontal=True,
-                                    key=f"edit_resp_lanc_{idx_original}"
-                                )
-                            
-                            edit_descricao = st.text_input(
-                                "Descrição",
-                                value=descricao_transacao,
-                                key=f"edit_desc_lanc_{idx_original}"
+                    st.markdown("</div>", unsafe_allow_html=True)
+
+                # Formulário de edição
+                if st.session_state.get(f"editing_lanc_{idx_original}", False):
+
+
+                    with st.form(f"form_edit_lanc_{idx_original}"):
+                        st.markdown(f"### ✏️ Editando: {descricao_transacao[:30]}...")
+
+                        col_edit1, col_edit2 = st.columns(2, gap="small")
+
+                        with col_edit1:
+                            edit_data = st.date_input(
+                                "Data",
+                                value=pd.to_datetime(data_transacao).date() if isinstance(data_transacao, pd.Timestamp) else date.today(),
+                                key=f"edit_data_lanc_{idx_original}"
                             )
-                            
-                            edit_fixo = st.checkbox(
-                                "Recorrente",
-                                value=fixo_transacao == 'Sim',
-                                key=f"edit_fixo_lanc_{idx_original}"
+
+                            edit_tipo = st.selectbox(
+                                "Tipo",
+                                ["Despesa", "Receita", "Investimento"],
+                                index=["Despesa", "Receita", "Investimento"].index(tipo_transacao) if tipo_transacao in ["Despesa", "Receita", "Investimento"] else 0,
+                                key=f"edit_tipo_lanc_{idx_original}"
                             )
-                            
-                            col_save, col_cancel = st.columns(2, gap="medium")
-                            with col_save:
-                                if st.form_submit_button(
-                                    "💾 Salvar Alterações",
-                                    use_container_width=True,
-                                    type="primary"
-                                ):
-                                    # Atualizar os dados
-                                    df_historico_total.at[idx_original, 'data'] = edit_data
-                                    df_historico_total.at[idx_original, 'tipo'] = edit_tipo
-                                    df_historico_total.at[idx_original, 'valor'] = float(edit_valor)
-                                    df_historico_total.at[idx_original, 'categoria'] = edit_categoria
-                                    df_historico_total.at[idx_original, 'subcategoria'] = edit_subcategoria.strip()
-                                    df_historico_total.at[idx_original, 'descricao'] = edit_descricao.strip()
-                                    df_historico_total.at[idx_original, 'responsavel'] = edit_responsavel
-                                    df_historico_total.at[idx_original, 'fixo'] = 'Sim' if edit_fixo else 'Não'
-                                    
-                                    dados["historico"] = df_historico_total
-                                    st.session_state["dados"] = dados
-                                    DatabaseManager.save("historico", df_historico_total, usuario)
-                                    
-                                    st.session_state[f"editing_lanc_{idx_original}"] = False
-                                    st.session_state["msg"] = f"✅ Transação atualizada com sucesso!"
-                                    st.session_state["msg_tipo"] = "success"
-                                    st.rerun()
-                            
-                            with col_cancel:
-                                if st.form_submit_button(
-                                    "❌ Cancelar",
-                                    use_container_width=True,
-                                    type="secondary"
-                                ):
-                                    st.session_state[f"editing_lanc_{idx_original}"] = False
-                                    st.rerun()
-                        
-                        st.markdown("</div>", unsafe_allow_html=True)
-                    
-                    st.markdown("</div>", unsafe_allow_html=True)
-            
-            # CORREÇÃO: Apenas mostrar a legenda de paginação se houver transações
-            if total_filtrado > 0:
-                st.caption(f"📄 Página {st.session_state['pagina_lancamentos']} de {total_paginas} • {total_filtrado} transações no total")
+
+                            edit_valor = st.number_input(
+                                "Valor (R$)",
+                                min_value=0.0,
+                                step=10.0,
+                                value=valor_transacao,
+                                key=f"edit_valor_lanc_{idx_original}"
+                            )
+
+                        with col_edit2:
+                            edit_categoria = st.selectbox(
+                                "Categoria",
+                                categorias_disponiveis,
+                                index=categorias_disponiveis.index(categoria_transacao) if categoria_transacao in categorias_disponiveis else 0,
+                                key=f"edit_cat_lanc_{idx_original}"
+                            )
+
+                            edit_subcategoria = st.text_input(
+                                "Subcategoria",
+                                value=subcategoria_transacao,
+                                key=f"edit_subcat_lanc_{idx_original}"
+                            )
+
+                            edit_responsavel = st.radio(
+                                "Responsável",
+                                ["🧔 Ele", "👩‍🦰 Ela", "👨‍👩‍👧‍👦 Compartilhado"],
+                                index=["🧔 Ele", "👩‍🦰 Ela", "👨‍👩‍👧‍👦 Compartilhado"].index(responsavel_transacao) if responsavel_transacao in ["🧔 Ele", "👩‍🦰 Ela", "👨‍👩‍👧‍👦 Compartilhado"] else 0,
+                                horizontal=True,
+                                key=f"edit_resp_lanc_{idx_original}"
+                            )
+
+                        edit_descricao = st.text_input(
+                            "Descrição",
+                            value=descricao_transacao,
+                            key=f"edit_desc_lanc_{idx_original}"
+                        )
+
+                        edit_fixo = st.checkbox(
+                            "Recorrente",
+                            value=fixo_transacao == 'Sim',
+                            key=f"edit_fixo_lanc_{idx_original}"
+                        )
+
+                        col_save, col_cancel = st.columns(2, gap="medium")
+                        with col_save:
+                            if st.form_submit_button(
+                                "💾 Salvar Alterações",
+                                use_container_width=True,
+                                type="primary"
+                            ):
+                                # Atualizar os dados (pelo id, na tabela da sessão)
+                                DatabaseManager.update_row("historico", dados["historico"], usuario, row_id, {
+                                    "data": pd.Timestamp(edit_data),
+                                    "tipo": edit_tipo,
+                                    "valor": float(edit_valor),
+                                    "categoria": edit_categoria,
+                                    "subcategoria": edit_subcategoria.strip(),
+                                    "descricao": edit_descricao.strip(),
+                                    "responsavel": edit_responsavel,
+                                    "fixo": 'Sim' if edit_fixo else 'Não'
+                                }, linha=rotulo)
+
+                                st.session_state["dados"] = dados
+                                DatabaseManager.save("historico", dados["historico"], usuario)
+
+                                st.session_state[f"editing_lanc_{idx_original}"] = False
+                                st.session_state["msg"] = f"✅ Transação atualizada com sucesso!"
+                                st.session_state["msg_tipo"] = "success"
+                                st.rerun()
+
+                        with col_cancel:
+                            if st.form_submit_button(
+                                "❌ Cancelar",
+                                use_container_width=True,
+                                type="secondary"
+                            ):
+                                st.session_state[f"editing_lanc_{idx_original}"] = False
+                                st.rerun()
+
         else:
             # CORREÇÃO: Mensagem quando não há transações filtradas
             st.markdown("""
@@ -2451,8 +2099,13 @@ if menu == "📝 LANÇAMENTOS":
                 st.markdown("#### 📈 Distribuição por Tipo")
                 
                 if not df_historico_total.empty:
-                    # Agrupar por tipo
-                    df_tipo = df_historico_total.groupby('tipo')['valor'].sum().reset_index()
+                    # Agrupar por tipo (a partir do cubo mensal), sem as
+                    # linhas sem data válida, como a lista acima
+                    df_tipo = cubo_historico.totais(por=("mes", "tipo"))
+                    df_tipo = (
+                        df_tipo[df_tipo["mes"].notna()]
+                        .groupby("tipo", as_index=False)["valor"].sum()
+                    )
                     
                     if not df_tipo.empty:
                         fig_tipo = px.pie(
@@ -2544,54 +2197,37 @@ if menu == "📝 LANÇAMENTOS":
         # Ordenar por data (mais recente primeiro)
         df_historico = df_historico.sort_values("data", ascending=False)
         
-        # Container para a lista
-        lista_container = st.container()
-        
-        with lista_container:
-            for idx, row in df_historico.iterrows():
-                # Determinar cor baseada no tipo
-                if row['tipo'] == "Despesa":
-                    valor_color = "red"
-                    valor_prefix = "-"
-                elif row['tipo'] == "Receita":
-                    valor_color = "green"
-                    valor_prefix = "+"
-                else:
-                    valor_color = "white"
-                    valor_prefix = ""
-                
-                # Formatar data
-                if isinstance(row['data'], str):
-                    data_str = row['data']
-                else:
-                    data_str = row['data'].strftime("%d/%m/%Y")
-                
-                # Criar item compacto
-                col1, col2, col3, col4 = st.columns([3, 2, 1, 1], gap="small")
-                
-                with col1:
-                    st.markdown(f"**{row['descricao'][:30]}{'...' if len(row['descricao']) > 30 else ''}**")
-                    st.caption(f"{row['categoria']} • {row['responsavel']} • {data_str}")
-                
-                with col2:
-                    st.markdown(f"<span style='color: {valor_color}; font-weight: bold;'>{valor_prefix}R$ {row['valor']:,.2f}</span>", unsafe_allow_html=True)
-                
-                with col3:
-                    st.caption(row['tipo'])
-                
-                with col4:
-                    # Botão para excluir - mais compacto
-                    if st.button("🗑️", key=f"del_hist_{idx}", help="Excluir"):
-                        # Remover da lista
-                        df_historico = df_historico.drop(idx).reset_index(drop=True)
-                        dados["historico"] = df_historico
-                        st.session_state["dados"] = dados
-                        DatabaseManager.save("historico", df_historico, usuario)
-                        st.success("Lançamento excluído!")
-                        st.rerun()
-                
-                # Divisor fino
-                st.markdown("<hr style='margin: 6px 0; border-color: #1f2933;'>", unsafe_allow_html=True)
+        # Mesma grade virtualizada; a seleção (várias linhas) volta como um evento
+        tabela_compacta = tabela_lancamentos(df_historico)
+        evento_compacto = st.dataframe(
+            tabela_compacta,
+            column_config=COLUNAS_GRADE_LANCAMENTOS,
+            column_order=["data", "descricao", "categoria", "responsavel", "valor", "tipo"],
+            hide_index=True,
+            use_container_width=True,
+            height=320,
+            on_select="rerun",
+            selection_mode="multi-row",
+            key=chave_grade("grade_lancamentos_compacta", df_historico)
+        )
+        
+        linhas_compactas = evento_compacto.selection.rows
+        if linhas_compactas:
+            if st.button(f"🗑️ Excluir {len(linhas_compactas)} selecionado(s)", key="del_hist_selecionados", type="secondary"):
+                # Remove pelos ids (ou rótulo, se ainda sem id), na tabela da sessão, de uma vez
+                df_novo = DatabaseManager.delete_rows(
+                    "historico",
+                    dados["historico"],
+                    usuario,
+                    tabela_compacta["id"].iloc[linhas_compactas].tolist(),
+                    linhas=df_historico.index[linhas_compactas].tolist()
+                )
+                if df_novo is not None:
+                    dados["historico"] = df_novo
+                    st.session_state["dados"] = dados
+                    DatabaseManager.save("historico", df_novo, usuario)
+                    st.success("Lançamento(s) excluído(s)!")
+                st.rerun()
     else:
         st.caption("Nenhum lançamento registrado.")
 
@@ -2602,6 +2238,9 @@ if menu == "📝 LANÇAMENTOS":
 # =========================================================
 
 elif menu == "💰 INVESTIMENTOS":
+
+    # Colunas pesadas desta tela (fora do carregamento inicial)
+    DatabaseManager.ensure_view(dados, "investimentos", usuario)
     
     st.markdown("""
     <div style="
@@ -2810,6 +2449,9 @@ elif menu == "💰 INVESTIMENTOS":
         # Container para lista
         with st.container():
             for idx, row in df_investimentos.iterrows():
+                row_id = row.get('id')
+                chave_linha = row_id if pd.notna(row_id) else f"novo_{idx}"
+                
                 # Formatar data de entrada com segurança
                 data_str = ""
                 if 'data_entrada' in row and pd.notna(row['data_entrada']):
@@ -2916,25 +2558,25 @@ elif menu == "💰 INVESTIMENTOS":
                             with col_btn1:
                                 if st.button(
                                     "✏️", 
-                                    key=f"edit_{idx}",
+                                    key=f"edit_{chave_linha}",
                                     help="Editar investimento",
                                     use_container_width=True
                                 ):
-                                    st.session_state[f"editing_{idx}"] = True
+                                    st.session_state[f"editing_{chave_linha}"] = True
                                     st.rerun()
                             
                             with col_btn2:
                                 if st.button(
                                     "🗑️", 
-                                    key=f"del_{idx}",
+                                    key=f"del_{chave_linha}",
                                     help="Excluir investimento",
                                     use_container_width=True,
                                     type="secondary"
                                 ):
-                                    st.session_state[f"delete_confirm_{idx}"] = True
+                                    st.session_state[f"delete_confirm_{chave_linha}"] = True
                     
                     # Modal de confirmação de exclusão
-                    if st.session_state.get(f"delete_confirm_{idx}", False):
+                    if st.session_state.get(f"delete_confirm_{chave_linha}", False):
 
                         
                         col_confirm1, col_confirm2 = st.columns([3, 1])
@@ -2944,28 +2586,32 @@ elif menu == "💰 INVESTIMENTOS":
                         with col_confirm2:
                             col_yes, col_no = st.columns(2)
                             with col_yes:
-                                if st.button("✅ Sim", key=f"yes_{idx}", use_container_width=True):
+                                if st.button("✅ Sim", key=f"yes_{chave_linha}", use_container_width=True):
                                     # Remover o investimento
-                                    df_atualizado = df_investimentos.drop(idx).reset_index(drop=True)
-                                    dados["investimentos"] = df_atualizado
-                                    st.session_state["dados"] = dados
-                                    DatabaseManager.save("investimentos", df_atualizado, usuario)
-                                    st.session_state["msg"] = "✅ Investimento excluído com sucesso!"
-                                    st.session_state["msg_tipo"] = "success"
-                                    st.session_state[f"delete_confirm_{idx}"] = False
+                                    df_atualizado = DatabaseManager.delete_row("investimentos", df_investimentos, usuario, row_id, linha=idx)
+                                    if df_atualizado is not None:
+                                        dados["investimentos"] = df_atualizado
+                                        st.session_state["dados"] = dados
+                                        DatabaseManager.save("investimentos", df_atualizado, usuario)
+                                        st.session_state["msg"] = "✅ Investimento excluído com sucesso!"
+                                        st.session_state["msg_tipo"] = "success"
+                                    else:
+                                        st.session_state["msg"] = "❌ Investimento não encontrado."
+                                        st.session_state["msg_tipo"] = "error"
+                                    st.session_state[f"delete_confirm_{chave_linha}"] = False
                                     st.rerun()
                             with col_no:
-                                if st.button("❌ Não", key=f"no_{idx}", use_container_width=True):
-                                    st.session_state[f"delete_confirm_{idx}"] = False
+                                if st.button("❌ Não", key=f"no_{chave_linha}", use_container_width=True):
+                                    st.session_state[f"delete_confirm_{chave_linha}"] = False
                                     st.rerun()
                         
                         st.markdown("</div>", unsafe_allow_html=True)
                     
                     # Formulário de edição (aparece apenas quando ativado)
-                    if st.session_state.get(f"editing_{idx}", False):
+                    if st.session_state.get(f"editing_{chave_linha}", False):
 
                         
-                        with st.form(f"form_edit_{idx}"):
+                        with st.form(f"form_edit_{chave_linha}"):
                             st.markdown(f"### ✏️ Editando: {ativo_nome}")
                             
                             col_e1, col_e2 = st.columns(2, gap="small")
@@ -2974,12 +2620,12 @@ elif menu == "💰 INVESTIMENTOS":
                                 edit_instituicao = st.text_input(
                                     "🏦 Instituição", 
                                     value=instituicao_nome,
-                                    key=f"edit_inst_{idx}"
+                                    key=f"edit_inst_{chave_linha}"
                                 )
                                 edit_ativo = st.text_input(
                                     "📈 Ativo", 
                                     value=ativo_nome,
-                                    key=f"edit_ativo_{idx}"
+                                    key=f"edit_ativo_{chave_linha}"
                                 )
                                 
                                 # Tipo com valor padrão seguro
@@ -2992,7 +2638,7 @@ elif menu == "💰 INVESTIMENTOS":
                                     "📊 Tipo",
                                     tipo_options,
                                     index=tipo_index,
-                                    key=f"edit_tipo_{idx}"
+                                    key=f"edit_tipo_{chave_linha}"
                                 )
                             
                             with col_e2:
@@ -3001,7 +2647,7 @@ elif menu == "💰 INVESTIMENTOS":
                                     min_value=0.0, 
                                     step=100.0, 
                                     value=valor_atual_val,
-                                    key=f"edit_valor_{idx}"
+                                    key=f"edit_valor_{chave_linha}"
                                 )
                                 edit_rendimento = st.number_input(
                                     "📈 Rendimento Mensal (%)",
@@ -3009,7 +2655,7 @@ elif menu == "💰 INVESTIMENTOS":
                                     max_value=100.0,
                                     value=rendimento_val * 100,
                                     step=0.1,
-                                    key=f"edit_rend_{idx}"
+                                    key=f"edit_rend_{chave_linha}"
                                 ) / 100
                                 
                                 # Categoria com valor padrão seguro
@@ -3022,7 +2668,7 @@ elif menu == "💰 INVESTIMENTOS":
                                     "🎯 Perfil",
                                     cat_options,
                                     index=cat_index,
-                                    key=f"edit_cat_{idx}"
+                                    key=f"edit_cat_{chave_linha}"
                                 )
                             
                             # Data com tratamento de erro
@@ -3036,13 +2682,13 @@ elif menu == "💰 INVESTIMENTOS":
                             edit_data_entrada = st.date_input(
                                 "📅 Data de Entrada", 
                                 value=edit_data_entrada,
-                                key=f"edit_data_{idx}"
+                                key=f"edit_data_{chave_linha}"
                             )
                             
                             edit_observacao = st.text_area(
                                 "📝 Observações", 
                                 value=row.get('observacao', '') if pd.notna(row.get('observacao')) else '',
-                                key=f"edit_obs_{idx}",
+                                key=f"edit_obs_{chave_linha}",
                                 height=80
                             )
                             
@@ -3054,14 +2700,16 @@ elif menu == "💰 INVESTIMENTOS":
                                     type="primary"
                                 ):
                                     # Atualizar os dados na cópia
-                                    df_investimentos.at[idx, 'instituicao'] = edit_instituicao
-                                    df_investimentos.at[idx, 'ativo'] = edit_ativo
-                                    df_investimentos.at[idx, 'tipo'] = edit_tipo
-                                    df_investimentos.at[idx, 'valor_atual'] = edit_valor
-                                    df_investimentos.at[idx, 'data_entrada'] = edit_data_entrada
-                                    df_investimentos.at[idx, 'rendimento_mensal'] = edit_rendimento
-                                    df_investimentos.at[idx, 'categoria'] = edit_categoria
-                                    df_investimentos.at[idx, 'observacao'] = edit_observacao
+                                    DatabaseManager.update_row("investimentos", df_investimentos, usuario, row_id, {
+                                        "instituicao": edit_instituicao,
+                                        "ativo": edit_ativo,
+                                        "tipo": edit_tipo,
+                                        "valor_atual": edit_valor,
+                                        "data_entrada": edit_data_entrada,
+                                        "rendimento_mensal": edit_rendimento,
+                                        "categoria": edit_categoria,
+                                        "observacao": edit_observacao
+                                    }, linha=idx)
                                     
                                     # Atualizar dados na sessão
                                     dados["investimentos"] = df_investimentos
@@ -3071,7 +2719,7 @@ elif menu == "💰 INVESTIMENTOS":
                                     DatabaseManager.save("investimentos", df_investimentos, usuario)
                                     
                                     # Limpar estado e mostrar mensagem
-                                    st.session_state[f"editing_{idx}"] = False
+                                    st.session_state[f"editing_{chave_linha}"] = False
                                     st.session_state["msg"] = "✅ Investimento atualizado com sucesso!"
                                     st.session_state["msg_tipo"] = "success"
                                     st.rerun()
@@ -3082,7 +2730,7 @@ elif menu == "💰 INVESTIMENTOS":
                                     use_container_width=True,
                                     type="secondary"
                                 ):
-                                    st.session_state[f"editing_{idx}"] = False
+                                    st.session_state[f"editing_{chave_linha}"] = False
                                     st.rerun()
                         
                         st.markdown("</div>", unsafe_allow_html=True)
@@ -3270,12 +2918,90 @@ elif menu == "💰 INVESTIMENTOS":
                 </div>
                 """, unsafe_allow_html=True)
 
+            # ---------------- PROJEÇÃO POR ATIVO ----------------
+            st.markdown("<br>", unsafe_allow_html=True)
+            st.markdown("#### 🔮 Projeção da Carteira por Ativo")
+            st.caption("Cada investimento cresce pelo seu próprio rendimento mensal, descontada a inflação configurada.")
+            
+            col_proj1, col_proj2, col_proj3 = st.columns([1, 1, 1], gap="medium")
+            
+            with col_proj1:
+                agrupar_por = st.radio(
+                    "Agrupar por",
+                    ["tipo", "categoria"],
+                    format_func=lambda c: "Tipo" if c == "tipo" else "Perfil",
+                    horizontal=True
+                )
+            
+            with col_proj2:
+                anos_carteira = st.slider("Horizonte (anos)", min_value=1, max_value=30, value=10)
+            
+            with col_proj3:
+                incluir_aporte = st.checkbox(
+                    f"Incluir saldo fixo (R$ {saldo_fixo:,.0f}/mês) como aporte",
+                    value=False,
+                    disabled=saldo_fixo <= 0
+                )
+            
+            aporte_carteira = saldo_fixo if incluir_aporte and saldo_fixo > 0 else 0.0
+            
+            df_carteira = metricas.calcular(
+                "projecao_carteira",
+                lambda: projetar_carteira(
+                    df_investimentos,
+                    meses=anos_carteira * 12 + 1,
+                    inflacao_mensal=inflacao_mensal,
+                    aporte_mensal=aporte_carteira,
+                    por=agrupar_por
+                ),
+                dependencias=("investimentos",),
+                params=(agrupar_por, anos_carteira, inflacao_mensal, aporte_carteira, mes_atual)
+            )
+            
+            if not df_carteira.empty:
+                fig_carteira = px.area(
+                    df_carteira,
+                    x="data",
+                    y="patrimonio",
+                    color=agrupar_por,
+                    color_discrete_sequence=px.colors.qualitative.Set3
+                )
+                fig_carteira.update_traces(
+                    hovertemplate="<b>%{x|%b/%Y}</b><br>%{data.name}: R$ %{y:,.0f}<extra></extra>"
+                )
+                fig_carteira.update_layout(
+                    template="plotly_dark",
+                    paper_bgcolor="#0e1117",
+                    plot_bgcolor="#0e1117",
+                    font=dict(color="#e5e7eb"),
+                    hovermode="x unified",
+                    xaxis=dict(title="", gridcolor="#374151"),
+                    yaxis=dict(title="Patrimônio (R$)", gridcolor="#374151", tickprefix="R$ "),
+                    height=400,
+                    legend=dict(title="")
+                )
+                st.plotly_chart(fig_carteira, use_container_width=True)
+                
+                ultima_data = df_carteira["data"].max()
+                final_grupos = df_carteira[df_carteira["data"] == ultima_data]
+                total_final = final_grupos["patrimonio"].sum()
+                st.caption(
+                    f"Em {anos_carteira} ano(s): R$ {total_final:,.0f} no total · "
+                    + " · ".join(
+                        f"{linha[agrupar_por]}: R$ {linha['patrimonio']:,.0f}"
+                        for _, linha in final_grupos.sort_values("patrimonio", ascending=False).iterrows()
+                    )
+                )
+
 
 # =========================================================
 # 🎯 SONHOS & METAS - VERSÃO ESTILIZADA COMPLETA
 # =========================================================
 
 elif menu == "🎯 SONHOS & METAS":
+
+    # Colunas pesadas desta tela (fora do carregamento inicial)
+    DatabaseManager.ensure_view(dados, "sonhos", usuario)
     
     st.markdown("""
     <div style="
@@ -3516,8 +3242,11 @@ elif menu == "🎯 SONHOS & METAS":
     
     if not dados["sonhos_projetos"].empty:
         for i, sonho in dados["sonhos_projetos"].iterrows():
+            sonho_id = sonho.get("id")
+            chave_sonho = sonho_id if pd.notna(sonho_id) else f"novo_{i}"
+            
             # Inicializar estado para exclusão
-            delete_key = f"delete_sonho_{i}"
+            delete_key = f"delete_sonho_{chave_sonho}"
             if delete_key not in st.session_state:
                 st.session_state[delete_key] = False
             
@@ -3649,13 +3378,13 @@ elif menu == "🎯 SONHOS & METAS":
                             "Valor (+ para adicionar, - para retirar)", 
                             value=0.0, 
                             step=100.0,
-                            key=f"mov_{i}"
+                            key=f"mov_{chave_sonho}"
                         )
                         
-                        if st.button("💾 Aplicar", key=f"apply_{i}", use_container_width=True):
+                        if st.button("💾 Aplicar", key=f"apply_{chave_sonho}", use_container_width=True):
                             novo_valor = sonho["valor_atual"] + valor_mov
                             if novo_valor >= 0:
-                                dados["sonhos_projetos"].loc[i, "valor_atual"] = novo_valor
+                                DatabaseManager.update_row("sonhos_projetos", dados["sonhos_projetos"], usuario, sonho_id, {"valor_atual": novo_valor}, linha=i)
                                 st.session_state["dados"] = dados
                                 DatabaseManager.save("sonhos_projetos", dados["sonhos_projetos"], usuario)
                                 
@@ -3670,8 +3399,8 @@ elif menu == "🎯 SONHOS & METAS":
                 
                 with col_acoes2:
                     if is_desistido:
-                        if st.button("🔄 Reativar", key=f"reat_{i}", use_container_width=True, type="secondary"):
-                            dados["sonhos_projetos"].loc[i, "status"] = "Em Andamento"
+                        if st.button("🔄 Reativar", key=f"reat_{chave_sonho}", use_container_width=True, type="secondary"):
+                            DatabaseManager.update_row("sonhos_projetos", dados["sonhos_projetos"], usuario, sonho_id, {"status": "Em Andamento"}, linha=i)
                             st.session_state["dados"] = dados
                             DatabaseManager.save("sonhos_projetos", dados["sonhos_projetos"], usuario)
                             
@@ -3679,8 +3408,8 @@ elif menu == "🎯 SONHOS & METAS":
                             st.session_state["msg_tipo"] = "success"
                             st.rerun()
                     else:
-                        if st.button("😢 Desistir", key=f"des_{i}", use_container_width=True, type="secondary"):
-                            dados["sonhos_projetos"].loc[i, "status"] = "Desistido"
+                        if st.button("😢 Desistir", key=f"des_{chave_sonho}", use_container_width=True, type="secondary"):
+                            DatabaseManager.update_row("sonhos_projetos", dados["sonhos_projetos"], usuario, sonho_id, {"status": "Desistido"}, linha=i)
                             st.session_state["dados"] = dados
                             DatabaseManager.save("sonhos_projetos", dados["sonhos_projetos"], usuario)
                             
@@ -3689,14 +3418,14 @@ elif menu == "🎯 SONHOS & METAS":
                             st.rerun()
                 
                 with col_acoes3:
-                    if st.button("✏️ Editar", key=f"edit_sonho_{i}", use_container_width=True):
-                        st.session_state[f"editing_sonho_{i}"] = not st.session_state.get(f"editing_sonho_{i}", False)
+                    if st.button("✏️ Editar", key=f"edit_sonho_{chave_sonho}", use_container_width=True):
+                        st.session_state[f"editing_sonho_{chave_sonho}"] = not st.session_state.get(f"editing_sonho_{chave_sonho}", False)
                         st.rerun()
                 
                 with col_acoes4:
                     # Sistema de exclusão em duas etapas
                     if not st.session_state[delete_key]:
-                        if st.button("🗑️ Excluir", key=f"del_btn_{i}", use_container_width=True, type="secondary"):
+                        if st.button("🗑️ Excluir", key=f"del_btn_{chave_sonho}", use_container_width=True, type="secondary"):
                             st.session_state[delete_key] = True
                             st.rerun()
                     else:
@@ -3717,27 +3446,30 @@ elif menu == "🎯 SONHOS & METAS":
                         
                         col_confirm1, col_confirm2 = st.columns(2)
                         with col_confirm1:
-                            if st.button("✅ Sim", key=f"confirm_yes_{i}", use_container_width=True):
+                            if st.button("✅ Sim", key=f"confirm_yes_{chave_sonho}", use_container_width=True):
                                 # Excluir permanentemente
-                                dados["sonhos_projetos"] = dados["sonhos_projetos"].drop(i).reset_index(drop=True)
-                                st.session_state["dados"] = dados
-                                DatabaseManager.save("sonhos_projetos", dados["sonhos_projetos"], usuario)
+                                df_novo = DatabaseManager.delete_row("sonhos_projetos", dados["sonhos_projetos"], usuario, sonho_id, linha=i)
+                                if df_novo is not None:
+                                    dados["sonhos_projetos"] = df_novo
+                                    st.session_state["dados"] = dados
+                                    DatabaseManager.save("sonhos_projetos", df_novo, usuario)
+                                    st.session_state["msg"] = f"❌ Sonho '{sonho['nome']}' excluído permanentemente!"
+                                else:
+                                    st.session_state["msg"] = "❌ Sonho não encontrado."
                                 st.session_state[delete_key] = False
-                                
-                                st.session_state["msg"] = f"❌ Sonho '{sonho['nome']}' excluído permanentemente!"
                                 st.session_state["msg_tipo"] = "error"
                                 st.rerun()
                         
                         with col_confirm2:
-                            if st.button("❌ Não", key=f"confirm_no_{i}", use_container_width=True):
+                            if st.button("❌ Não", key=f"confirm_no_{chave_sonho}", use_container_width=True):
                                 st.session_state[delete_key] = False
                                 st.rerun()
                 
                 # Formulário de edição
-                if st.session_state.get(f"editing_sonho_{i}", False):
+                if st.session_state.get(f"editing_sonho_{chave_sonho}", False):
 
                     
-                    with st.form(f"form_edit_sonho_{i}"):
+                    with st.form(f"form_edit_sonho_{chave_sonho}"):
                         st.markdown(f"### ✏️ Editando: {sonho['nome']}")
                         
                         col_e1, col_e2 = st.columns(2, gap="small")
@@ -3746,13 +3478,13 @@ elif menu == "🎯 SONHOS & METAS":
                             edit_nome = st.text_input(
                                 "🎯 Nome", 
                                 value=sonho["nome"], 
-                                key=f"edit_nome_{i}"
+                                key=f"edit_nome_{chave_sonho}"
                             )
                             edit_valor_alvo = st.number_input(
                                 "💰 Valor Alvo", 
                                 value=sonho["valor_alvo"], 
                                 min_value=0.0, 
-                                key=f"edit_alvo_{i}"
+                                key=f"edit_alvo_{chave_sonho}"
                             )
                             
                             # Categoria com valor padrão seguro
@@ -3765,14 +3497,14 @@ elif menu == "🎯 SONHOS & METAS":
                                 "📂 Categoria",
                                 cat_options,
                                 index=cat_index,
-                                key=f"edit_cat_{i}"
+                                key=f"edit_cat_{chave_sonho}"
                             )
                         
                         with col_e2:
                             edit_data_alvo = st.date_input(
                                 "📅 Data Alvo", 
                                 value=pd.to_datetime(sonho["data_alvo"]), 
-                                key=f"edit_data_{i}"
+                                key=f"edit_data_{chave_sonho}"
                             )
                             
                             # Prioridade com valor padrão seguro
@@ -3785,20 +3517,20 @@ elif menu == "🎯 SONHOS & METAS":
                                 "⚡ Prioridade",
                                 prio_options,
                                 index=prio_index,
-                                key=f"edit_prio_{i}"
+                                key=f"edit_prio_{chave_sonho}"
                             )
                             edit_valor_atual = st.number_input(
                                 "💰 Valor Atual",
                                 value=sonho["valor_atual"],
                                 min_value=0.0,
-                                key=f"edit_atual_{i}"
+                                key=f"edit_atual_{chave_sonho}"
                             )
                         
                         edit_descricao = st.text_area(
                             "📝 Descrição", 
                             value=sonho.get("descricao", ""), 
                             height=80, 
-                            key=f"edit_desc_{i}"
+                            key=f"edit_desc_{chave_sonho}"
                         )
                         
                         # Status com valor padrão seguro
@@ -3811,7 +3543,7 @@ elif menu == "🎯 SONHOS & METAS":
                             "📊 Status",
                             status_options,
                             index=status_index,
-                            key=f"edit_status_{i}"
+                            key=f"edit_status_{chave_sonho}"
                         )
                         
                         col_save, col_cancel = st.columns(2, gap="medium")
@@ -3832,25 +3564,27 @@ elif menu == "🎯 SONHOS & METAS":
                         
                         # Processar ações
                         if save_btn:
-                            dados["sonhos_projetos"].loc[i, "nome"] = edit_nome
-                            dados["sonhos_projetos"].loc[i, "valor_alvo"] = edit_valor_alvo
-                            dados["sonhos_projetos"].loc[i, "categoria"] = edit_categoria
-                            dados["sonhos_projetos"].loc[i, "data_alvo"] = edit_data_alvo
-                            dados["sonhos_projetos"].loc[i, "prioridade"] = edit_prioridade
-                            dados["sonhos_projetos"].loc[i, "valor_atual"] = edit_valor_atual
-                            dados["sonhos_projetos"].loc[i, "descricao"] = edit_descricao
-                            dados["sonhos_projetos"].loc[i, "status"] = edit_status
+                            DatabaseManager.update_row("sonhos_projetos", dados["sonhos_projetos"], usuario, sonho_id, {
+                                "nome": edit_nome,
+                                "valor_alvo": edit_valor_alvo,
+                                "categoria": edit_categoria,
+                                "data_alvo": edit_data_alvo,
+                                "prioridade": edit_prioridade,
+                                "valor_atual": edit_valor_atual,
+                                "descricao": edit_descricao,
+                                "status": edit_status
+                            }, linha=i)
                             
                             st.session_state["dados"] = dados
                             DatabaseManager.save("sonhos_projetos", dados["sonhos_projetos"], usuario)
-                            st.session_state[f"editing_sonho_{i}"] = False
+                            st.session_state[f"editing_sonho_{chave_sonho}"] = False
                             
                             st.session_state["msg"] = f"✅ Sonho '{edit_nome}' atualizado com sucesso!"
                             st.session_state["msg_tipo"] = "success"
                             st.rerun()
                         
                         if cancel_btn:
-                            st.session_state[f"editing_sonho_{i}"] = False
+                            st.session_state[f"editing_sonho_{chave_sonho}"] = False
                             st.rerun()
                     
                     st.markdown("</div>", unsafe_allow_html=True)
@@ -3885,6 +3619,9 @@ elif menu == "🎯 SONHOS & METAS":
 # =========================================================
 
 elif menu == "🏢 FLUXOS FIXOS":
+
+    # Colunas pesadas desta tela (fora do carregamento inicial)
+    DatabaseManager.ensure_view(dados, "fluxos", usuario)
     
     st.markdown("""
     <div style="
@@ -4222,6 +3959,9 @@ elif menu == "🏢 FLUXOS FIXOS":
                 receitas_ordenadas = receitas.sort_values("valor", ascending=False)
                 
                 for idx, row in receitas_ordenadas.iterrows():
+                    row_id = row.get('id')
+                    chave_linha = row_id if pd.notna(row_id) else f"novo_{idx}"
+                    
                     # Dados do fluxo
                     nome_fluxo = row.get('nome', 'Sem nome')
                     valor_fluxo = row.get('valor', 0)
@@ -4335,8 +4075,8 @@ elif menu == "🏢 FLUXOS FIXOS":
                         
                         with col_acoes1:
                             # Botão de edição
-                            if st.button("✏️ Editar", key=f"edit_rec_{idx}", use_container_width=True):
-                                st.session_state[f"editing_rec_{idx}"] = True
+                            if st.button("✏️ Editar", key=f"edit_rec_{chave_linha}", use_container_width=True):
+                                st.session_state[f"editing_rec_{chave_linha}"] = True
                                 st.rerun()
                         
                         with col_acoes2:
@@ -4359,12 +4099,12 @@ elif menu == "🏢 FLUXOS FIXOS":
                         
                         with col_acoes3:
                             # Botão de exclusão com confirmação
-                            if st.button("🗑️ Excluir", key=f"del_rec_{idx}", use_container_width=True, type="secondary"):
-                                st.session_state[f"confirm_del_rec_{idx}"] = True
+                            if st.button("🗑️ Excluir", key=f"del_rec_{chave_linha}", use_container_width=True, type="secondary"):
+                                st.session_state[f"confirm_del_rec_{chave_linha}"] = True
                                 st.rerun()
                         
                         # Confirmação de exclusão
-                        if st.session_state.get(f"confirm_del_rec_{idx}", False):
+                        if st.session_state.get(f"confirm_del_rec_{chave_linha}", False):
                             st.markdown("""
                             <div style="
                                 background: #7f1d1d;
@@ -4384,25 +4124,29 @@ elif menu == "🏢 FLUXOS FIXOS":
                             with col_confirm2:
                                 col_yes, col_no = st.columns(2)
                                 with col_yes:
-                                    if st.button("✅ Sim", key=f"yes_del_rec_{idx}", use_container_width=True):
+                                    if st.button("✅ Sim", key=f"yes_del_rec_{chave_linha}", use_container_width=True):
                                         # Excluir fluxo
-                                        df_fluxo = df_fluxo.drop(idx).reset_index(drop=True)
-                                        dados["fluxo_fixo"] = df_fluxo
-                                        st.session_state["dados"] = dados
-                                        DatabaseManager.save("fluxo_fixo", df_fluxo, usuario)
-                                        st.session_state["msg"] = f"✅ Receita '{nome_fluxo}' excluída!"
-                                        st.session_state["msg_tipo"] = "success"
-                                        st.session_state[f"confirm_del_rec_{idx}"] = False
+                                        df_sem_fluxo = DatabaseManager.delete_row("fluxo_fixo", df_fluxo, usuario, row_id, linha=idx)
+                                        if df_sem_fluxo is not None:
+                                            dados["fluxo_fixo"] = df_sem_fluxo
+                                            st.session_state["dados"] = dados
+                                            DatabaseManager.save("fluxo_fixo", df_sem_fluxo, usuario)
+                                            st.session_state["msg"] = f"✅ Receita '{nome_fluxo}' excluída!"
+                                            st.session_state["msg_tipo"] = "success"
+                                        else:
+                                            st.session_state["msg"] = f"❌ Receita '{nome_fluxo}' não encontrada."
+                                            st.session_state["msg_tipo"] = "error"
+                                        st.session_state[f"confirm_del_rec_{chave_linha}"] = False
                                         st.rerun()
                                 with col_no:
-                                    if st.button("❌ Não", key=f"no_del_rec_{idx}", use_container_width=True):
-                                        st.session_state[f"confirm_del_rec_{idx}"] = False
+                                    if st.button("❌ Não", key=f"no_del_rec_{chave_linha}", use_container_width=True):
+                                        st.session_state[f"confirm_del_rec_{chave_linha}"] = False
                                         st.rerun()
                             
                             st.markdown("</div>", unsafe_allow_html=True)
                         
                         # Formulário de edição
-                        if st.session_state.get(f"editing_rec_{idx}", False):
+                        if st.session_state.get(f"editing_rec_{chave_linha}", False):
                             st.markdown("""
                             <div style="
                                 background: rgba(16, 185, 129, 0.1);
@@ -4413,7 +4157,7 @@ elif menu == "🏢 FLUXOS FIXOS":
                             ">
                             """, unsafe_allow_html=True)
                             
-                            with st.form(f"form_edit_rec_{idx}"):
+                            with st.form(f"form_edit_rec_{chave_linha}"):
                                 st.markdown(f"### ✏️ Editando: {nome_fluxo}")
                                 
                                 col_edit1, col_edit2 = st.columns(2, gap="small")
@@ -4422,20 +4166,20 @@ elif menu == "🏢 FLUXOS FIXOS":
                                     edit_nome = st.text_input(
                                         "Nome", 
                                         value=nome_fluxo,
-                                        key=f"edit_nome_rec_{idx}"
+                                        key=f"edit_nome_rec_{chave_linha}"
                                     )
                                     edit_valor = st.number_input(
                                         "Valor (R$)", 
                                         min_value=0.0, 
                                         step=10.0, 
                                         value=valor_fluxo,
-                                        key=f"edit_valor_rec_{idx}"
+                                        key=f"edit_valor_rec_{chave_linha}"
                                     )
                                     edit_tipo = st.selectbox(
                                         "Tipo", 
                                         ["Receita", "Despesa"],
                                         index=0,  # Receita
-                                        key=f"edit_tipo_rec_{idx}"
+                                        key=f"edit_tipo_rec_{chave_linha}"
                                     )
                                 
                                 with col_edit2:
@@ -4444,14 +4188,14 @@ elif menu == "🏢 FLUXOS FIXOS":
                                         "Categoria",
                                         categorias_disponiveis,
                                         index=categorias_disponiveis.index(categoria_fluxo) if categoria_fluxo in categorias_disponiveis else 0,
-                                        key=f"edit_cat_rec_{idx}"
+                                        key=f"edit_cat_rec_{chave_linha}"
                                     )
                                     
                                     edit_recorrencia = st.selectbox(
                                         "Recorrência",
                                         ["Mensal", "Anual", "Trimestral", "Semestral"],
                                         index=["Mensal", "Anual", "Trimestral", "Semestral"].index(recorrencia_fluxo) if recorrencia_fluxo in ["Mensal", "Anual", "Trimestral", "Semestral"] else 0,
-                                        key=f"edit_rec_rec_{idx}"
+                                        key=f"edit_rec_rec_{chave_linha}"
                                     )
                                 
                                 # Datas
@@ -4467,7 +4211,7 @@ elif menu == "🏢 FLUXOS FIXOS":
                                 edit_data_inicio = st.date_input(
                                     "Data de Início", 
                                     value=edit_data_inicio,
-                                    key=f"edit_inicio_rec_{idx}"
+                                    key=f"edit_inicio_rec_{chave_linha}"
                                 )
                                 
                                 edit_data_fim = None
@@ -4480,14 +4224,14 @@ elif menu == "🏢 FLUXOS FIXOS":
                                 edit_data_fim = st.date_input(
                                     "Data de Fim (opcional)", 
                                     value=edit_data_fim,
-                                    key=f"edit_fim_rec_{idx}"
+                                    key=f"edit_fim_rec_{chave_linha}"
                                 )
                                 
                                 edit_observacao = st.text_area(
                                     "Observações", 
                                     value=observacao_fluxo,
                                     height=60,
-                                    key=f"edit_obs_rec_{idx}"
+                                    key=f"edit_obs_rec_{chave_linha}"
                                 )
                                 
                                 col_save, col_cancel = st.columns(2, gap="medium")
@@ -4501,20 +4245,22 @@ elif menu == "🏢 FLUXOS FIXOS":
                                         data_inicio_str = edit_data_inicio.isoformat() if edit_data_inicio else None
                                         data_fim_str = edit_data_fim.isoformat() if edit_data_fim else None
                                         
-                                        df_fluxo.at[idx, 'nome'] = edit_nome
-                                        df_fluxo.at[idx, 'valor'] = float(edit_valor)
-                                        df_fluxo.at[idx, 'tipo'] = edit_tipo
-                                        df_fluxo.at[idx, 'categoria'] = edit_categoria
-                                        df_fluxo.at[idx, 'data_inicio'] = data_inicio_str
-                                        df_fluxo.at[idx, 'data_fim'] = data_fim_str
-                                        df_fluxo.at[idx, 'recorrencia'] = edit_recorrencia
-                                        df_fluxo.at[idx, 'observacao'] = edit_observacao
+                                        DatabaseManager.update_row("fluxo_fixo", df_fluxo, usuario, row_id, {
+                                            "nome": edit_nome,
+                                            "valor": float(edit_valor),
+                                            "tipo": edit_tipo,
+                                            "categoria": edit_categoria,
+                                            "data_inicio": data_inicio_str,
+                                            "data_fim": data_fim_str,
+                                            "recorrencia": edit_recorrencia,
+                                            "observacao": edit_observacao
+                                        }, linha=idx)
                                         
                                         dados["fluxo_fixo"] = df_fluxo
                                         st.session_state["dados"] = dados
                                         DatabaseManager.save("fluxo_fixo", df_fluxo, usuario)
                                         
-                                        st.session_state[f"editing_rec_{idx}"] = False
+                                        st.session_state[f"editing_rec_{chave_linha}"] = False
                                         st.session_state["msg"] = f"✅ Receita '{edit_nome}' atualizada!"
                                         st.session_state["msg_tipo"] = "success"
                                         st.rerun()
@@ -4525,7 +4271,7 @@ elif menu == "🏢 FLUXOS FIXOS":
                                         use_container_width=True,
                                         type="secondary"
                                     ):
-                                        st.session_state[f"editing_rec_{idx}"] = False
+                                        st.session_state[f"editing_rec_{chave_linha}"] = False
                                         st.rerun()
                             
                             st.markdown("</div>", unsafe_allow_html=True)
@@ -4556,6 +4302,9 @@ elif menu == "🏢 FLUXOS FIXOS":
                 despesas_ordenadas = despesas.sort_values("valor", ascending=False)
                 
                 for idx, row in despesas_ordenadas.iterrows():
+                    row_id = row.get('id')
+                    chave_linha = row_id if pd.notna(row_id) else f"novo_{idx}"
+                    
                     # Dados do fluxo
                     nome_fluxo = row.get('nome', 'Sem nome')
                     valor_fluxo = row.get('valor', 0)
@@ -4699,8 +4448,8 @@ elif menu == "🏢 FLUXOS FIXOS":
                         
                         with col_acoes1:
                             # Botão de edição
-                            if st.button("✏️ Editar", key=f"edit_desp_{idx}", use_container_width=True):
-                                st.session_state[f"editing_desp_{idx}"] = True
+                            if st.button("✏️ Editar", key=f"edit_desp_{chave_linha}", use_container_width=True):
+                                st.session_state[f"editing_desp_{chave_linha}"] = True
                                 st.rerun()
                         
                         with col_acoes2:
@@ -4723,12 +4472,12 @@ elif menu == "🏢 FLUXOS FIXOS":
                         
                         with col_acoes3:
                             # Botão de exclusão com confirmação
-                            if st.button("🗑️ Excluir", key=f"del_desp_{idx}", use_container_width=True, type="secondary"):
-                                st.session_state[f"confirm_del_desp_{idx}"] = True
+                            if st.button("🗑️ Excluir", key=f"del_desp_{chave_linha}", use_container_width=True, type="secondary"):
+                                st.session_state[f"confirm_del_desp_{chave_linha}"] = True
                                 st.rerun()
                         
                         # Confirmação de exclusão
-                        if st.session_state.get(f"confirm_del_desp_{idx}", False):
+                        if st.session_state.get(f"confirm_del_desp_{chave_linha}", False):
                             st.markdown("""
                             <div style="
                                 background: #7f1d1d;
@@ -4748,26 +4497,30 @@ elif menu == "🏢 FLUXOS FIXOS":
                             with col_confirm2:
                                 col_yes, col_no = st.columns(2)
                                 with col_yes:
-                                    if st.button("✅ Sim", key=f"yes_del_desp_{idx}", use_container_width=True):
+                                    if st.button("✅ Sim", key=f"yes_del_desp_{chave_linha}", use_container_width=True):
                                         # Excluir fluxo
-                                        df_fluxo = df_fluxo.drop(idx).reset_index(drop=True)
-                                        dados["fluxo_fixo"] = df_fluxo
-                                        st.session_state["dados"] = dados
-                                        DatabaseManager.save("fluxo_fixo", df_fluxo, usuario)
-                                        st.session_state["msg"] = f"✅ Despesa '{nome_fluxo}' excluída!"
-                                        st.session_state["msg_tipo"] = "success"
-                                        st.session_state[f"confirm_del_desp_{idx}"] = False
+                                        df_sem_fluxo = DatabaseManager.delete_row("fluxo_fixo", df_fluxo, usuario, row_id, linha=idx)
+                                        if df_sem_fluxo is not None:
+                                            dados["fluxo_fixo"] = df_sem_fluxo
+                                            st.session_state["dados"] = dados
+                                            DatabaseManager.save("fluxo_fixo", df_sem_fluxo, usuario)
+                                            st.session_state["msg"] = f"✅ Despesa '{nome_fluxo}' excluída!"
+                                            st.session_state["msg_tipo"] = "success"
+                                        else:
+                                            st.session_state["msg"] = f"❌ Despesa '{nome_fluxo}' não encontrada."
+                                            st.session_state["msg_tipo"] = "error"
+                                        st.session_state[f"confirm_del_desp_{chave_linha}"] = False
                                         st.rerun()
                                 with col_no:
-                                    if st.button("❌ Não", key=f"no_del_desp_{idx}", use_container_width=True):
-                                        st.session_state[f"confirm_del_desp_{idx}"] = False
+                                    if st.button("❌ Não", key=f"no_del_desp_{chave_linha}", use_container_width=True):
+                                        st.session_state[f"confirm_del_desp_{chave_linha}"] = False
                                         st.rerun()
                             
                             st.markdown("</div>", unsafe_allow_html=True)
                         
                         # Formulário de edição (estrutura similar às receitas)
                         # Formulário de edição
-                        if st.session_state.get(f"editing_desp_{idx}", False):
+                        if st.session_state.get(f"editing_desp_{chave_linha}", False):
                             st.markdown("""
                             <div style="
                                 background: rgba(249, 115, 22, 0.1);
@@ -4778,7 +4531,7 @@ elif menu == "🏢 FLUXOS FIXOS":
                             ">
                             """, unsafe_allow_html=True)
                             
-                            with st.form(f"form_edit_desp_{idx}"):
+                            with st.form(f"form_edit_desp_{chave_linha}"):
                                 st.markdown(f"### ✏️ Editando: {nome_fluxo}")
                                 
                                 col_edit1, col_edit2 = st.columns(2, gap="small")
@@ -4787,20 +4540,20 @@ elif menu == "🏢 FLUXOS FIXOS":
                                     edit_nome = st.text_input(
                                         "Nome", 
                                         value=nome_fluxo,
-                                        key=f"edit_nome_desp_{idx}"
+                                        key=f"edit_nome_desp_{chave_linha}"
                                     )
                                     edit_valor = st.number_input(
                                         "Valor (R$)", 
                                         min_value=0.0, 
                                         step=10.0, 
                                         value=valor_fluxo,
-                                        key=f"edit_valor_desp_{idx}"
+                                        key=f"edit_valor_desp_{chave_linha}"
                                     )
                                     edit_tipo = st.selectbox(
                                         "Tipo", 
                                         ["Receita", "Despesa"],
                                         index=1,  # Despesa
-                                        key=f"edit_tipo_desp_{idx}"
+                                        key=f"edit_tipo_desp_{chave_linha}"
                                     )
                                 
                                 with col_edit2:
@@ -4809,14 +4562,14 @@ elif menu == "🏢 FLUXOS FIXOS":
                                         "Categoria",
                                         categorias_disponiveis,
                                         index=categorias_disponiveis.index(categoria_fluxo) if categoria_fluxo in categorias_disponiveis else 0,
-                                        key=f"edit_cat_desp_{idx}"
+                                        key=f"edit_cat_desp_{chave_linha}"
                                     )
                                     
                                     edit_recorrencia = st.selectbox(
                                         "Recorrência",
                                         ["Mensal", "Anual", "Trimestral", "Semestral"],
                                         index=["Mensal", "Anual", "Trimestral", "Semestral"].index(recorrencia_fluxo) if recorrencia_fluxo in ["Mensal", "Anual", "Trimestral", "Semestral"] else 0,
-                                        key=f"edit_rec_desp_{idx}"
+                                        key=f"edit_rec_desp_{chave_linha}"
                                     )
                                 
                                 # Datas com tratamento correto
@@ -4839,7 +4592,7 @@ elif menu == "🏢 FLUXOS FIXOS":
                                 edit_data_inicio = st.date_input(
                                     "Data de Início", 
                                     value=edit_data_inicio,
-                                    key=f"edit_inicio_desp_{idx}"
+                                    key=f"edit_inicio_desp_{chave_linha}"
                                 )
                                 
                                 edit_data_fim = None
@@ -4859,14 +4612,14 @@ elif menu == "🏢 FLUXOS FIXOS":
                                 edit_data_fim = st.date_input(
                                     "Data de Fim (opcional)", 
                                     value=edit_data_fim,
-                                    key=f"edit_fim_desp_{idx}"
+                                    key=f"edit_fim_desp_{chave_linha}"
                                 )
                                 
                                 edit_observacao = st.text_area(
                                     "Observações", 
                                     value=observacao_fluxo,
                                     height=60,
-                                    key=f"edit_obs_desp_{idx}"
+                                    key=f"edit_obs_desp_{chave_linha}"
                                 )
                                 
                                 col_save, col_cancel = st.columns(2, gap="medium")
@@ -4880,20 +4633,22 @@ elif menu == "🏢 FLUXOS FIXOS":
                                         data_inicio_str = edit_data_inicio.isoformat() if edit_data_inicio else None
                                         data_fim_str = edit_data_fim.isoformat() if edit_data_fim else None
                                         
-                                        df_fluxo.at[idx, 'nome'] = edit_nome
-                                        df_fluxo.at[idx, 'valor'] = float(edit_valor)
-                                        df_fluxo.at[idx, 'tipo'] = edit_tipo
-                                        df_fluxo.at[idx, 'categoria'] = edit_categoria
-                                        df_fluxo.at[idx, 'data_inicio'] = data_inicio_str
-                                        df_fluxo.at[idx, 'data_fim'] = data_fim_str
-                                        df_fluxo.at[idx, 'recorrencia'] = edit_recorrencia
-                                        df_fluxo.at[idx, 'observacao'] = edit_observacao
+                                        DatabaseManager.update_row("fluxo_fixo", df_fluxo, usuario, row_id, {
+                                            "nome": edit_nome,
+                                            "valor": float(edit_valor),
+                                            "tipo": edit_tipo,
+                                            "categoria": edit_categoria,
+                                            "data_inicio": data_inicio_str,
+                                            "data_fim": data_fim_str,
+                                            "recorrencia": edit_recorrencia,
+                                            "observacao": edit_observacao
+                                        }, linha=idx)
                                         
                                         dados["fluxo_fixo"] = df_fluxo
                                         st.session_state["dados"] = dados
                                         DatabaseManager.save("fluxo_fixo", df_fluxo, usuario)
                                         
-                                        st.session_state[f"editing_desp_{idx}"] = False
+                                        st.session_state[f"editing_desp_{chave_linha}"] = False
                                         st.session_state["msg"] = f"✅ Despesa '{edit_nome}' atualizada!"
                                         st.session_state["msg_tipo"] = "success"
                                         st.rerun()
@@ -4904,7 +4659,7 @@ elif menu == "🏢 FLUXOS FIXOS":
                                         use_container_width=True,
                                         type="secondary"
                                     ):
-                                        st.session_state[f"editing_desp_{idx}"] = False
+                                        st.session_state[f"editing_desp_{chave_linha}"] = False
                                         st.rerun()
                             
                             st.markdown("</div>", unsafe_allow_html=True)
@@ -5181,22 +4936,31 @@ elif menu == "💸 CONTROLE DE GASTOS":
         df_gastos = dados["controle_gastos"].copy()
         
         # Converter 'data' para datetime SEMPRE
-        df_gastos["data"] = pd.to_datetime(df_gastos["data"], errors='coerce')
+        df_gastos["data"] = parse_datas(df_gastos["data"], chave="controle_gastos.data")
         
-        # Remover valores NaT (datas inválidas)
-        if not df_gastos.empty:
+        # Remover valores NaT (datas inválidas ou vazias)
+        sem_data = int(df_gastos["data"].isna().sum())
+        if sem_data:
+            st.caption(f"⚠️ {sem_data} gasto(s) sem data válida foram ocultados.")
             df_gastos = df_gastos.dropna(subset=["data"])
 
+    # ---------- LIVRO DO MÊS ABERTO ----------
+    # Os cálculos da reserva só olham o mês corrente; na virada do mês o
+    # livro aberto troca sozinho e o anterior passa para "meses fechados"
+    hoje = date.today()
+    mes_atual = hoje.strftime("%Y-%m")
+    df_gastos_mes = metricas.get("gastos_mes", dados, mes_atual)
+    cubo_gastos = DatabaseManager.cube("controle_gastos", usuario, dados["controle_gastos"])
+
     # Cálculos
-    gasto_total = df_gastos["valor"].sum() if not df_gastos.empty else 0
+    gasto_total = cubo_gastos.soma(mes_atual)
     saldo_restante = reserva_mensal - gasto_total
     percentual_gasto = (gasto_total / reserva_mensal * 100) if reserva_mensal > 0 else 0
-    total_gastos = len(df_gastos)
-    media_gasto = df_gastos["valor"].mean() if not df_gastos.empty else 0
+    total_gastos = cubo_gastos.contagem(mes_atual)
+    media_gasto = gasto_total / total_gastos if total_gastos else 0
     
     # Gastos de hoje
-    hoje = date.today()
-    df_gastos_hoje = df_gastos[df_gastos["data"].dt.date == hoje]
+    df_gastos_hoje = df_gastos_mes[df_gastos_mes["data"].dt.date == hoje]
     gastos_hoje = df_gastos_hoje["valor"].sum() if not df_gastos_hoje.empty else 0
     qtd_gastos_hoje = len(df_gastos_hoje)
 
@@ -5388,6 +5152,32 @@ elif menu == "💸 CONTROLE DE GASTOS":
     </div>
     """.format(percentual=min(percentual_gasto, 100), reserva=reserva_mensal), unsafe_allow_html=True)
 
+    # ---------- MESES FECHADOS (ARQUIVO) ----------
+    df_fechados = meses_fechados(cubo_gastos, mes_atual, reserva_mensal)
+    
+    if not df_fechados.empty:
+        with st.expander(f"🗄️ Meses fechados ({len(df_fechados)})", expanded=False):
+            st.caption("Totais arquivados por mês, comparados com a reserva mensal atual.")
+            
+            df_fechados_view = df_fechados.copy()
+            df_fechados_view["mes"] = pd.to_datetime(df_fechados_view["mes"]).dt.strftime("%m/%Y")
+            df_fechados_view["situacao"] = df_fechados_view["saldo"].map(
+                lambda s: "🟢 Dentro" if s >= 0 else "🔴 Estourou"
+            )
+            
+            st.dataframe(
+                df_fechados_view[["mes", "total", "quantidade", "saldo", "situacao"]],
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "mes": "Mês",
+                    "total": st.column_config.NumberColumn("Total gasto", format="R$ %.2f"),
+                    "quantidade": "Gastos",
+                    "saldo": st.column_config.NumberColumn("Saldo da reserva", format="R$ %.2f"),
+                    "situacao": "Situação"
+                }
+            )
+
     st.divider()
 
     # ---------- CARD PARA NOVO GASTO ----------
@@ -5425,7 +5215,7 @@ elif menu == "💸 CONTROLE DE GASTOS":
 
             if submitted and descricao.strip():
                 novo = pd.DataFrame([{
-                    "data": date.today(),
+                    "data": pd.Timestamp(date.today()),
                     "descricao": descricao.strip(),
                     "valor": valor
                 }])
@@ -5456,7 +5246,7 @@ elif menu == "💸 CONTROLE DE GASTOS":
         
         with tab1:
             # Gastos de hoje
-            df_hoje = df_gastos[df_gastos["data"].dt.date == hoje]
+            df_hoje = df_gastos_hoje
             
             if not df_hoje.empty:
                 st.markdown(f"""
@@ -5483,14 +5273,13 @@ elif menu == "💸 CONTROLE DE GASTOS":
                 
                 # Mostrar gastos de hoje - usar enumerate para obter um contador único
                 for i, (idx, row) in enumerate(df_hoje.iterrows()):
-                    mostrar_gasto_card(idx, row, df_gastos, unique_counter=i)
+                    mostrar_gasto_card(idx, row, unique_counter=i)
             else:
                 st.info("Nenhum gasto registrado hoje.")
         
         with tab2:
-            # Gastos deste mês
-            mes_atual = hoje.strftime("%Y-%m")
-            df_mes = df_gastos[df_gastos["data"].dt.strftime("%Y-%m") == mes_atual]
+            # Gastos deste mês (livro aberto)
+            df_mes = df_gastos_mes.sort_values("data", ascending=False)
             
             if not df_mes.empty:
                 st.markdown(f"""
@@ -5548,7 +5337,7 @@ elif menu == "💸 CONTROLE DE GASTOS":
                 for i, (idx, row) in enumerate(df_mes_pagina.iterrows()):
                     # Encontrar o índice original correspondente
                     idx_original = df_mes.iloc[inicio:fim].index[i]
-                    mostrar_gasto_card(idx_original, row, df_gastos, unique_counter=f"mes_{st.session_state['pagina_mes_atual']}_{i}")
+                    mostrar_gasto_card(idx_original, row, unique_counter=f"mes_{st.session_state['pagina_mes_atual']}_{i}")
                 
 
                 
@@ -5692,7 +5481,7 @@ elif menu == "💸 CONTROLE DE GASTOS":
                 for i, (idx, row) in enumerate(df_filtrado_pagina.iterrows()):
                     # Encontrar o índice original correspondente
                     idx_original = df_filtrado.iloc[inicio_total:fim_total].index[i]
-                    mostrar_gasto_card(idx_original, row, df_gastos, unique_counter=f"todos_{st.session_state['pagina_total_atual']}_{i}")
+                    mostrar_gasto_card(idx_original, row, unique_counter=f"todos_{st.session_state['pagina_total_atual']}_{i}")
                 
 
                         
@@ -5716,160 +5505,14 @@ elif menu == "💸 CONTROLE DE GASTOS":
             </div>
             """, unsafe_allow_html=True)
             
-            # Sistema de categorias hierárquico
-            CATEGORIAS_HIERARQUICAS = {
-                "🍔 Alimentação": {
-                    "subcategorias": {
-                        "🍔 Alimentação - Restaurante": "#ef4444",
-                        "🍎 Alimentação - Supermercado": "#dc2626",
-                        "☕ Alimentação - Café": "#92400e",
-                        "🥩 Alimentação - Açougue": "#b91c1c",
-                        "🍎 Alimentação - Hortifruti": "#16a34a"
-                    },
-                    "cor": "#ef4444"
-                },
-                "🚗 Transporte": {
-                    "subcategorias": {
-                        "🚗 Transporte - Combustível": "#3b82f6",
-                        "🚕 Transporte - Táxi/Uber": "#1d4ed8",
-                        "🚌 Transporte - Público": "#1e40af",
-                        "🅿️ Transporte - Estacionamento": "#0ea5e9",
-                        "🛠️ Transporte - Manutenção": "#6366f1"
-                    },
-                    "cor": "#3b82f6"
-                },
-                "🏠 Casa": {
-                    "subcategorias": {
-                        "🏠 Casa - Aluguel": "#8b5cf6",
-                        "💡 Casa - Energia": "#f59e0b",
-                        "💧 Casa - Água": "#0ea5e9",
-                        "🔥 Casa - Gás": "#ef4444",
-                        "📡 Casa - Internet/TV": "#8b5cf6"
-                    },
-                    "cor": "#8b5cf6"
-                },
-                "🛒 Compras": {
-                    "subcategorias": {
-                        "🛍️ Compras - Roupas": "#ec4899",
-                        "📱 Compras - Eletrônicos": "#6b7280",
-                        "💄 Compras - Beleza": "#f472b6",
-                        "📚 Compras - Livros": "#84cc16",
-                        "🎁 Compras - Presentes": "#a855f7"
-                    },
-                    "cor": "#ec4899"
-                },
-                "🎯 Lazer": {
-                    "subcategorias": {
-                        "🎬 Lazer - Cinema": "#a78bfa",
-                        "🍻 Lazer - Bar": "#f59e0b",
-                        "✈️ Lazer - Viagem": "#3b82f6",
-                        "🎮 Lazer - Games": "#8b5cf6",
-                        "🏋️ Lazer - Esportes": "#10b981"
-                    },
-                    "cor": "#a78bfa"
-                },
-                "🧑‍⚕️ Saúde": {
-                    "subcategorias": {
-                        "🏥 Saúde - Consulta": "#10b981",
-                        "💊 Saúde - Medicamento": "#ef4444",
-                        "❤️ Saúde - Plano": "#dc2626"
-                    },
-                    "cor": "#10b981"
-                },
-                "💼 Trabalho": {
-                    "subcategorias": {
-                        "💼 Trabalho - Material": "#6b7280",
-                        "💻 Trabalho - Software": "#3b82f6",
-                        "📞 Trabalho - Telefone": "#10b981"
-                    },
-                    "cor": "#6b7280"
-                },
-                "🧾 Finanças": {
-                    "subcategorias": {
-                        "🏦 Finanças - Taxa Bancária": "#059669",
-                        "📊 Finanças - Investimento": "#84cc16",
-                        "🧾 Finanças - Seguro": "#3b82f6"
-                    },
-                    "cor": "#059669"
-                },
-                "👨‍👩‍👧‍👦 Família": {
-                    "subcategorias": {
-                        "👶 Família - Filhos": "#f472b6",
-                        "🐕 Família - Pets": "#f59e0b",
-                        "🎉 Família - Eventos": "#8b5cf6"
-                    },
-                    "cor": "#f472b6"
-                },
-                "💰 Outros": {
-                    "subcategorias": {
-                        "🎫 Outros - Assinaturas": "#6b7280",
-                        "📝 Outros - Variados": "#9ca3af"
-                    },
-                    "cor": "#6b7280"
-                }
-            }
-            
-            # Detectar categorias automaticamente
-            categorias_detalhadas = {}
-            palavras_chave_detalhadas = {
-                "🍔 Alimentação - Restaurante": ['restaurante', 'lanche', 'fast food', 'pizza', 'hamburguer'],
-                "🍎 Alimentação - Supermercado": ['mercado', 'supermercado', 'atacadão'],
-                "☕ Alimentação - Café": ['café', 'cafeteria', 'starbucks', 'padaria'],
-                "🥩 Alimentação - Açougue": ['açougue', 'carnes', 'frango', 'peixe'],
-                "🍎 Alimentação - Hortifruti": ['feira', 'hortifruti', 'fruta', 'legume'],
-                "🚗 Transporte - Combustível": ['gasolina', 'combustível', 'posto'],
-                "🚕 Transporte - Táxi/Uber": ['uber', 'táxi', '99', 'cabify'],
-                "🚌 Transporte - Público": ['ônibus', 'metro', 'trem', 'bilhete'],
-                "🅿️ Transporte - Estacionamento": ['estacionamento', 'parking', 'garagem'],
-                "🛠️ Transporte - Manutenção": ['oficina', 'mecânico', 'troca de óleo'],
-                "🏠 Casa - Aluguel": ['aluguel', 'condomínio', 'iptu'],
-                "💡 Casa - Energia": ['luz', 'energia', 'conta de luz'],
-                "💧 Casa - Água": ['água', 'conta de água', 'sabesp'],
-                "🔥 Casa - Gás": ['gás', 'botijão', 'gás natural'],
-                "📡 Casa - Internet/TV": ['internet', 'net', 'claro', 'vivo'],
-                "🛍️ Compras - Roupas": ['roupa', 'calçado', 'sapato', 'tenis'],
-                "📱 Compras - Eletrônicos": ['celular', 'notebook', 'tablet', 'tv'],
-                "💄 Compras - Beleza": ['farmácia', 'drogaria', 'perfume', 'maquiagem'],
-                "📚 Compras - Livros": ['livro', 'revista', 'jornal', 'leitura'],
-                "🎁 Compras - Presentes": ['presente', 'aniversário', 'natal'],
-                "🎬 Lazer - Cinema": ['cinema', 'filme', 'ingresso', 'netflix'],
-                "🍻 Lazer - Bar": ['bar', 'boteco', 'cerveja', 'drink'],
-                "✈️ Lazer - Viagem": ['viagem', 'hotel', 'passagem', 'turismo'],
-                "🎮 Lazer - Games": ['jogo', 'game', 'playstation', 'xbox'],
-                "🏋️ Lazer - Esportes": ['academia', 'ginásio', 'esporte', 'natação'],
-                "💼 Trabalho - Material": ['material', 'escritório', 'caneta', 'papel'],
-                "💻 Trabalho - Software": ['software', 'assinatura', 'licença', 'app'],
-                "📞 Trabalho - Telefone": ['telefone', 'celular empresa', 'recarga'],
-                "🏥 Saúde - Consulta": ['consulta', 'médico', 'dentista', 'psicólogo'],
-                "💊 Saúde - Medicamento": ['remédio', 'medicamento', 'farmacia'],
-                "❤️ Saúde - Plano": ['plano de saúde', 'unimed', 'amil'],
-                "🏦 Finanças - Taxa Bancária": ['taxa', 'tarifa', 'anuidade', 'banco'],
-                "📊 Finanças - Investimento": ['investimento', 'ações', 'fii', 'tesouro'],
-                "🧾 Finanças - Seguro": ['seguro', 'apólice', 'previdência'],
-                "👶 Família - Filhos": ['creche', 'escola', 'material escolar', 'uniforme'],
-                "🐕 Família - Pets": ['pet', 'veterinário', 'ração', 'gato'],
-                "🎉 Família - Eventos": ['festa', 'casamento', 'formatura', 'comemoração'],
-                "🎫 Outros - Assinaturas": ['assinatura', 'streaming', 'spotify', 'youtube'],
-                "📝 Outros - Variados": []
-            }
-            
-            # Processar todos os gastos
-            for idx, row in df_gastos.iterrows():
-                desc_lower = row['descricao'].lower()
-                categoria_encontrada = False
-                
-                for categoria, palavras in palavras_chave_detalhadas.items():
-                    if any(palavra in desc_lower for palavra in palavras):
-                        if categoria not in categorias_detalhadas:
-                            categorias_detalhadas[categoria] = 0
-                        categorias_detalhadas[categoria] += row['valor']
-                        categoria_encontrada = True
-                        break
-                
-                if not categoria_encontrada:
-                    if "📝 Outros - Variados" not in categorias_detalhadas:
-                        categorias_detalhadas["📝 Outros - Variados"] = 0
-                    categorias_detalhadas["📝 Outros - Variados"] += row['valor']
+            # Categorias gravadas em controle_gastos (linhas antigas ainda sem
+            # categoria são classificadas só na cópia, sem virar diff no save)
+            gastos_categorizados = categorizar_gastos(df_gastos.copy())
+            subcategoria_gasto = gastos_categorizados["subcategoria"]
+            categorias_detalhadas = (
+                df_gastos["valor"].groupby(subcategoria_gasto, sort=False).sum().to_dict()
+                if not df_gastos.empty else {}
+            )
             
             # Criar abas para navegação entre categorias principais
             categorias_principais = list(CATEGORIAS_HIERARQUICAS.keys())
@@ -5879,15 +5522,13 @@ elif menu == "💸 CONTROLE DE GASTOS":
                 st.markdown("#### 📊 Visão Geral por Categoria Principal")
                 
                 # Agrupar por categoria principal
-                totais_principais = {}
-                for cat_detalhada, valor in categorias_detalhadas.items():
-                    # Encontrar categoria principal
-                    for cat_principal, info in CATEGORIAS_HIERARQUICAS.items():
-                        if cat_detalhada in info["subcategorias"]:
-                            if cat_principal not in totais_principais:
-                                totais_principais[cat_principal] = 0
-                            totais_principais[cat_principal] += valor
-                            break
+                totais_principais = {
+                    cat_principal: valor
+                    for cat_principal, valor in df_gastos["valor"].groupby(
+                        gastos_categorizados["categoria_principal"], sort=False
+                    ).sum().items()
+                    if cat_principal in CATEGORIAS_HIERARQUICAS
+                }
                 
                 # Gráfico de pizza por categoria principal
                 if totais_principais:
@@ -6079,22 +5720,14 @@ elif menu == "💸 CONTROLE DE GASTOS":
                             subcat_nome = subcategoria_selecionada.split(' (R$')[0]
                             
                             # Filtrar gastos por subcategoria
-                            gastos_subcategoria = []
-                            for idx, row in df_gastos.iterrows():
-                                desc_lower = row['descricao'].lower()
-                                palavras = palavras_chave_detalhadas.get(subcat_nome, [])
-                                
-                                if any(palavra in desc_lower for palavra in palavras) or \
-                                (subcat_nome == "📝 Outros - Variados" and not any(
-                                    any(p in desc_lower for p in palavras_chave_detalhadas[cat]) 
-                                    for cat in palavras_chave_detalhadas.keys()
-                                )):
-                                    gastos_subcategoria.append((idx, row))
+                            gastos_subcategoria = list(
+                                df_gastos[subcategoria_gasto == subcat_nome].iterrows()
+                            )
                             
                             if gastos_subcategoria:
                                 st.markdown(f"### 💸 Gastos em {subcat_nome}")
                                 for i, (idx, row) in enumerate(gastos_subcategoria):
-                                    mostrar_gasto_card(idx, row, df_gastos, unique_counter=f"subcat_{subcat_nome}_{i}")
+                                    mostrar_gasto_card(idx, row, unique_counter=f"subcat_{subcat_nome}_{i}")
                             else:
                                 st.info(f"Nenhum gasto encontrado em {subcat_nome}")
                     else:
@@ -6108,7 +5741,9 @@ elif menu == "💸 CONTROLE DE GASTOS":
                     maior_categoria = max(categorias_detalhadas.items(), key=lambda x: x[1])
                     categoria_maior = maior_categoria[0]
                     valor_maior = maior_categoria[1]
-                    percentual_maior = (valor_maior / gasto_total * 100) if gasto_total > 0 else 0
+                    # A análise por categoria cobre todos os gastos, não só o mês aberto
+                    total_categorizado = sum(categorias_detalhadas.values())
+                    percentual_maior = (valor_maior / total_categorizado * 100) if total_categorizado > 0 else 0
                     
                     # Encontrar categoria principal do maior gasto
                     categoria_principal_maior = ""
@@ -6283,8 +5918,8 @@ elif menu == "💸 CONTROLE DE GASTOS":
         col_stat1, col_stat2 = st.columns(2)
         
         with col_stat1:
-            # Card de média diária
-            dias_com_gastos = df_gastos["data"].dt.date.nunique()
+            # Card de média diária (mês aberto)
+            dias_com_gastos = df_gastos_mes["data"].dt.date.nunique()
             media_diaria = gasto_total / dias_com_gastos if dias_com_gastos > 0 else 0
             
             st.markdown("""
@@ -6851,6 +6486,148 @@ elif menu == "📊 DASHBOARD":
                     """
                 st.markdown(status_html, unsafe_allow_html=True)
 
+            # ================= MODO MONTE CARLO =================
+            with st.expander("🎲 Projeção probabilística (Monte Carlo)", expanded=False):
+                st.caption(
+                    "Rendimento e inflação variam mês a mês em cada caminho simulado; "
+                    "as faixas mostram o intervalo entre o cenário pessimista (P10) e o otimista (P90)."
+                )
+                
+                # Simulação sob demanda: não roda a cada rerun da página
+                rodar_mc = st.checkbox(
+                    "Rodar simulação",
+                    value=False,
+                    key="rodar_monte_carlo"
+                )
+                
+                if not rodar_mc:
+                    st.info("Marque **Rodar simulação** para calcular as faixas P10/P50/P90.")
+                else:
+                    col_mc1, col_mc2, col_mc3, col_mc4 = st.columns(4, gap="medium")
+                
+                    with col_mc1:
+                        vol_rendimento = st.slider(
+                            "Volatilidade do rendimento (% a.m.)",
+                            min_value=0.0,
+                            max_value=5.0,
+                            value=1.0,
+                            step=0.1
+                        )
+                
+                    with col_mc2:
+                        vol_inflacao = st.slider(
+                            "Volatilidade da inflação (% a.m.)",
+                            min_value=0.0,
+                            max_value=2.0,
+                            value=0.2,
+                            step=0.05
+                        )
+                
+                    with col_mc3:
+                        qtd_caminhos = st.selectbox(
+                            "Caminhos simulados",
+                            [1000, 2000, 5000],
+                            index=1
+                        )
+                
+                    with col_mc4:
+                        semente_mc = st.number_input(
+                            "Semente",
+                            min_value=0,
+                            value=42,
+                            step=1
+                        )
+                
+                    # Mesma semente, parâmetros e agenda -> mesmo resultado (memoizado)
+                    bandas = metricas.calcular(
+                        "monte_carlo",
+                        lambda: simular_monte_carlo(
+                            patrimonio_inicial=patrimonio,
+                            saldo_fixo_mensal=saldo_fixo,
+                            rendimento_mensal=rendimento_mensal,
+                            inflacao_mensal=inflacao_mensal,
+                            meta_patrimonio=meta_patrimonio,
+                            meses=120,
+                            caminhos=qtd_caminhos,
+                            volatilidade_rendimento=vol_rendimento / 100,
+                            volatilidade_inflacao=vol_inflacao / 100,
+                            semente=int(semente_mc),
+                            fluxo_mensal=saldo_fixo_agenda
+                        ),
+                        dependencias=("fluxo_fixo",),
+                        params=(
+                            patrimonio, saldo_fixo, rendimento_mensal, inflacao_mensal,
+                            meta_patrimonio, qtd_caminhos, vol_rendimento, vol_inflacao,
+                            int(semente_mc), mes_atual
+                        )
+                    )
+                
+                    df_bandas = bandas.melt(
+                        id_vars="data",
+                        value_vars=["p10", "p50", "p90"],
+                        var_name="Faixa",
+                        value_name="patrimonio"
+                    )
+                    df_bandas["Faixa"] = df_bandas["Faixa"].str.upper()
+                
+                    fig_mc = px.line(
+                        df_bandas,
+                        x="data",
+                        y="patrimonio",
+                        color="Faixa",
+                        color_discrete_map={"P10": "#ef4444", "P50": "#3b82f6", "P90": "#10b981"}
+                    )
+                
+                    fig_mc.update_traces(
+                        hovertemplate="<b>%{x|%b/%Y}</b><br>%{data.name}: R$ %{y:,.0f}<extra></extra>"
+                    )
+                    fig_mc.for_each_trace(
+                        lambda t: t.update(line=dict(dash="dot", width=2)) if t.name != "P50" else t.update(line=dict(width=4))
+                    )
+                
+                    fig_mc.add_hline(
+                        y=meta_patrimonio,
+                        line_dash="dash",
+                        line_color="#8b5cf6",
+                        line_width=2,
+                        annotation_text="Meta",
+                        annotation_position="top left",
+                        annotation_font=dict(color="#8b5cf6", size=12)
+                    )
+                
+                    fig_mc.update_layout(
+                        template="plotly_dark",
+                        paper_bgcolor="#0e1117",
+                        plot_bgcolor="#0e1117",
+                        font=dict(color="#e5e7eb"),
+                        hovermode="x unified",
+                        xaxis=dict(title="", gridcolor="#374151"),
+                        yaxis=dict(title="Patrimônio (R$)", gridcolor="#374151", tickprefix="R$ "),
+                        height=420
+                    )
+                
+                    st.plotly_chart(fig_mc, use_container_width=True)
+                
+                    col_prob1, col_prob2 = st.columns(2, gap="medium")
+                
+                    with col_prob1:
+                        data_limite_mc = st.date_input(
+                            "🎯 Atingir a meta até",
+                            value=date(hoje.year + 5, hoje.month, 1),
+                            min_value=hoje,
+                            key="data_limite_monte_carlo"
+                        )
+                        prob_data = probabilidade_meta(bandas, data_limite_mc)
+                        st.metric("Probabilidade até a data", f"{prob_data * 100:.0f}%")
+                
+                    with col_prob2:
+                        final_mc = bandas.iloc[-1]
+                        st.metric("Patrimônio mediano em 10 anos (P50)", f"R$ {final_mc['p50']:,.0f}")
+                        st.caption(
+                            f"P10: R$ {final_mc['p10']:,.0f} · P90: R$ {final_mc['p90']:,.0f} · "
+                            f"chance de atingir a meta em 10 anos: {final_mc['prob_meta'] * 100:.0f}%"
+                        )
+
         else:
             # Card para dados insuficientes
             st.markdown("""
@@ -7875,12 +7652,12 @@ elif menu == "⚙️ CONFIGURAÇÕES":
                 if meta > 0 and orcamento > 0 and rendimento > 0:
                     # Cálculo simplificado
                     poupanca_mensal = orcamento * 0.3  # Supondo 30% de poupança
-                    patrimonio_projetado = 0
-                    meses = 0
                     
-                    while patrimonio_projetado < meta and meses < 600:  # 50 anos máximo
-                        patrimonio_projetado = (patrimonio_projetado + poupanca_mensal) * (1 + rendimento)
-                        meses += 1
+                    # Aporte no início do mês, partindo do zero (50 anos máximo)
+                    meses = int(min(
+                        solver.nper(rendimento, poupanca_mensal, meta, inicio=True),
+                        600
+                    ))
                     
                     anos = meses / 12
                     
@@ -8311,7 +8088,10 @@ elif menu == "📄 RELATÓRIO EXECUTIVO":
         
         if not df_projecao.empty:
             ultimo = df_projecao.iloc[-1]
-            meses_ate_meta = len(df_projecao)
+            # Mês da primeira linha com a meta atingida, na própria projeção
+            # (que segue a agenda do fluxo fixo, não um saldo constante)
+            atingida = df_projecao["meta_atingida"].to_numpy()
+            meses_ate_meta = int(atingida.argmax()) if atingida.any() else len(df_projecao)
             
             if ultimo["meta_atingida"]:
                 texto_proj = f"✅ Meta será atingida em aproximadamente {meses_ate_meta} meses."
@@ -8611,7 +8391,8 @@ elif menu == "📄 RELATÓRIO EXECUTIVO":
             rendimento_mensal=rendimento_mensal,
             inflacao_mensal=inflacao_mensal,
             meta_patrimonio=meta_patrimonio,
-            meses=120
+            meses=120,
+            fluxo_mensal=saldo_fixo_agenda + (saldo_fixo_simulado - saldo_fixo)
         )
         
         # ================= COMPARAÇÃO DE CENÁRIOS =================
@@ -8770,6 +8551,107 @@ elif menu == "📄 RELATÓRIO EXECUTIVO":
     
     st.divider()
 
+    # ================= MAPA DE CENÁRIOS =================
+    st.markdown("### 🗺️ Mapa de Cenários")
+    
+    with st.container():
+        
+        st.markdown("Centenas de combinações de aporte, corte de despesas, rendimento e inflação avaliadas de uma vez.")
+        
+        col_alvo, col_info = st.columns([1, 2], gap="large")
+        
+        with col_alvo:
+            data_alvo = st.date_input(
+                "🎯 Data alvo para a meta",
+                value=date(hoje.year + 5, hoje.month, 1),
+                min_value=hoje
+            )
+        
+        prazo_meses = (data_alvo.year - hoje.year) * 12 + data_alvo.month - hoje.month
+        
+        # Faixas em torno dos parâmetros atuais (taxas não ficam negativas)
+        variacoes_taxa = np.array([-0.004, -0.002, 0.0, 0.002, 0.004])
+        rendimentos_grade = np.unique(np.clip(rendimento_mensal + variacoes_taxa, 0, None))
+        inflacoes_grade = np.unique(np.clip(inflacao_mensal + variacoes_taxa / 2, 0, None))
+        
+        inicio_grade = time.perf_counter()
+        grade = simular_grade_memo(
+            patrimonio_inicial=patrimonio,
+            saldo_fixo_mensal=saldo_fixo,
+            despesas_fixas=despesas_fixas,
+            meta_patrimonio=meta_patrimonio,
+            aportes=np.arange(0, 5001, 250),
+            cortes=np.arange(0, 51, 5),
+            rendimentos=rendimentos_grade,
+            inflacoes=inflacoes_grade
+        )
+        plano = plano_mais_barato(grade, prazo_meses, rendimento_mensal, inflacao_mensal)
+        ms_grade = (time.perf_counter() - inicio_grade) * 1000
+        
+        with col_info:
+            if plano is None:
+                st.warning(
+                    f"Nenhuma combinação simulada atinge a meta até {data_alvo.strftime('%m/%Y')} "
+                    f"com o rendimento e a inflação atuais."
+                )
+            else:
+                # Em quantos cenários de taxa o mesmo plano ainda cumpre o prazo
+                mesmo_plano = grade[
+                    (grade["aporte_extra"] == plano["aporte_extra"])
+                    & (grade["corte_despesas"] == plano["corte_despesas"])
+                ]
+                robustez = (mesmo_plano["meses_meta"] <= prazo_meses).mean() * 100
+                
+                st.success(
+                    f"💡 Plano mais barato: aporte extra de R$ {plano['aporte_extra']:,.0f} "
+                    f"e corte de {plano['corte_despesas']:.0f}% nas despesas fixas "
+                    f"(esforço de R$ {plano['custo_mensal']:,.0f}/mês). "
+                    f"Meta em {plano['meses_meta']:.0f} meses."
+                )
+                st.caption(
+                    f"Esse plano cumpre o prazo em {robustez:.0f}% dos cenários de rendimento e inflação simulados."
+                )
+        
+        superficie = superficie_meta(grade, rendimento_mensal, inflacao_mensal)
+        
+        fig_mapa = px.imshow(
+            superficie,
+            labels=dict(
+                x="Corte nas despesas fixas (%)",
+                y="Aporte extra (R$)",
+                color="Meses até a meta"
+            ),
+            aspect="auto",
+            origin="lower",
+            color_continuous_scale="RdYlGn_r"
+        )
+        
+        if plano is not None:
+            fig_mapa.add_scatter(
+                x=[plano["corte_despesas"]],
+                y=[plano["aporte_extra"]],
+                mode="markers",
+                marker=dict(size=14, color="#3b82f6", symbol="star"),
+                name="Plano mais barato",
+                showlegend=False
+            )
+        
+        fig_mapa.update_layout(
+            template="plotly_dark",
+            paper_bgcolor="#0e1117",
+            plot_bgcolor="#0e1117",
+            font=dict(color="#e5e7eb"),
+            height=420
+        )
+        
+        st.plotly_chart(fig_mapa, use_container_width=True)
+        st.caption(
+            f"⚡ {len(grade):,} cenários avaliados em {ms_grade:.0f} ms · "
+            f"células vazias não atingem a meta em 10 anos"
+        )
+    
+    st.divider()
+
     # ================= ALERTAS E CONTROLE =================
     st.markdown("### ⚠️ Alertas Críticos")
     
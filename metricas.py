@@ -0,0 +1,151 @@
+import pandas as pd
+
+from datas import parse_datas
+from projecao import equivalente_mensal, expandir_fluxos
+
+
+# =========================================================
+# MOTOR DE MÉTRICAS DERIVADAS (MEMOIZAÇÃO POR VERSÃO)
+# =========================================================
+
+class MetricasEngine:
+    """
+    Calcula agregados derivados das tabelas e guarda o resultado junto com
+    a versão das tabelas de origem (e parâmetros). Num rerun, só recalcula
+    o agregado cuja tabela foi alterada desde o último cálculo.
+    """
+
+    def __init__(self, store, versoes):
+        self._store = store      # dict que sobrevive a reruns (session_state)
+        self._versoes = versoes  # {tabela: versão}
+        self.recalculados = []
+
+    def calcular(self, nome, func, dependencias=(), params=()):
+        chave = tuple(self._versoes.get(t, 0) for t in dependencias) + tuple(params)
+
+        atual = self._store.get(nome)
+        if atual is not None and atual[0] == chave:
+            return atual[1]
+
+        valor = func()
+        self._store[nome] = (chave, valor)
+        self.recalculados.append(nome)
+        return valor
+
+    def get(self, nome, dados, *params):
+        """Agregado registrado em AGREGADOS"""
+        dependencias, func = AGREGADOS[nome]
+        return self.calcular(
+            nome,
+            lambda: func(dados, *params),
+            dependencias,
+            params
+        )
+
+
+# =========================================================
+# AGREGADOS
+# =========================================================
+
+def calc_patrimonio(dados):
+    df = dados["investimentos"]
+    return df["valor_atual"].sum() if not df.empty else 0
+
+
+def calc_gastos_mes(dados, mes_atual):
+    """
+    Livro do mês aberto: só os gastos rápidos de mes_atual, com data já
+    convertida. Memoizado por versão da tabela e mês, então a virada do
+    mês troca o livro aberto sozinha.
+    """
+    df = dados.get("controle_gastos", pd.DataFrame())
+    if df.empty:
+        return pd.DataFrame({
+            "data": pd.Series(dtype="datetime64[ns]"),
+            "descricao": pd.Series(dtype=object),
+            "valor": pd.Series(dtype=float)
+        })
+
+    ano, mes = (int(parte) for parte in mes_atual.split("-"))
+
+    if pd.api.types.is_datetime64_any_dtype(df["data"]):
+        # Já convertida no load (SCHEMAS): comparação inteira, sem strftime
+        datas = df["data"]
+    else:
+        # Texto: só as linhas que podem ser do mês (ou em formato fora do
+        # padrão numérico) passam pelo parse_datas
+        texto = df["data"].astype(str)
+        candidatas = (
+            texto.str.contains(rf"{ano}[-/.]0?{mes}(?!\d)|(?<!\d)0?{mes}[-/.]{ano}", regex=True)
+            | ~texto.str.match(r"\s*\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}")
+        )
+        df = df[candidatas.to_numpy()]
+        datas = parse_datas(df["data"], chave="controle_gastos.data")
+
+    do_mes = ((datas.dt.year == ano) & (datas.dt.month == mes)).to_numpy()
+
+    aberto = df[do_mes].copy()
+    aberto["data"] = datas[do_mes]
+    return aberto
+
+
+def meses_fechados(cubo, mes_atual, reserva_mensal):
+    """
+    Arquivo dos meses já fechados a partir do cubo mensal (sem ler
+    lançamentos): mes, total, quantidade e saldo contra a reserva.
+    """
+    totais = cubo.totais(por=("mes",))
+    totais = totais[totais["mes"].notna() & (totais["mes"] < mes_atual)]
+
+    totais = totais.rename(columns={"valor": "total"}).sort_values("mes", ascending=False)
+    totais["saldo"] = reserva_mensal - totais["total"]
+    return totais.reset_index(drop=True)
+
+
+def _primeiro_dia(mes_atual):
+    return pd.Timestamp(f"{mes_atual}-01").date()
+
+
+def calc_fluxo_fixo(dados, mes_atual):
+    """(receitas_fixas, despesas_fixas, saldo_fixo) só dos fluxos vigentes no mês"""
+    receitas, despesas = equivalente_mensal(dados["fluxo_fixo"], _primeiro_dia(mes_atual))
+    return receitas, despesas, receitas - despesas
+
+
+def calc_agenda_fluxos(dados, mes_atual, meses=120):
+    """Matriz fluxos x meses do fluxo fixo, a partir do mês atual"""
+    return expandir_fluxos(dados["fluxo_fixo"], meses, _primeiro_dia(mes_atual))
+
+
+def calc_sonhos(dados):
+    """(total_sonhos, total_atual, progresso_sonhos) só dos sonhos não desistidos"""
+    df = dados["sonhos_projetos"]
+    if df.empty:
+        return 0, 0, 0
+
+    ativos = df[df["status"] != "Desistido"]
+    if ativos.empty:
+        return 0, 0, 0
+
+    total = ativos["valor_alvo"].sum()
+    atual = ativos["valor_atual"].sum()
+    progresso = (atual / total * 100) if total > 0 else 0
+    return total, atual, progresso
+
+
+def calc_config(dados):
+    df = dados["config"]
+    if df.empty:
+        return {}
+    return dict(zip(df["chave"], df["valor"]))
+
+
+# nome -> (tabelas de origem, função)
+AGREGADOS = {
+    "patrimonio": (("investimentos",), calc_patrimonio),
+    "gastos_mes": (("controle_gastos",), calc_gastos_mes),
+    "fluxo_fixo": (("fluxo_fixo",), calc_fluxo_fixo),
+    "agenda_fluxos": (("fluxo_fixo",), calc_agenda_fluxos),
+    "sonhos": (("sonhos_projetos",), calc_sonhos),
+    "config": (("config",), calc_config),
+}
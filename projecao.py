@@ -0,0 +1,431 @@
+import math
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from datas import parse_datas
+from solver import TAXA_MINIMA, fv, nper, taxa_real
+
+
+# =========================================================
+# MOTOR DE PROJEÇÃO PATRIMONIAL (FORMA FECHADA / NUMPY)
+# =========================================================
+#
+# Com taxa real r e aporte mensal a, o patrimônio no mês i é
+#
+#     P(i) = P0 * (1 + r)^i + a * ((1 + r)^i - 1) / r      (r != 0)
+#     P(i) = P0 + a * i                                    (r == 0)
+#
+# então a trajetória inteira sai de uma vez, sem laço mês a mês.
+# As fórmulas pontuais (fv / pmt / nper) ficam em solver.py.
+
+
+@lru_cache(maxsize=32)
+def _datas_mensais(ano, mes, meses):
+    indices = ano * 12 + (mes - 1) + np.arange(meses)
+    datas = np.array([date(int(i) // 12, int(i) % 12 + 1, 1) for i in indices], dtype=object)
+    datas.flags.writeable = False
+    return datas
+
+
+def datas_mensais(data_base, meses):
+    """
+    Primeiro dia de cada um dos `meses` meses a partir de data_base (mesmo
+    resultado de pd.date_range(data_base, periods=meses, freq="MS").date),
+    por aritmética de meses inteiros e em cache por (mês base, meses).
+    """
+    if data_base is None:
+        data_base = date.today().replace(day=1)
+    if data_base.day != 1:
+        # "MS" começa no primeiro dia do mês seguinte
+        data_base = date(data_base.year + data_base.month // 12, data_base.month % 12 + 1, 1)
+    return _datas_mensais(data_base.year, data_base.month, meses)
+
+
+def trajetoria(patrimonio_inicial, aporte_mensal, taxa, meses):
+    """Array com o patrimônio dos meses 0..meses-1"""
+    return fv(taxa, np.arange(meses, dtype=float), aporte_mensal, patrimonio_inicial)
+
+
+def mes_meta(patrimonio_inicial, aporte_mensal, taxa, meta):
+    """
+    Primeiro mês em que o patrimônio alcança a meta, em O(1).
+    Retorna None se a meta nunca é alcançada.
+    """
+    n = float(nper(taxa, aporte_mensal, meta, patrimonio_inicial))
+    return None if math.isinf(n) else int(n)
+
+
+def trajetoria_variavel(patrimonio_inicial, aportes, taxa):
+    """
+    Trajetória com aporte diferente a cada mês (aportes[0] é ignorado,
+    como no mês 0 da projeção):  P(i) = g^i * (P0 + soma de a_k / g^k).
+    """
+    aportes = np.asarray(aportes, dtype=float).copy()
+    aportes[:1] = 0
+
+    if taxa == 0:
+        return patrimonio_inicial + np.cumsum(aportes)
+
+    with np.errstate(over="ignore"):
+        crescimento = np.power(1 + taxa, np.arange(len(aportes), dtype=float))
+        return crescimento * (patrimonio_inicial + np.cumsum(aportes / crescimento))
+
+
+def projetar_patrimonio(
+    patrimonio_inicial,
+    saldo_fixo_mensal,
+    rendimento_mensal,
+    inflacao_mensal,
+    meta_patrimonio,
+    meses=120,
+    data_base=None,
+    fluxo_mensal=None
+):
+    """
+    Mesma saída da projeção antiga (data, patrimonio, rendimento,
+    aporte_fixo, meta_atingida): um mês por linha, parando no primeiro
+    mês a partir do 12º em que a meta está atingida.
+
+    Com `fluxo_mensal` (saldo do fluxo fixo mês a mês, ex.: da agenda de
+    expandir_fluxos, com pelo menos `meses` posições), o aporte varia ao
+    longo do tempo em vez de repetir saldo_fixo_mensal.
+    """
+    taxa = float(taxa_real(rendimento_mensal, inflacao_mensal))
+
+    if fluxo_mensal is None:
+        aportes = np.full(meses, float(saldo_fixo_mensal))
+        patrimonio = trajetoria(patrimonio_inicial, saldo_fixo_mensal, taxa, meses)
+    else:
+        aportes = np.asarray(fluxo_mensal, dtype=float)[:meses]
+        patrimonio = trajetoria_variavel(patrimonio_inicial, aportes, taxa)
+
+    atingida = patrimonio >= meta_patrimonio
+
+    # Corta no mesmo ponto do laço antigo (i >= 12 e meta atingida)
+    candidatos = np.flatnonzero(atingida[12:])
+    n = 12 + int(candidatos[0]) + 1 if candidatos.size else len(patrimonio)
+    patrimonio = patrimonio[:n]
+
+    rendimento = np.zeros(n)
+    rendimento[1:] = patrimonio[:-1] * taxa
+
+    aporte = aportes[:n].copy()
+    aporte[:1] = 0
+
+    datas = datas_mensais(data_base, n)
+
+    return pd.DataFrame({
+        "data": datas,
+        "patrimonio": patrimonio,
+        "rendimento": rendimento,
+        "aporte_fixo": aporte,
+        "meta_atingida": atingida[:n]
+    })
+
+
+# =========================================================
+# AGENDA DO FLUXO FIXO (VIGÊNCIA E RECORRÊNCIA)
+# =========================================================
+
+# Meses entre duas ocorrências de cada recorrência
+PERIODOS_RECORRENCIA = {"Mensal": 1, "Trimestral": 3, "Semestral": 6, "Anual": 12}
+
+
+def _campos_agenda(fluxo_fixo, data_base):
+    """
+    Valores com sinal (receita +, despesa -), período da recorrência e
+    meses de início/fim relativos a data_base (mês 0), tudo em arrays.
+    Sem data de início o fluxo vale desde sempre; sem data de fim, para sempre.
+    """
+    vazio = pd.Series(None, index=fluxo_fixo.index, dtype=object)
+
+    valores = pd.to_numeric(fluxo_fixo["valor"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    tipo = fluxo_fixo["tipo"].astype(str).str.lower()
+    sinal = np.where(tipo == "receita", 1.0, np.where(tipo == "despesa", -1.0, 0.0))
+
+    periodo = (
+        fluxo_fixo.get("recorrencia", vazio)
+        .map(PERIODOS_RECORRENCIA)
+        .fillna(1)
+        .to_numpy(dtype=int)
+    )
+
+    def indice_mes(coluna):
+        datas = parse_datas(fluxo_fixo.get(coluna, vazio), chave=f"fluxo_fixo.{coluna}")
+        return (datas.dt.year - data_base.year) * 12 + (datas.dt.month - data_base.month)
+
+    inicio = indice_mes("data_inicio").fillna(np.iinfo(np.int32).min).to_numpy(dtype=np.int64)
+    fim = indice_mes("data_fim").fillna(np.iinfo(np.int32).max).to_numpy(dtype=np.int64)
+
+    return valores * sinal, periodo, inicio, fim
+
+
+def expandir_fluxos(fluxo_fixo, meses=120, data_base=None):
+    """
+    Expande o fluxo fixo numa matriz fluxos x meses (mês 0 = data_base):
+    cada célula tem o valor lançado naquele mês (receita +, despesa -),
+    respeitando data_inicio, data_fim (inclusive) e a recorrência, que
+    conta a partir do mês de início.
+
+    saldo do mês i = matriz[:, i].sum()
+    """
+    if data_base is None:
+        data_base = date.today().replace(day=1)
+    if fluxo_fixo.empty:
+        return np.zeros((0, meses))
+
+    valores, periodo, inicio, fim = _campos_agenda(fluxo_fixo, data_base)
+
+    # Sem data de início, a recorrência conta a partir do mês 0
+    ancora = np.where(inicio == np.iinfo(np.int32).min, 0, inicio)[:, None]
+    mes = np.arange(meses)[None, :]
+
+    ativo = (
+        (mes >= inicio[:, None])
+        & (mes <= fim[:, None])
+        & (np.mod(mes - ancora, periodo[:, None]) == 0)
+    )
+    return ativo * valores[:, None]
+
+
+def equivalente_mensal(fluxo_fixo, data_ref):
+    """
+    (receitas, despesas) mensais dos fluxos vigentes no mês de data_ref,
+    com fluxos trimestrais/semestrais/anuais convertidos para o valor por mês.
+    """
+    if fluxo_fixo.empty:
+        return 0, 0
+
+    valores, periodo, inicio, fim = _campos_agenda(fluxo_fixo, data_ref)
+    vigente = (inicio <= 0) & (fim >= 0)
+    por_mes = np.where(vigente, valores / periodo, 0.0)
+
+    return por_mes[por_mes > 0].sum(), -por_mes[por_mes < 0].sum()
+
+
+# =========================================================
+# SIMULADOR DE CENÁRIOS EM GRADE
+# =========================================================
+
+def simular_grade(
+    patrimonio_inicial,
+    saldo_fixo_mensal,
+    despesas_fixas,
+    meta_patrimonio,
+    aportes,
+    cortes,
+    rendimentos,
+    inflacoes,
+    horizonte=120
+):
+    """
+    Avalia todas as combinações (aporte extra, % de corte nas despesas
+    fixas, rendimento, inflação) de uma vez, sem projetar mês a mês.
+
+    Retorna um DataFrame com uma linha por combinação e as colunas
+    aporte_extra, corte_despesas, rendimento, inflacao, custo_mensal,
+    saldo_mensal e meses_meta (NaN quando a meta não é atingida dentro
+    do horizonte).
+    """
+    aporte, corte, rendimento, inflacao = np.meshgrid(
+        np.asarray(aportes, dtype=float),
+        np.asarray(cortes, dtype=float),
+        np.asarray(rendimentos, dtype=float),
+        np.asarray(inflacoes, dtype=float),
+        indexing="ij"
+    )
+
+    custo = aporte + despesas_fixas * corte / 100
+    saldo = saldo_fixo_mensal + custo
+    taxa = taxa_real(rendimento, inflacao)
+
+    meses = nper(taxa, saldo, meta_patrimonio, patrimonio_inicial)
+    meses = np.where(meses <= horizonte, meses, np.nan)
+
+    return pd.DataFrame({
+        "aporte_extra": aporte.ravel(),
+        "corte_despesas": corte.ravel(),
+        "rendimento": rendimento.ravel(),
+        "inflacao": inflacao.ravel(),
+        "custo_mensal": custo.ravel(),
+        "saldo_mensal": saldo.ravel(),
+        "meses_meta": meses.ravel()
+    })
+
+
+def superficie_meta(grade, rendimento, inflacao):
+    """
+    Recorte da grade para um par (rendimento, inflação): matriz de meses
+    até a meta com aporte extra nas linhas e % de corte nas colunas.
+    """
+    fatia = grade[
+        np.isclose(grade["rendimento"], rendimento)
+        & np.isclose(grade["inflacao"], inflacao)
+    ]
+    return fatia.pivot(index="aporte_extra", columns="corte_despesas", values="meses_meta")
+
+
+def plano_mais_barato(grade, prazo_meses, rendimento=None, inflacao=None):
+    """
+    Combinação de menor esforço mensal (aporte extra + valor cortado das
+    despesas) que atinge a meta em até `prazo_meses`. Com rendimento e
+    inflação informados, considera só esse cenário de mercado.
+    Retorna a linha da grade (Series) ou None.
+    """
+    filtro = grade["meses_meta"] <= prazo_meses
+    if rendimento is not None:
+        filtro &= np.isclose(grade["rendimento"], rendimento)
+    if inflacao is not None:
+        filtro &= np.isclose(grade["inflacao"], inflacao)
+
+    candidatos = grade[filtro]
+    if candidatos.empty:
+        return None
+
+    # Empate no custo: prefere quem chega antes e corta menos despesas
+    ordem = candidatos.sort_values(
+        ["custo_mensal", "meses_meta", "corte_despesas"],
+        kind="stable"
+    )
+    return ordem.iloc[0]
+
+
+# =========================================================
+# PROJEÇÃO MONTE CARLO (RENDIMENTO E INFLAÇÃO ALEATÓRIOS)
+# =========================================================
+
+# Teto de caminhos x meses simulados por chamada (~8 MB em float64)
+MAX_CELULAS_MONTE_CARLO = 1_000_000
+MIN_CAMINHOS_MONTE_CARLO = 100
+
+
+def simular_monte_carlo(
+    patrimonio_inicial,
+    saldo_fixo_mensal,
+    rendimento_mensal,
+    inflacao_mensal,
+    meta_patrimonio,
+    meses=120,
+    caminhos=2000,
+    volatilidade_rendimento=0.01,
+    volatilidade_inflacao=0.002,
+    semente=None,
+    data_base=None,
+    fluxo_mensal=None
+):
+    """
+    Sorteia rendimento e inflação de cada mês (normal em torno dos valores
+    configurados) para vários caminhos ao mesmo tempo, numa matriz
+    caminhos x meses.
+
+    Com G(t) = produto de (1 + taxa_k) até t, o patrimônio de cada caminho é
+    P(t) = G(t) * (P0 + aporte * soma de 1/G(k) até t), calculado com
+    cumprod/cumsum, sem laço mês a mês. Com `fluxo_mensal` (a mesma agenda
+    do fluxo fixo usada em projetar_patrimonio), o aporte de cada mês vem
+    da agenda em vez de repetir saldo_fixo_mensal.
+
+    Retorna um DataFrame com data, p10, p50, p90 e prob_meta (fração dos
+    caminhos que já alcançaram a meta até aquele mês). O número de caminhos
+    é limitado a MAX_CELULAS_MONTE_CARLO / meses; a mesma semente gera o
+    mesmo resultado.
+    """
+    caminhos = min(int(caminhos), MAX_CELULAS_MONTE_CARLO // max(meses, 1))
+    caminhos = max(caminhos, MIN_CAMINHOS_MONTE_CARLO)
+
+    rng = np.random.default_rng(semente)
+    forma = (caminhos, meses - 1)
+    rendimentos = rng.normal(rendimento_mensal, volatilidade_rendimento, forma)
+    inflacoes = rng.normal(inflacao_mensal, volatilidade_inflacao, forma)
+    taxas = np.maximum(rendimentos - inflacoes, TAXA_MINIMA)
+
+    if fluxo_mensal is None:
+        aportes_mes = np.full(meses - 1, float(saldo_fixo_mensal))
+    else:
+        aportes_mes = np.asarray(fluxo_mensal, dtype=float)[1:meses]
+
+    crescimento = np.cumprod(1 + taxas, axis=1)
+    aportes = np.cumsum(aportes_mes / crescimento, axis=1)
+
+    patrimonio = np.empty((caminhos, meses))
+    patrimonio[:, 0] = patrimonio_inicial
+    patrimonio[:, 1:] = crescimento * (patrimonio_inicial + aportes)
+
+    p10, p50, p90 = np.percentile(patrimonio, [10, 50, 90], axis=0)
+    atingiu = np.logical_or.accumulate(patrimonio >= meta_patrimonio, axis=1)
+
+    return pd.DataFrame({
+        "data": datas_mensais(data_base, meses),
+        "p10": p10,
+        "p50": p50,
+        "p90": p90,
+        "prob_meta": atingiu.mean(axis=0)
+    })
+
+
+def probabilidade_meta(bandas, data_limite):
+    """Probabilidade de ter alcançado a meta até `data_limite` (date)"""
+    ate = bandas[bandas["data"] <= data_limite]
+    return float(ate["prob_meta"].iloc[-1]) if not ate.empty else 0.0
+
+
+# =========================================================
+# PROJEÇÃO DA CARTEIRA POR ATIVO
+# =========================================================
+
+def _normaliza_taxas(serie):
+    """Fração (0.008) ou percentual (8 -> 0.08), mesma regra de normaliza_percentual"""
+    taxas = pd.to_numeric(serie, errors="coerce").fillna(0).to_numpy(dtype=float)
+    return np.where(taxas > 1, taxas / 100, taxas)
+
+
+def projetar_carteira(
+    investimentos,
+    meses=120,
+    inflacao_mensal=0.0,
+    aporte_mensal=0.0,
+    por="tipo",
+    data_base=None
+):
+    """
+    Projeta cada investimento com o seu próprio rendimento_mensal (descontada
+    a inflação), numa matriz ativos x meses, e soma por `por` ("tipo" ou
+    "categoria").
+
+    O aporte mensal, se houver, é dividido entre os ativos na proporção do
+    valor atual de cada um.
+
+    Retorna um DataFrame longo com as colunas data, <por> e patrimonio.
+    """
+    datas = datas_mensais(data_base, meses)
+
+    if investimentos.empty:
+        return pd.DataFrame(columns=["data", por, "patrimonio"])
+
+    valores = pd.to_numeric(investimentos["valor_atual"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    taxas = np.maximum(_normaliza_taxas(investimentos["rendimento_mensal"]) - inflacao_mensal, TAXA_MINIMA)
+
+    total = valores.sum()
+    pesos = valores / total if total > 0 else np.full(len(valores), 1 / len(valores))
+
+    meses_idx = np.arange(meses, dtype=float)[None, :]
+    matriz = fv(
+        taxas[:, None],
+        meses_idx,
+        (aporte_mensal * pesos)[:, None],
+        valores[:, None]
+    )
+
+    grupos = investimentos[por].astype(object).where(investimentos[por].notna(), "Outros")
+    codigos, nomes = pd.factorize(grupos.astype(str))
+
+    somas = np.zeros((len(nomes), meses))
+    np.add.at(somas, codigos, matriz)
+
+    return pd.DataFrame({
+        "data": np.tile(datas, len(nomes)),
+        por: np.repeat(np.asarray(nomes, dtype=object), meses),
+        "patrimonio": somas.ravel()
+    })
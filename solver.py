@@ -0,0 +1,125 @@
+import numpy as np
+
+
+# =========================================================
+# SOLVER FINANCEIRO (FV / PMT / NPER EM FORMA FECHADA)
+# =========================================================
+#
+# Convenção única para toda a aplicação (sem sinais invertidos):
+#   pv    -> patrimônio atual
+#   pmt   -> aporte mensal
+#   taxa  -> taxa real mensal (rendimento - inflação)
+#   fv    -> patrimônio alvo
+#
+# Com g = 1 + taxa, depois de n meses:
+#   fim do mês    : FV = pv * g^n + pmt * (g^n - 1) / taxa
+#   início do mês : FV = pv * g^n + pmt * g * (g^n - 1) / taxa
+#
+# Taxa zero cai no caso linear (pv + pmt * n); taxas negativas usam a
+# mesma fórmula, limitadas a TAXA_MINIMA. Todas as funções aceitam
+# escalares ou arrays (broadcasting).
+#
+# Taxa real quase zero é comum (ex.: 0.004999999999999999 - 0.005), então
+# (g^n - 1) / taxa é calculado como expm1(n * log1p(taxa)) / taxa, que não
+# perde precisão perto de zero; nper usa o caso linear abaixo de TAXA_LINEAR.
+
+TAXA_MINIMA = -0.99
+TAXA_LINEAR = 1e-9
+
+
+def taxa_real(rendimento_mensal, inflacao_mensal):
+    """Rendimento descontado da inflação, nunca abaixo de TAXA_MINIMA"""
+    return np.maximum(np.asarray(rendimento_mensal, dtype=float) - inflacao_mensal, TAXA_MINIMA)
+
+
+def _aporte_efetivo(taxa, pmt, inicio):
+    """Aporte no início do mês rende um mês a mais: equivale a pmt * g no fim"""
+    return pmt * (1 + taxa) if inicio else pmt
+
+
+def _crescimento_e_fator(taxa, nper):
+    """
+    (g^n, (g^n - 1) / taxa), o segundo com o limite n em taxa zero e sem
+    cancelamento numérico para taxas muito pequenas
+    """
+    with np.errstate(all="ignore"):
+        expoente = nper * np.log1p(taxa)
+        taxa_segura = np.where(taxa == 0, 1.0, taxa)
+        fator = np.where(taxa == 0, nper, np.expm1(expoente) / taxa_segura)
+        return np.exp(expoente), fator
+
+
+def fv(taxa, nper, pmt, pv=0.0, inicio=False):
+    """Patrimônio depois de `nper` meses"""
+    taxa = np.maximum(np.asarray(taxa, dtype=float), TAXA_MINIMA)
+    nper = np.asarray(nper, dtype=float)
+    pmt = _aporte_efetivo(taxa, np.asarray(pmt, dtype=float), inicio)
+
+    crescimento, fator = _crescimento_e_fator(taxa, nper)
+    with np.errstate(all="ignore"):
+        return pv * crescimento + pmt * fator
+
+
+def pmt(taxa, nper, fv, pv=0.0, inicio=False):
+    """
+    Aporte mensal necessário para sair de `pv` e chegar a `fv` em `nper`
+    meses. Nunca negativo (0 quando o patrimônio já chega sozinho);
+    inf quando não há prazo (nper <= 0) e a meta ainda não foi atingida.
+    """
+    taxa = np.maximum(np.asarray(taxa, dtype=float), TAXA_MINIMA)
+    nper = np.asarray(nper, dtype=float)
+    fv = np.asarray(fv, dtype=float)
+
+    crescimento, fator = _crescimento_e_fator(taxa, nper)
+    with np.errstate(all="ignore"):
+        falta = fv - pv * crescimento
+        if inicio:
+            fator = fator * (1 + taxa)
+
+        valor = np.where(fator > 0, falta / fator, np.inf)
+
+    valor = np.where(falta <= 0, 0.0, valor)
+    return np.maximum(valor, 0.0)
+
+
+def nper(taxa, pmt, fv, pv=0.0, inicio=False):
+    """
+    Primeiro mês inteiro em que o patrimônio alcança `fv` (array float);
+    inf quando a meta nunca é alcançada.
+    """
+    taxa, pmt, fv, pv = (
+        np.asarray(v, dtype=float)
+        for v in np.broadcast_arrays(taxa, pmt, fv, pv)
+    )
+    taxa = np.maximum(taxa, TAXA_MINIMA)
+    aporte = _aporte_efetivo(taxa, pmt, inicio)
+
+    with np.errstate(all="ignore"):
+        # Taxa (quase) zero: crescimento linear
+        linear = np.where(aporte > 0, np.ceil((fv - pv) / aporte), np.inf)
+
+        # P(n) = A * g^n - a/r  ->  precisa de A * g^n >= fv + a/r
+        taxa_segura = np.where(np.abs(taxa) < TAXA_LINEAR, 1.0, taxa)
+        deslocamento = aporte / taxa_segura
+        a = pv + deslocamento
+        razao = (fv + deslocamento) / a
+        expoente = np.log(razao) / np.log1p(taxa_segura)
+        valido = (a != 0) & (razao > 0) & (expoente > 0)
+        geometrico = np.where(valido, np.ceil(expoente), np.inf)
+
+    n = np.where(np.abs(taxa) < TAXA_LINEAR, linear, geometrico)
+    n = np.where(pv >= fv, 0.0, n)
+
+    # Corrige arredondamento de ponto flutuante na fronteira
+    with np.errstate(all="ignore"):
+        finito = np.isfinite(n) & (n > 0)
+        m = np.where(finito, n, 0.0)
+        n = np.where(finito & (_fv_fim(pv, aporte, taxa, m - 1) >= fv), n - 1, n)
+        m = np.where(np.isfinite(n), n, 0.0)
+        n = np.where(np.isfinite(n) & (_fv_fim(pv, aporte, taxa, m) < fv), n + 1, n)
+    return n
+
+
+def _fv_fim(pv, aporte, taxa, n):
+    """fv com aporte já convertido para fim do mês"""
+    return fv(taxa, n, aporte, pv)
@@ -0,0 +1,149 @@
+-- =========================================================
+-- RPC: APLICAR MUTAÇÕES EM LOTE (ATÔMICO)
+-- =========================================================
+-- Recebe uma lista ordenada de mutações e aplica todas na mesma
+-- transação. Se qualquer uma falhar, nada é gravado.
+--
+-- Formato de cada mutação (jsonb):
+--   {"tabela": "historico", "op": "insert",     "registros": [{...}, ...]}
+--   {"tabela": "historico", "op": "update",     "registros": [{"id": 1, ...}, ...]}
+--   {"tabela": "historico", "op": "delete",     "ids": [1, 2, 3]}
+--   {"tabela": "historico", "op": "delete_all"}
+--   {"tabela": "historico", "op": "delete_except", "ids": [4, 5]}   (remove os demais)
+--   {"tabela": "config",    "op": "upsert",     "registros": [...], "on_conflict": ["usuario", "chave"]}
+--
+-- Retorno: array com um item por mutação (linhas inseridas/atualizadas
+-- para insert/update/upsert, contagem para delete/delete_all).
+
+create or replace function public.aplicar_mutacoes(p_usuario text, p_mutacoes jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_tabelas_permitidas constant text[] := array[
+        'historico',
+        'investimentos',
+        'sonhos_projetos',
+        'config',
+        'categorias',
+        'fluxo_fixo',
+        'relatorios_historicos',
+        'controle_gastos'
+    ];
+    m jsonb;
+    v_tabela text;
+    v_op text;
+    v_registros jsonb;
+    v_cols text;
+    v_cols_r text;
+    v_set_excluded text;
+    v_conflito text;
+    v_qtd bigint;
+    v_saida jsonb;
+    v_resultado jsonb := '[]'::jsonb;
+begin
+    for m in select value from jsonb_array_elements(p_mutacoes) loop
+        v_tabela := m->>'tabela';
+        v_op := m->>'op';
+        v_registros := coalesce(m->'registros', '[]'::jsonb);
+        v_cols := null;
+        v_cols_r := null;
+        v_set_excluded := null;
+
+        if not (v_tabela = any(v_tabelas_permitidas)) then
+            raise exception 'Tabela não permitida: %', v_tabela;
+        end if;
+
+        -- 🔒 Nenhum registro pode pertencer a outro usuário
+        if exists (
+            select 1 from jsonb_array_elements(v_registros) r
+            where r->>'usuario' is distinct from p_usuario
+        ) then
+            raise exception 'Registro de outro usuário em %', v_tabela;
+        end if;
+
+        -- Colunas a partir das chaves do primeiro registro (sem id)
+        if jsonb_array_length(v_registros) > 0 then
+            select
+                string_agg(quote_ident(k), ', '),
+                string_agg('r.' || quote_ident(k), ', '),
+                string_agg(quote_ident(k) || ' = excluded.' || quote_ident(k), ', ')
+            into v_cols, v_cols_r, v_set_excluded
+            from jsonb_object_keys(v_registros->0) k
+            where k <> 'id';
+        end if;
+
+        if v_op = 'insert' then
+            execute format(
+                'with novos as (
+                    insert into public.%1$I (%2$s)
+                    select %3$s from jsonb_populate_recordset(null::public.%1$I, $1) r
+                    returning *
+                 ) select coalesce(jsonb_agg(to_jsonb(novos)), ''[]'') from novos',
+                v_tabela, v_cols, v_cols_r
+            ) into v_saida using v_registros;
+
+        elsif v_op = 'update' then
+            execute format(
+                'with alterados as (
+                    update public.%1$I t set (%2$s) = row(%3$s)
+                    from jsonb_populate_recordset(null::public.%1$I, $1) r
+                    where t.id = r.id and t.usuario = $2
+                    returning t.*
+                 ) select coalesce(jsonb_agg(to_jsonb(alterados)), ''[]'') from alterados',
+                v_tabela, v_cols, v_cols_r
+            ) into v_saida using v_registros, p_usuario;
+
+        elsif v_op = 'upsert' then
+            select string_agg(quote_ident(c), ', ')
+            into v_conflito
+            from jsonb_array_elements_text(m->'on_conflict') c;
+
+            execute format(
+                'with gravados as (
+                    insert into public.%1$I (%2$s)
+                    select %3$s from jsonb_populate_recordset(null::public.%1$I, $1) r
+                    on conflict (%4$s) do update set %5$s
+                    returning *
+                 ) select coalesce(jsonb_agg(to_jsonb(gravados)), ''[]'') from gravados',
+                v_tabela, v_cols, v_cols_r, v_conflito, v_set_excluded
+            ) into v_saida using v_registros;
+
+        elsif v_op = 'delete' then
+            execute format(
+                'delete from public.%1$I
+                 where usuario = $2
+                   and id::text in (select jsonb_array_elements_text($1))',
+                v_tabela
+            ) using coalesce(m->'ids', '[]'::jsonb), p_usuario;
+            get diagnostics v_qtd = row_count;
+            v_saida := to_jsonb(v_qtd);
+
+        elsif v_op = 'delete_except' then
+            execute format(
+                'delete from public.%1$I
+                 where usuario = $2
+                   and id::text not in (select jsonb_array_elements_text($1))',
+                v_tabela
+            ) using coalesce(m->'ids', '[]'::jsonb), p_usuario;
+            get diagnostics v_qtd = row_count;
+            v_saida := to_jsonb(v_qtd);
+
+        elsif v_op = 'delete_all' then
+            execute format('delete from public.%I where usuario = $1', v_tabela)
+            using p_usuario;
+            get diagnostics v_qtd = row_count;
+            v_saida := to_jsonb(v_qtd);
+
+        else
+            raise exception 'Operação inválida: %', v_op;
+        end if;
+
+        v_resultado := v_resultado || jsonb_build_array(v_saida);
+    end loop;
+
+    return v_resultado;
+end;
+$$;
+
+grant execute on function public.aplicar_mutacoes(text, jsonb) to anon, authenticated;
@@ -0,0 +1,15 @@
+-- =========================================================
+-- CONTROLE_GASTOS: CATEGORIA AUTOMÁTICA PERSISTIDA
+-- =========================================================
+-- Categoria principal e subcategoria calculadas pelas palavras-chave
+-- (categorizador.py) no momento em que o gasto é criado ou editado.
+-- Linhas antigas ficam nulas (a tela as classifica na leitura) e ganham
+-- categoria quando a descrição é editada. Enquanto esta migration não roda,
+-- o app deixa as duas colunas fora do save (DatabaseManager.OPTIONAL_COLUMNS).
+
+alter table public.controle_gastos
+    add column if not exists categoria_principal text,
+    add column if not exists subcategoria text;
+
+create index if not exists controle_gastos_usuario_categoria_idx
+    on public.controle_gastos (usuario, categoria_principal, subcategoria);
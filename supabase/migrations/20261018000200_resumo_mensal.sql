@@ -0,0 +1,55 @@
+-- =========================================================
+-- RPC: RESUMO MENSAL (SOMA/QUANTIDADE POR MÊS x DIMENSÕES)
+-- =========================================================
+-- Usada quando o app carrega só os últimos N meses (MESES_CARREGADOS):
+-- os meses anteriores entram no cubo mensal como agregado, sem trazer
+-- as linhas, e os totais de todos os meses continuam corretos.
+--
+-- Retorno: array de {"mes": "YYYY-MM", <dimensões...>, "valor", "quantidade"}
+-- das linhas do usuário com data < p_ate.
+
+create or replace function public.resumo_mensal(
+    p_usuario text,
+    p_tabela text,
+    p_dimensoes text[],
+    p_ate date
+)
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+    v_tabelas_permitidas constant text[] := array[
+        'historico',
+        'controle_gastos'
+    ];
+    v_dims text;
+    v_saida jsonb;
+begin
+    if not (p_tabela = any(v_tabelas_permitidas)) then
+        raise exception 'Tabela não permitida: %', p_tabela;
+    end if;
+
+    select coalesce(string_agg(', ' || quote_ident(d), ''), '')
+    into v_dims
+    from unnest(coalesce(p_dimensoes, array[]::text[])) d;
+
+    execute format(
+        'select coalesce(jsonb_agg(to_jsonb(t)), ''[]''::jsonb) from (
+            select to_char(data::date, ''YYYY-MM'') as mes%2$s,
+                   sum(valor) as valor,
+                   count(*) as quantidade
+              from public.%1$I
+             where usuario = $1
+               and data::date < $2
+             group by 1%2$s
+        ) t',
+        p_tabela,
+        v_dims
+    ) into v_saida using p_usuario, p_ate;
+
+    return v_saida;
+end;
+$$;
+
+grant execute on function public.resumo_mensal(text, text, text[], date) to anon, authenticated;
@@ -0,0 +1,143 @@
+"""
+Paridade: solver.py (fv / pmt / nper) x laços mês a mês
+
+Propriedades conferidas em cada caso:
+  - fv bate com o laço que acumula mês a mês;
+  - nper é o primeiro mês em que o laço alcança a meta (ou nunca);
+  - aportando pmt, o laço alcança a meta exatamente no prazo, e com
+    um aporte 1% menor não alcança.
+
+Os casos vêm de uma grade fixa com as taxas de fronteira (zero, ±1e-15,
+±TAXA_LINEAR, negativas) e de sorteios com semente fixa.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import solver  # noqa: E402
+
+LIMITE_MESES = 600
+
+TAXAS_FRONTEIRA = [
+    0.0,
+    1e-15, -1e-15,
+    0.004999999999999999 - 0.005,
+    solver.TAXA_LINEAR, -solver.TAXA_LINEAR,
+    solver.TAXA_LINEAR / 2, solver.TAXA_LINEAR * 2,
+    -0.001, -0.02,
+    0.001, 0.01,
+]
+
+
+# =========================================================
+# REFERÊNCIA: LAÇOS MÊS A MÊS
+# =========================================================
+
+def acumular(pv, pmt, taxa, meses, inicio):
+    patrimonio = pv
+    for _ in range(meses):
+        if inicio:
+            patrimonio = (patrimonio + pmt) * (1 + taxa)
+        else:
+            patrimonio = patrimonio * (1 + taxa) + pmt
+    return patrimonio
+
+
+def nper_por_laco(pv, pmt, taxa, meta, inicio):
+    patrimonio, meses = pv, 0
+    while patrimonio < meta and meses < LIMITE_MESES:
+        patrimonio = (patrimonio + pmt) * (1 + taxa) if inicio else patrimonio * (1 + taxa) + pmt
+        meses += 1
+    return meses if patrimonio >= meta else None
+
+
+# =========================================================
+# CASOS
+# =========================================================
+
+def _casos_fronteira():
+    casos = []
+    for taxa in TAXAS_FRONTEIRA:
+        for inicio in (False, True):
+            for pv, pmt, meta, meses in (
+                (0.0, 1_000.0, 50_000.0, 60),
+                (10_000.0, 500.0, 100_000.0, 240),
+                (200_000.0, 0.0, 100_000.0, 12),
+                (5_000.0, -100.0, 20_000.0, 36),
+                (0.0, 0.0, 1_000.0, 1),
+            ):
+                casos.append(dict(pv=pv, pmt=pmt, taxa=taxa, meta=meta, meses=meses, inicio=inicio))
+    return casos
+
+
+def _casos_sorteados(quantidade=300, semente=20261018):
+    rng = np.random.default_rng(semente)
+    casos = []
+    for _ in range(quantidade):
+        taxa = rng.choice([
+            0.0, rng.uniform(-0.02, 0.0), rng.uniform(0.0, 0.02),
+            float(rng.choice(TAXAS_FRONTEIRA)),
+        ])
+        casos.append(dict(
+            pv=float(rng.choice([0.0, rng.uniform(0, 500_000)])),
+            pmt=float(rng.choice([0.0, rng.uniform(-500, 10_000)])),
+            taxa=float(taxa),
+            meta=float(rng.uniform(1_000, 2_000_000)),
+            meses=int(rng.integers(1, 400)),
+            inicio=bool(rng.integers(0, 2)),
+        ))
+    return casos
+
+
+CASOS = _casos_fronteira() + _casos_sorteados()
+
+
+def _id(caso):
+    return "taxa={taxa:.3g}-inicio={inicio}-pv={pv:.0f}-pmt={pmt:.0f}-meses={meses}".format(**caso)
+
+
+# =========================================================
+# PROPRIEDADES
+# =========================================================
+
+@pytest.mark.parametrize("caso", CASOS, ids=_id)
+def test_fv_igual_ao_laco(caso):
+    esperado = acumular(caso["pv"], caso["pmt"], caso["taxa"], caso["meses"], caso["inicio"])
+    calculado = float(solver.fv(caso["taxa"], caso["meses"], caso["pmt"], caso["pv"], inicio=caso["inicio"]))
+    assert np.isclose(calculado, esperado, rtol=1e-8, atol=1e-4)
+
+
+@pytest.mark.parametrize("caso", CASOS, ids=_id)
+def test_nper_primeiro_mes_do_laco(caso):
+    n = float(solver.nper(caso["taxa"], caso["pmt"], caso["meta"], caso["pv"], inicio=caso["inicio"]))
+    n_laco = nper_por_laco(caso["pv"], caso["pmt"], caso["taxa"], caso["meta"], caso["inicio"])
+    if n_laco is None:
+        assert n > LIMITE_MESES
+    else:
+        assert n == n_laco
+
+
+@pytest.mark.parametrize("caso", CASOS, ids=_id)
+def test_pmt_alcanca_a_meta_no_prazo(caso):
+    pv, taxa, meta, meses, inicio = caso["pv"], caso["taxa"], caso["meta"], caso["meses"], caso["inicio"]
+    aporte = float(solver.pmt(taxa, meses, meta, pv, inicio=inicio))
+
+    assert aporte >= 0
+    if aporte == 0:
+        # Sem aporte o patrimônio já chega sozinho
+        assert acumular(pv, 0.0, taxa, meses, inicio) >= meta * (1 - 1e-9)
+    else:
+        assert acumular(pv, aporte, taxa, meses, inicio) >= meta * (1 - 1e-9)
+        assert acumular(pv, aporte * 0.99, taxa, meses, inicio) < meta
+
+
+def test_arrays_com_broadcasting():
+    taxas = np.array(TAXAS_FRONTEIRA)
+    for inicio in (False, True):
+        n = solver.nper(taxas, 1_000.0, 50_000.0, 0.0, inicio=inicio)
+        assert n.shape == taxas.shape
+        escalares = [float(solver.nper(taxa, 1_000.0, 50_000.0, 0.0, inicio=inicio)) for taxa in taxas]
+        assert n.tolist() == escalares